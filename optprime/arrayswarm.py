@@ -0,0 +1,343 @@
+"""Swarm state stored as NumPy arrays with one row per particle.
+
+The object-based implementations keep one `Particle` per swarm member, which
+means that every step of every iteration goes through the interpreter once
+per particle.  An `ArraySwarm` instead holds the whole swarm in a handful of
+(num x dims) arrays so that motion, evaluation, and neighborhood-best
+propagation can be done as batched array operations.
+"""
+
+from __future__ import division
+
+import operator
+
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+from .particle import Particle
+
+try:
+    range = xrange
+except NameError:
+    pass
+
+
+def worst_value(comparator):
+    """Returns the value that every real value is better than.
+
+    In the array representation, this takes the place of the None values used
+    by `Particle` for values that have not been set yet.
+    """
+    if comparator is operator.lt:
+        return np.inf
+    elif comparator is operator.gt:
+        return -np.inf
+    else:
+        raise ValueError('Unsupported comparator: %r' % comparator)
+
+
+def sort_key(values, comparator):
+    """Returns keys for `values` such that smaller keys are better."""
+    if comparator is operator.gt:
+        return -values
+    else:
+        return values
+
+
+def neighborhood_best(senders, recipients, values, comparator):
+    """Finds the best candidate sent to each recipient.
+
+    The parallel arrays `senders` and `recipients` describe one message per
+    entry, and `values` gives the value carried by each message.  Returns a
+    pair of arrays (recipients, winners) where each winner is an index into
+    the message arrays.  Each recipient appears once.  Ties go to the earliest
+    message, which matches repeatedly calling `Particle.nbest_cand` in order.
+    """
+    if not len(recipients):
+        empty = np.zeros(0, dtype=int)
+        return empty, empty
+    order = np.lexsort((np.arange(len(recipients)),
+        sort_key(values, comparator), recipients))
+    sorted_recipients = recipients[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = sorted_recipients[1:] != sorted_recipients[:-1]
+    return sorted_recipients[first], order[first]
+
+
+class ArraySwarm(object):
+    """A swarm whose particle state is stored in parallel arrays.
+
+    Row i of each array describes the particle with id `ids[i]`.  Values that
+    have not been set yet (e.g., pbestval before the first evaluation) are
+    stored as the comparator's worst value rather than None.
+
+    >>> import operator
+    >>> p = Particle(0, np.array((1.0, 2.0)), np.array((3.0, 4.0)))
+    >>> q = Particle(1, np.array((5.0, 6.0)), np.array((7.0, 8.0)))
+    >>> s = ArraySwarm.from_particles([p, q], operator.lt)
+    >>> s.pos.shape
+    (2, 2)
+    >>> s.particle(1).pbestval is None
+    True
+    >>>
+    """
+    # Names of the per-particle array attributes.
+    arrays = ('ids', 'iters', 'pos', 'vel', 'value', 'pbestpos', 'pbestval',
+            'nbestpos', 'nbestval')
+
+    def __init__(self, ids, pos, vel, comparator):
+        num, dims = pos.shape
+        self.comparator = comparator
+        self.worst = worst_value(comparator)
+
+        self.ids = np.array(ids, dtype=int)
+        self.iters = np.zeros(num, dtype=int)
+        self.pos = np.array(pos, dtype=float)
+        self.vel = np.array(vel, dtype=float)
+        self.value = np.empty(num)
+        self.value.fill(self.worst)
+        self.pbestpos = self.pos.copy()
+        self.pbestval = self.value.copy()
+        self.nbestpos = self.pos.copy()
+        self.nbestval = self.value.copy()
+
+    @classmethod
+    def from_particles(cls, particles, comparator):
+        """Creates an ArraySwarm with the state of the given particles."""
+        particles = list(particles)
+        ids = [p.id for p in particles]
+        pos = np.array([p.pos for p in particles], dtype=float)
+        vel = np.array([p.vel for p in particles], dtype=float)
+        swarm = cls(ids, pos, vel, comparator)
+        for i, p in enumerate(particles):
+            swarm.set_particle(i, p)
+        return swarm
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dims(self):
+        return self.pos.shape[1]
+
+    def _value(self, array, i):
+        value = array[i]
+        if value == self.worst:
+            return None
+        else:
+            return float(value)
+
+    def particle(self, i):
+        """Returns a Particle with a copy of the state in row i."""
+        p = Particle(int(self.ids[i]), self.pos[i].copy(), self.vel[i].copy(),
+                self._value(self.value, i))
+        p.iters = int(self.iters[i])
+        p.pbestpos = self.pbestpos[i].copy()
+        p.pbestval = self._value(self.pbestval, i)
+        p.nbestpos = self.nbestpos[i].copy()
+        p.nbestval = self._value(self.nbestval, i)
+        return p
+
+    def set_particle(self, i, p):
+        """Stores the state of the given Particle in row i.
+
+        The arrays are modified in place (they are never replaced), so this
+        also works for arrays in shared memory.
+        """
+        self.ids[i] = p.id
+        self.iters[i] = p.iters
+        self.pos[i] = p.pos
+        self.vel[i] = p.vel
+        self.pbestpos[i] = p.pbestpos
+        self.nbestpos[i] = p.nbestpos
+        for name in ('value', 'pbestval', 'nbestval'):
+            value = getattr(p, name)
+            if value is None:
+                value = self.worst
+            getattr(self, name)[i] = value
+
+    def particles(self):
+        """Returns a list of Particles with a copy of the swarm state."""
+        return [self.particle(i) for i in range(len(self))]
+
+    def take(self, rows):
+        """Returns a new ArraySwarm with a copy of the given rows."""
+        swarm = ArraySwarm.__new__(ArraySwarm)
+        swarm.comparator = self.comparator
+        swarm.worst = self.worst
+        for name in self.arrays:
+            setattr(swarm, name, getattr(self, name)[rows])
+        return swarm
+
+    def put(self, rows, swarm):
+        """Stores the state of the given ArraySwarm in the given rows."""
+        for name in self.arrays:
+            getattr(self, name)[rows] = getattr(swarm, name)
+
+    def best_index(self):
+        """Returns the row of the particle with the best pbestval.
+
+        Ties go to the first such particle, as in `StandardPSO.findbest`.
+        """
+        return int(np.argmin(sort_key(self.pbestval, self.comparator)))
+
+    def best(self):
+        """Returns a Particle copy of the particle with the best pbestval."""
+        return self.particle(self.best_index())
+
+    def update(self, newpos, newvel, newval):
+        """Uses the given positions, velocities, and values for every particle.
+
+        This is the array counterpart of `Particle.update`.  Returns a boolean
+        array that is True for particles whose pbest improved.
+        """
+        self.pos = newpos
+        self.vel = newvel
+        self.value = newval
+        self.iters += 1
+        improved = self.comparator(newval, self.pbestval)
+        self.pbestval[improved] = newval[improved]
+        self.pbestpos[improved] = newpos[improved]
+        return improved
+
+    def nbest_cands(self, senders, recipients, positions, values):
+        """Offers a candidate nbest to each recipient.
+
+        The parallel arrays `senders` and `recipients` list the messages in
+        the order that they would be sent one at a time.  Messages carry
+        `positions[senders[k]]` and `values[senders[k]]`, so these are usually
+        `pbestpos` and `pbestval`.  As with `Particle.nbest_cand`, a
+        recipient's nbest only changes if a message is strictly better.
+        """
+        candidates = values[senders]
+        dests, winners = neighborhood_best(senders, recipients, candidates,
+                self.comparator)
+        better = self.comparator(candidates[winners], self.nbestval[dests])
+        dests = dests[better]
+        winners = senders[winners[better]]
+        self.nbestval[dests] = values[winners]
+        self.nbestpos[dests] = positions[winners]
+
+    def gbest_cands(self, senders, positions, values, selflink=True,
+            rows=None):
+        """Offers candidates as if every particle received every message.
+
+        This gives the same result as `nbest_cands` for a complete topology
+        but without listing num messages per recipient: every particle gets
+        the best message, except that if `selflink` is False, the sender of
+        the best message gets the best message from any other particle.  The
+        arguments are as in `nbest_cands`, and a message from sender s is
+        owned by particle `s % len(self)`.  If `rows` is given, only those
+        particles receive messages.
+        """
+        num = len(self)
+        if not len(senders):
+            return
+        candidates = values[senders]
+        # A stable sort keeps ties in message order.
+        order = np.argsort(sort_key(candidates, self.comparator),
+                kind='mergesort')
+        winners = np.empty(num, dtype=int)
+        winners.fill(order[0])
+        dests = np.arange(num)
+        if not selflink:
+            owners = senders[order] % num
+            owner = owners[0]
+            others = np.flatnonzero(owners != owner)
+            if len(others):
+                winners[owner] = order[others[0]]
+            else:
+                dests = dests[dests != owner]
+                winners = winners[dests]
+        if rows is not None:
+            keep = np.in1d(dests, rows)
+            dests = dests[keep]
+            winners = winners[keep]
+
+        better = self.comparator(candidates[winners], self.nbestval[dests])
+        dests = dests[better]
+        winners = senders[winners[better]]
+        self.nbestval[dests] = values[winners]
+        self.nbestpos[dests] = positions[winners]
+
+    def group_best_cands(self, groups, senders, positions, values,
+            selflink=True):
+        """Offers candidates as if each particle received every message from
+        its own group.
+
+        This is `gbest_cands` for a swarm made of several independent swarms
+        (e.g., subswarms), where `groups[i]` is the group of row i.  As in
+        `gbest_cands`, a message from sender s is owned by particle
+        `s % len(self)`, and it is sent to the particles in its owner's group.
+        """
+        num = len(self)
+        if not len(senders):
+            return
+        candidates = values[senders]
+        owners = senders % num
+        message_groups = groups[owners]
+        # The best message in each group (ties go to the earliest).
+        best_groups, best = neighborhood_best(senders, message_groups,
+                candidates, self.comparator)
+        winners = np.empty(groups.max() + 1, dtype=int)
+        winners.fill(-1)
+        winners[best_groups] = best
+        row_winners = winners[groups]
+        if not selflink:
+            # The owner of each group's best message gets the best message
+            # from any other particle in the group.
+            best_owners = np.empty(len(winners), dtype=int)
+            best_owners.fill(-1)
+            best_owners[best_groups] = owners[best]
+            others = np.flatnonzero(owners != best_owners[message_groups])
+            second_groups, second = neighborhood_best(senders[others],
+                    message_groups[others], candidates[others],
+                    self.comparator)
+            runners_up = np.empty(len(winners), dtype=int)
+            runners_up.fill(-1)
+            runners_up[second_groups] = others[second]
+            owner_rows = best_owners[best_groups]
+            row_winners[owner_rows] = runners_up[best_groups]
+
+        dests = np.flatnonzero(row_winners >= 0)
+        winners = row_winners[dests]
+        better = self.comparator(candidates[winners], self.nbestval[dests])
+        dests = dests[better]
+        winners = senders[winners[better]]
+        self.nbestval[dests] = values[winners]
+        self.nbestpos[dests] = positions[winners]
+
+
+class MessageBlock(object):
+    """The messages from one block of particles to particles in another.
+
+    There is at most one message per recipient: `recipients` holds the ids
+    of the recipients, and row i of `positions` and `values` is the message
+    to `recipients[i]`.  The `sender` is the id of the sending block, which
+    orders the blocks of messages to a recipient (see `ArraySwarm`).
+    """
+    def __init__(self, sender, recipients, positions, values):
+        self.sender = sender
+        self.recipients = np.asarray(recipients, dtype=int)
+        self.positions = np.asarray(positions, dtype=float)
+        self.values = np.asarray(values, dtype=float)
+
+    def __len__(self):
+        return len(self.recipients)
+
+    @classmethod
+    def concatenate(cls, blocks):
+        """Returns (recipients, positions, values) for all of the blocks.
+
+        The messages are in order of the sending block's id, so with
+        `ArraySwarm.nbest_cands`, ties go to the block with the lowest id.
+        """
+        blocks = sorted(blocks, key=lambda m: m.sender)
+        return (np.concatenate([m.recipients for m in blocks]),
+                np.concatenate([m.positions for m in blocks]),
+                np.concatenate([m.values for m in blocks]))
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+"""Asynchronous (steady-state) PSO for expensive function evaluations.
+
+In the synchronous Bypass implementation, every particle waits for the
+slowest evaluation of the iteration before any communication happens.  Here
+the evaluations run in a pool of threads, and each particle is handled on its
+own: as soon as its evaluation returns, the particle is updated, its pbest is
+sent to its neighbors, and it is moved (with whatever its neighbors have
+reported so far) and submitted again.  Threads are useful whenever the
+function releases the GIL while it waits, as with external programs (see
+`functions.external.StdinPool`) or `sphere.SleepSphere`.
+
+By default, results are processed in the order that evaluations complete, so
+runs depend on timing and are not reproducible.  With `--deterministic`,
+results are instead processed in the order that they were submitted, which
+depends only on the seed (at the cost of holding fast results behind slow
+ones).
+"""
+
+from __future__ import division
+
+import sys
+import threading
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+from mrs import param
+
+from . import standardpso
+
+try:
+    range = xrange
+except NameError:
+    pass
+
+
+class AsyncPSO(standardpso.StandardPSO):
+    # StandardPSO options that AsyncPSO's loop does not use.
+    IGNORED_OPTIONS = (
+            ('checkpoint', '--checkpoint'),
+            ('resume', '--resume'),
+            ('vectorized', '--vectorized'),
+            ('processes', '--processes'),
+            ('block_size', '--block-size'),
+            ('broadcast_gbest', '--broadcast-gbest'),
+            )
+
+    def __init__(self, opts, args):
+        super(AsyncPSO, self).__init__(opts, args)
+        if 'locality' in param.import_object(opts.out).args:
+            raise ValueError('AsyncPSO does not use MapReduce tasks, so it'
+                    ' cannot report locality (output.Locality)')
+        for dest, option in self.IGNORED_OPTIONS:
+            if getattr(opts, dest):
+                raise ValueError('AsyncPSO does not support %s' % option)
+
+    ##########################################################################
+    # Bypass Implementation
+
+    def bypass_run(self):
+        """Performs asynchronous PSO without MapReduce.
+
+        The total number of evaluations is the same as in the synchronous
+        version (iters times the number of particles).  An "iteration" for
+        output purposes is complete once that many evaluations per particle
+        have been processed, regardless of which particles they came from.
+        With --max-evals, the total is at most that budget.
+        """
+        comp = self.function.comparator
+        topology = self.topology
+        num = topology.num
+        total = self.opts.iters * num
+        if self.opts.max_evals:
+            total = min(total, self.opts.max_evals)
+
+        # Create the Population.
+        particles = []
+        for i in range(num):
+            rand = self.initialization_rand(i)
+            p = topology.newparticle(i, rand)
+            particles.append(p)
+
+        tasks = queue.Queue()
+        results = queue.Queue()
+        workers = []
+        for i in range(self.opts.threads):
+            worker = threading.Thread(target=self.evaluation_worker,
+                    args=(tasks, results))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+
+        try:
+            submitted = 0
+            for p in particles:
+                tasks.put(self.async_task(submitted, p))
+                submitted += 1
+
+            processed = 0
+            for p, newpos, newvel, value in self.async_results(results, total):
+                p.update(newpos, newvel, value, comp)
+                processed += 1
+
+                # Communication phase (for this particle only).
+                rand = self.neighborhood_rand(p)
+                for i in topology.iterneighbors(p, rand):
+                    neighbor = particles[i]
+                    neighbor.nbest_cand(p.pbestpos, p.pbestval, comp)
+                    if self.opts.transitive_best:
+                        neighbor.nbest_cand(p.nbestpos, p.nbestval, comp)
+
+                if submitted < total:
+                    tasks.put(self.async_task(submitted, p))
+                    submitted += 1
+
+                # Output phase.  (If freq is 5, output after iters 1, 6, 11,
+                # and when the budget runs out.)
+                exhausted = self.budget_exhausted(processed)
+                if processed % num and not exhausted:
+                    continue
+                iteration = -(-processed // num)
+                if self.output.freq and (exhausted or not ((iteration - 1) %
+                        self.output.freq)):
+                    # In completion order, a slow particle might not have
+                    # been evaluated yet.
+                    evaluated = [p for p in particles if p.iters]
+                    kwds = {}
+                    if 'iteration' in self.output.args:
+                        kwds['iteration'] = iteration
+                    if 'evals' in self.output.args:
+                        kwds['evals'] = processed
+                    if 'particles' in self.output.args:
+                        kwds['particles'] = particles
+                    if 'best' in self.output.args:
+                        kwds['best'] = self.findbest(evaluated)
+                    if 'profile' in self.output.args:
+                        kwds['profile'] = self.profiler
+                    self.output(**kwds)
+                    if self.stop_condition(evaluated):
+                        self.output.success()
+                        return
+                if exhausted:
+                    return
+        finally:
+            # Drop any evaluations that haven't started and stop the workers.
+            try:
+                while True:
+                    tasks.get_nowait()
+            except queue.Empty:
+                pass
+            for worker in workers:
+                tasks.put(None)
+            for worker in workers:
+                worker.join()
+
+    def async_task(self, seq, p):
+        """Moves the particle and returns a task for its evaluation.
+
+        The particle itself is not updated until the evaluation is processed.
+        """
+        if p.iters > 0:
+            newpos, newvel = self.motion(p, self.motion_rand(p))
+        else:
+            newpos, newvel = p.pos, p.vel
+        return seq, p, newpos, newvel
+
+    def evaluation_worker(self, tasks, results):
+        """Evaluates tasks until it gets None (run in a worker thread)."""
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            seq, p, newpos, newvel = task
+            try:
+                # Note that we cast to float because numpy returns
+                # numpy.float64.
+                value = float(self.function(newpos))
+            except Exception:
+                results.put((seq, sys.exc_info()[1]))
+            else:
+                results.put((seq, (p, newpos, newvel, value)))
+
+    def async_results(self, results, total):
+        """Yields (p, newpos, newvel, value) for each evaluation.
+
+        Results come in completion order unless the deterministic option is
+        set, in which case they are reordered by submission.
+        """
+        deterministic = self.opts.deterministic
+        waiting = {}
+        for next_seq in range(total):
+            if deterministic:
+                while next_seq not in waiting:
+                    seq, result = results.get()
+                    waiting[seq] = result
+                seq = next_seq
+                result = waiting.pop(seq)
+            else:
+                seq, result = results.get()
+            if isinstance(result, Exception):
+                raise result
+            yield result
+
+    ##########################################################################
+    # MapReduce Implementation
+
+    def run(self, job):
+        raise NotImplementedError('AsyncPSO only supports the Bypass'
+                ' implementation')
+
+    @classmethod
+    def update_parser(cls, parser):
+        """Adds asynchronous PSO options to an OptionParser instance."""
+        parser = standardpso.StandardPSO.update_parser(parser)
+
+        parser.add_option('--threads',
+                dest='threads', type='int',
+                help='Number of threads for concurrent function evaluations',
+                default=4,
+                )
+        parser.add_option('--deterministic',
+                dest='deterministic', action='store_true',
+                help='Process evaluations in submission order instead of'
+                ' completion order (reproducible, but slower)',
+                default=False,
+                )
+        return parser
+
+
+# vim: et sw=4 sts=4
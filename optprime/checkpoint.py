@@ -0,0 +1,131 @@
+"""Checkpoints of the state of a Bypass run.
+
+Every Random used by PSO is derived from the Mrs seed and the particle ids
+and iteration counts, so the complete state of a run is the seed, the
+iteration counter, and the particles (or swarms).  A checkpoint stores these
+in a compact binary format: a fixed header followed by length-prefixed
+records from `codec.dumps`.  Resuming from a checkpoint gives the same
+results as if the run had never stopped.
+
+>>> from numpy import array
+>>> from optprime.particle import Particle
+>>> p = Particle(3, array((1.0, 2.0)), array((0.0, 0.0)))
+>>> iteration, seed, objects = loads(dumps(12, 42, [p]))
+>>> iteration, seed, objects[0].id, list(objects[0].pos)
+(12, 42, 3, [1.0, 2.0])
+>>>
+"""
+
+from __future__ import division
+
+import os
+import struct
+import threading
+
+from . import codec
+from .randstream import seed_key
+
+MAGIC = b'OPCK'
+VERSION = 1
+# magic, version, iteration, folded seed, number of records
+HEADER = struct.Struct('<4sBqQI')
+RECORD_SIZE = struct.Struct('<I')
+
+
+def fold_seed(seed):
+    """Folds a Mrs seed (an int or a string of digits) into 64 bits."""
+    low, high = (int(x) for x in seed_key(seed))
+    return (high << 32) | low
+
+
+def dumps(iteration, seed, objects):
+    """Serializes the state of a run to bytes.
+
+    The objects are Particles, Swarms, or anything else that `codec.dumps`
+    accepts.
+    """
+    chunks = [HEADER.pack(MAGIC, VERSION, iteration, fold_seed(seed),
+        len(objects))]
+    for obj in objects:
+        data = codec.dumps(obj)
+        chunks.append(RECORD_SIZE.pack(len(data)))
+        chunks.append(data)
+    return b''.join(chunks)
+
+
+def loads(data):
+    """Returns the (iteration, folded seed, objects) in a checkpoint."""
+    magic, version, iteration, seed, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('Not a version %s checkpoint' % VERSION)
+    offset = HEADER.size
+    objects = []
+    for i in range(count):
+        size, = RECORD_SIZE.unpack_from(data, offset)
+        offset += RECORD_SIZE.size
+        objects.append(codec.loads(data[offset:offset + size]))
+        offset += size
+    return iteration, seed, objects
+
+
+def load(path, seed):
+    """Reads the checkpoint at the given path.
+
+    Returns the iteration and objects.  Raises a ValueError if the checkpoint
+    was made with a different seed, since the run could not be reproduced.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    iteration, saved_seed, objects = loads(data)
+    if saved_seed != fold_seed(seed):
+        raise ValueError('Checkpoint %s was made with a different seed'
+                % path)
+    return iteration, objects
+
+
+class CheckpointWriter(object):
+    """Writes checkpoints to a file in a background thread.
+
+    The state is serialized by `write` (so the caller may continue to modify
+    it), and only the disk I/O happens in the background.  Each checkpoint is
+    written to a temporary file which then replaces the previous checkpoint,
+    so a crash while writing leaves the last complete checkpoint in place.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._thread = None
+        self._error = None
+
+    def write(self, iteration, seed, objects):
+        data = dumps(iteration, seed, objects)
+        self.wait()
+        self._thread = threading.Thread(target=self._write, args=(data,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _write(self, data):
+        tmp_path = self.path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_path, self.path)
+        except EnvironmentError as e:
+            self._error = e
+
+    def wait(self):
+        """Waits for the current write, if any, to finish.
+
+        Raises any error from the previous write.
+        """
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._error is not None:
+            error = self._error
+            self._error = None
+            raise error
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,393 @@
+"""Compact binary serialization for particles, messages, and swarms.
+
+Pickling a Particle copies its `__dict__` and converts four arrays to
+strings, so every record in a MapReduce dataset carries the attribute names
+and pickle opcodes along with the data.  This module instead writes a fixed
+header (type tag, flags, id, iters, values) followed by the float64 arrays as
+one contiguous payload.  The blocks of `--block-size` (an ArraySwarm and
+MessageBlocks) are already arrays, so they are written as a header followed
+by each array's bytes.  Objects that do not fit the fixed layouts (e.g., a
+BranchParticle with SpecEx's tokens) are pickled, so any record can be
+round-tripped.
+
+>>> from numpy import array
+>>> p = Particle(42, array((1.0, 2.0)), array((3.0, 4.0)))
+>>> p.iters = 7
+>>> p.pbestval = -1.5
+>>> q = loads(dumps(p))
+>>> q.id, q.iters, q.value, q.pbestval, list(q.vel)
+(42, 7, None, -1.5, [3.0, 4.0])
+>>>
+"""
+
+from __future__ import division
+
+import struct
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+import operator
+
+from .arrayswarm import ArraySwarm, MessageBlock
+from .particle import Particle, Message, SEParticle, BranchParticle, Swarm
+from .particle import EvalCount
+
+# Type tags (the first byte of each record).
+PICKLE_TAG = b'\x00'
+PARTICLE_TAG = b'\x01'
+MESSAGE_TAG = b'\x02'
+SEPARTICLE_TAG = b'\x03'
+BRANCHPARTICLE_TAG = b'\x04'
+SWARM_TAG = b'\x05'
+ARRAYSWARM_TAG = b'\x06'
+MESSAGEBLOCK_TAG = b'\x07'
+EVALCOUNT_TAG = b'\x08'
+
+# Flag bits for values that are None.
+VALUE_NONE = 1
+PBESTVAL_NONE = 2
+NBESTVAL_NONE = 4
+# Flag bit for a boolean extra field (specpbest or lastbranch[0]).
+EXTRA_TRUE = 8
+# Flag bit for values that are numpy.float64 rather than float.
+NUMPY_VALUES = 16
+
+# tag, flags, id, iters, dims, value, pbestval, nbestval, extra int
+PARTICLE_HEADER = struct.Struct('<cBqqIdddq')
+# tag, flags, sender, dims, value
+MESSAGE_HEADER = struct.Struct('<cBqId')
+# tag, id, number of particles, dims
+SWARM_HEADER = struct.Struct('<cqII')
+# tag, maximize, number of particles, dims
+ARRAYSWARM_HEADER = struct.Struct('<c?II')
+# tag, sender, number of messages, dims
+MESSAGEBLOCK_HEADER = struct.Struct('<cqII')
+# tag, evals
+EVALCOUNT_HEADER = struct.Struct('<cq')
+# The per-particle headers of a swarm are stored as one array.
+SWARM_PARTICLE_DTYPE = np.dtype([('flags', '<u1'), ('id', '<i8'),
+    ('iters', '<i8'), ('value', '<f8'), ('pbestval', '<f8'),
+    ('nbestval', '<f8')])
+
+PARTICLE_ARRAYS = ('pos', 'vel', 'pbestpos', 'nbestpos')
+
+FLOAT64 = np.dtype('<f8')
+INT64 = np.dtype('<i8')
+
+
+def dumps(obj):
+    """Serializes a Particle, Message, SEParticle, Swarm, ArraySwarm,
+    MessageBlock, or EvalCount to bytes."""
+    cls = type(obj)
+    data = None
+    if cls is Particle:
+        data = _dump_particle(obj, PARTICLE_TAG)
+    elif cls is Message:
+        data = _dump_message(obj)
+    elif cls is Swarm:
+        data = _dump_swarm(obj)
+    elif cls is SEParticle:
+        data = _dump_particle(obj, SEPARTICLE_TAG)
+    elif cls is BranchParticle:
+        data = _dump_particle(obj, BRANCHPARTICLE_TAG)
+    elif cls is ArraySwarm:
+        data = _dump_arrayswarm(obj)
+    elif cls is MessageBlock:
+        data = _dump_messageblock(obj)
+    elif cls is EvalCount:
+        data = _dump_evalcount(obj)
+    if data is None:
+        data = PICKLE_TAG + pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    return data
+
+
+def loads(data):
+    """Deserializes an object from bytes produced by `dumps`."""
+    tag = data[:1]
+    if tag == PARTICLE_TAG:
+        return _load_particle(data)
+    elif tag == MESSAGE_TAG:
+        return _load_message(data)
+    elif tag == SWARM_TAG:
+        return _load_swarm(data)
+    elif tag == SEPARTICLE_TAG or tag == BRANCHPARTICLE_TAG:
+        return _load_particle(data)
+    elif tag == ARRAYSWARM_TAG:
+        return _load_arrayswarm(data)
+    elif tag == MESSAGEBLOCK_TAG:
+        return _load_messageblock(data)
+    elif tag == EVALCOUNT_TAG:
+        return _load_evalcount(data)
+    elif tag == PICKLE_TAG:
+        return pickle.loads(data[1:])
+    else:
+        raise ValueError('Unknown record tag: %r' % tag)
+
+
+def _is_value(value):
+    # Other numbers (e.g., ints) are pickled so that they keep their type.
+    return value is None or isinstance(value, float)
+
+
+def _encode_values(*values):
+    """Returns the flags and float values for the given values.
+
+    Returns None for the flags if the values are a mix of float and
+    numpy.float64, since they could not be restored with the right types.
+    """
+    flags = 0
+    floats = []
+    types = set()
+    for bit, value in zip((VALUE_NONE, PBESTVAL_NONE, NBESTVAL_NONE), values):
+        if value is None:
+            flags |= bit
+            floats.append(0.0)
+        else:
+            types.add(type(value))
+            floats.append(value)
+    if types == set((np.float64,)):
+        flags |= NUMPY_VALUES
+    elif len(types) > 1:
+        return None, floats
+    return flags, floats
+
+
+def _decode_value(flags, bit, value):
+    if flags & bit:
+        return None
+    elif flags & NUMPY_VALUES:
+        return np.float64(value)
+    else:
+        return value
+
+
+def _payload(arrays, dims):
+    """Returns the arrays as float64 bytes, or None if they don't fit."""
+    for a in arrays:
+        if (not isinstance(a, np.ndarray) or a.dtype != FLOAT64
+                or a.shape != (dims,)):
+            return None
+    return np.concatenate(arrays).tostring()
+
+
+def _has_extras(obj):
+    """Finds whether attributes other than the slots are set."""
+    return bool(getattr(obj, '__dict__', None))
+
+
+def _particle_fits(p):
+    """Finds whether the particle's state fits a fixed layout."""
+    return (not _has_extras(p)
+            and isinstance(p.pos, np.ndarray) and p.pos.ndim == 1
+            and _is_value(p.value) and _is_value(p.pbestval)
+            and _is_value(p.nbestval))
+
+
+def _dump_particle(p, tag):
+    if not _particle_fits(p):
+        return None
+    dims = len(p.pos)
+    payload = _payload([getattr(p, name) for name in PARTICLE_ARRAYS], dims)
+    if payload is None:
+        return None
+
+    flags, values = _encode_values(p.value, p.pbestval, p.nbestval)
+    if flags is None:
+        return None
+    extra = 0
+    if tag == SEPARTICLE_TAG:
+        if p.specpbest:
+            flags |= EXTRA_TRUE
+        extra = p.specnbestid
+    elif tag == BRANCHPARTICLE_TAG:
+        if p.lastbranch[0]:
+            flags |= EXTRA_TRUE
+        extra = p.lastbranch[1]
+
+    header = PARTICLE_HEADER.pack(tag, flags, p.id, p.iters, dims, values[0],
+            values[1], values[2], extra)
+    return header + payload
+
+
+def _load_particle(data):
+    (tag, flags, id, iters, dims, value, pbestval, nbestval,
+            extra) = PARTICLE_HEADER.unpack_from(data)
+    arrays = np.frombuffer(data, FLOAT64, 4 * dims,
+            PARTICLE_HEADER.size).reshape(4, dims).copy()
+    if tag == BRANCHPARTICLE_TAG:
+        p = BranchParticle(id, arrays[0], arrays[1])
+        p.lastbranch = [bool(flags & EXTRA_TRUE), extra]
+    else:
+        p = Particle(id, arrays[0], arrays[1])
+        if tag == SEPARTICLE_TAG:
+            p = SEParticle(p, bool(flags & EXTRA_TRUE), extra)
+    p.iters = iters
+    p.value = _decode_value(flags, VALUE_NONE, value)
+    p.pbestpos = arrays[2]
+    p.pbestval = _decode_value(flags, PBESTVAL_NONE, pbestval)
+    p.nbestpos = arrays[3]
+    p.nbestval = _decode_value(flags, NBESTVAL_NONE, nbestval)
+    return p
+
+
+def _dump_message(m):
+    if _has_extras(m) or not _is_value(m.value):
+        return None
+    position = m.position
+    if not isinstance(position, np.ndarray) or position.ndim != 1:
+        return None
+    dims = len(position)
+    payload = _payload([position], dims)
+    if payload is None:
+        return None
+
+    flags, values = _encode_values(m.value)
+    if flags is None:
+        return None
+    header = MESSAGE_HEADER.pack(MESSAGE_TAG, flags, m.sender, dims,
+            values[0])
+    return header + payload
+
+
+def _load_message(data):
+    tag, flags, sender, dims, value = MESSAGE_HEADER.unpack_from(data)
+    position = np.frombuffer(data, FLOAT64, dims, MESSAGE_HEADER.size).copy()
+    return Message(sender, position, _decode_value(flags, VALUE_NONE, value))
+
+
+def _dump_swarm(s):
+    """Writes a swarm of plain Particles as a header array and one payload.
+
+    Swarms with any other kind of particle are pickled.
+    """
+    if _has_extras(s) or not len(s.particles):
+        return None
+    particles = s.particles
+    first = particles[0]
+    if type(first) is not Particle or not _particle_fits(first):
+        return None
+    dims = len(first.pos)
+
+    headers = np.zeros(len(particles), dtype=SWARM_PARTICLE_DTYPE)
+    arrays = []
+    for i, p in enumerate(particles):
+        if type(p) is not Particle or not _particle_fits(p):
+            return None
+        flags, values = _encode_values(p.value, p.pbestval, p.nbestval)
+        if flags is None:
+            return None
+        headers[i] = (flags, p.id, p.iters, values[0], values[1], values[2])
+        arrays.extend(getattr(p, name) for name in PARTICLE_ARRAYS)
+    payload = _payload(arrays, dims)
+    if payload is None:
+        return None
+
+    header = SWARM_HEADER.pack(SWARM_TAG, s.id, len(particles), dims)
+    return header + headers.tostring() + payload
+
+
+def _load_swarm(data):
+    tag, sid, num, dims = SWARM_HEADER.unpack_from(data)
+    offset = SWARM_HEADER.size
+    headers = np.frombuffer(data, SWARM_PARTICLE_DTYPE, num, offset)
+    offset += headers.nbytes
+    arrays = np.frombuffer(data, FLOAT64, num * 4 * dims,
+            offset).reshape(num, 4, dims).copy()
+
+    particles = []
+    for (flags, id, iters, value, pbestval, nbestval), rows in zip(
+            headers.tolist(), arrays):
+        p = Particle(id, rows[0], rows[1])
+        p.iters = iters
+        p.value = _decode_value(flags, VALUE_NONE, value)
+        p.pbestpos = rows[2]
+        p.pbestval = _decode_value(flags, PBESTVAL_NONE, pbestval)
+        p.nbestpos = rows[3]
+        p.nbestval = _decode_value(flags, NBESTVAL_NONE, nbestval)
+        particles.append(p)
+    return Swarm(sid, particles)
+
+
+def _dump_arrayswarm(s):
+    """Writes each of the swarm's arrays in turn (see `ArraySwarm.arrays`).
+
+    Swarms with extra attributes or an unusual comparator are pickled.
+    """
+    if s.comparator not in (operator.lt, operator.gt):
+        return None
+    if set(vars(s)) != set(ArraySwarm.arrays + ('comparator', 'worst')):
+        return None
+    num, dims = s.pos.shape
+    header = ARRAYSWARM_HEADER.pack(ARRAYSWARM_TAG,
+            s.comparator is operator.gt, num, dims)
+    chunks = [header]
+    for name in ArraySwarm.arrays:
+        array = getattr(s, name)
+        dtype = INT64 if name in ('ids', 'iters') else FLOAT64
+        chunks.append(np.ascontiguousarray(array, dtype=dtype).tostring())
+    return b''.join(chunks)
+
+
+def _load_arrayswarm(data):
+    tag, maximize, num, dims = ARRAYSWARM_HEADER.unpack_from(data)
+    comparator = operator.gt if maximize else operator.lt
+    offset = ARRAYSWARM_HEADER.size
+    arrays = {}
+    for name in ArraySwarm.arrays:
+        if name in ('ids', 'iters'):
+            dtype, shape = INT64, (num,)
+        elif name in ('value', 'pbestval', 'nbestval'):
+            dtype, shape = FLOAT64, (num,)
+        else:
+            dtype, shape = FLOAT64, (num, dims)
+        array = np.frombuffer(data, dtype, int(np.prod(shape)), offset)
+        arrays[name] = array.reshape(shape).astype(
+                int if dtype is INT64 else float)
+        offset += array.nbytes
+    s = ArraySwarm(arrays['ids'], arrays['pos'], arrays['vel'], comparator)
+    for name in ArraySwarm.arrays:
+        setattr(s, name, arrays[name])
+    return s
+
+
+def _dump_messageblock(m):
+    if set(vars(m)) != set(('sender', 'recipients', 'positions', 'values')):
+        return None
+    count, dims = m.positions.shape
+    header = MESSAGEBLOCK_HEADER.pack(MESSAGEBLOCK_TAG, m.sender, count, dims)
+    return b''.join((header,
+        np.ascontiguousarray(m.recipients, dtype=INT64).tostring(),
+        np.ascontiguousarray(m.values, dtype=FLOAT64).tostring(),
+        np.ascontiguousarray(m.positions, dtype=FLOAT64).tostring()))
+
+
+def _load_messageblock(data):
+    tag, sender, count, dims = MESSAGEBLOCK_HEADER.unpack_from(data)
+    offset = MESSAGEBLOCK_HEADER.size
+    recipients = np.frombuffer(data, INT64, count, offset).astype(int)
+    offset += count * INT64.itemsize
+    values = np.frombuffer(data, FLOAT64, count, offset).copy()
+    offset += count * FLOAT64.itemsize
+    positions = np.frombuffer(data, FLOAT64, count * dims,
+            offset).reshape(count, dims).copy()
+    return MessageBlock(sender, recipients, positions, values)
+
+
+def _dump_evalcount(c):
+    return EVALCOUNT_HEADER.pack(EVALCOUNT_TAG, c.evals)
+
+
+def _load_evalcount(data):
+    tag, evals = EVALCOUNT_HEADER.unpack_from(data)
+    return EvalCount(evals)
+
+
+# vim: et sw=4 sts=4
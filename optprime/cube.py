@@ -1,45 +1,114 @@
 from __future__ import division
 
 try:
-    from numpy import array
+    import numpy as np
 except ImportError:
-    from numpypy import array
+    import numpypy as np
 
-try:
-    from itertools import izip as zip
-except ImportError:
-    pass
+from .randstream import CounterRandom, StreamBatch
 
 try:
     range = xrange
 except NameError:
     pass
 
+# Ways to bring a vector that has left the cube back inside (see `constrain`).
+BOUNDARY_MODES = ('clamp', 'reflect', 'wrap')
+
 
 class Cube(object):
     def __init__(self, constraints):
         """Creates a new cube object.  Requires constraints at a minimum,
         but also allows values (of unspecified format) to be passed in."""
-        self.constraints = array(constraints)
+        self.constraints = np.array(constraints)
         self.center = (self.constraints[:, 1] - self.constraints[:, 0]) / 2
         self.lengths = abs(self.constraints[:, 1] - self.constraints[:, 0])
         self.dims = len(constraints)
+        self.lows = self.constraints[:, 0].astype(float)
+        self.highs = self.constraints[:, 1].astype(float)
 
     def random_vec(self, rand):
         """Return a random vector within the constraints of this cube.
+
+        The values are the same as from calling `rand.uniform` for each
+        dimension in turn.
+        """
+        if isinstance(rand, CounterRandom):
+            return rand.uniform_array(self.lows, self.highs, self.dims)
+        units = np.array([rand.random() for i in range(self.dims)])
+        return self.lows + (self.highs - self.lows) * units
+
+    def random_vecs(self, rands):
+        """Return a matrix with a random vector for each of the given Randoms.
+
+        Row i is the same as `random_vec(rands[i])`.  If `rands` is a
+        `randstream.StreamBatch`, all of the rows are drawn at once.
         """
-        return array([rand.uniform(*c) for c in self.constraints])
+        if isinstance(rands, StreamBatch):
+            return rands.uniform(self.lows, self.highs, self.dims)
+        vecs = np.empty((len(rands), self.dims))
+        for i, rand in enumerate(rands):
+            vecs[i] = self.random_vec(rand)
+        return vecs
+
+    def constrain(self, vecs, mode='clamp'):
+        """Returns a copy of the vector(s) brought within the constraints.
+
+        The argument may be a vector or a matrix with a vector in each row.
+        Values outside the cube are moved to the nearest edge ('clamp'),
+        mirrored back in from the edge that they crossed ('reflect'), or
+        moved in from the opposite edge ('wrap').  Values inside the cube are
+        unchanged.
+
+        >>> c = Cube([(0, 10), (-1, 1)])
+        >>> c.constrain([[12.0, 0.5], [-3.0, -4.5]]).tolist()
+        [[10.0, 0.5], [0.0, -1.0]]
+        >>> c.constrain([[12.0, 0.5], [-3.0, -4.5]], 'reflect').tolist()
+        [[8.0, 0.5], [3.0, -0.5]]
+        >>> c.constrain([[12.0, 0.5], [-3.0, -4.5]], 'wrap').tolist()
+        [[2.0, 0.5], [7.0, -0.5]]
+        >>>
+        """
+        vecs = np.asarray(vecs, dtype=float)
+        if mode == 'clamp':
+            return np.clip(vecs, self.lows, self.highs)
+        elif mode not in BOUNDARY_MODES:
+            raise ValueError('Unknown boundary mode: %s' % mode)
+
+        outside = (vecs < self.lows) | (vecs > self.highs)
+        if not outside.any():
+            return vecs.copy()
+        # A dimension with no width can only be clamped.
+        lengths = np.where(self.lengths > 0, self.lengths, np.inf)
+        offsets = vecs - self.lows
+        if mode == 'reflect':
+            offsets = np.mod(offsets, 2 * lengths)
+            offsets = np.where(offsets > lengths, 2 * lengths - offsets,
+                    offsets)
+        else:
+            offsets = np.mod(offsets, lengths)
+        # Clipping guards against rounding just past an edge.
+        folded = np.clip(self.lows + offsets, self.lows, self.highs)
+        return np.where(outside, folded, vecs)
 
     def constrain_vec(self, vec, use_abs=False):
-        """Changes a vector to be within constraints"""
-        for i, v in enumerate(vec):
-            l, r = self.constraints[i]
-            if use_abs:
-                length = abs(l-r)
-                vsize = abs(v)
-                if vsize > length:
-                    vec[i] = v * length/vsize
+        """Changes a vector (or matrix of row vectors) to be within
+        constraints.
+
+        If use_abs is set, any value whose magnitude is larger than the width
+        of its dimension is scaled down to that width (keeping its sign).
+        Otherwise, values are clamped to the cube.
+        """
+        if use_abs:
+            vsize = abs(vec)
+            scale = vsize > self.lengths
+            if scale.ndim > 1:
+                lengths = np.broadcast_to(self.lengths, vec.shape)[scale]
             else:
-                if v < l: vec[i] = l
-                if v > r: vec[i] = r
+                lengths = self.lengths[scale]
+            vec[scale] = vec[scale] * lengths / vsize[scale]
+        else:
+            np.clip(vec, self.lows, self.highs, out=vec)
+
 
+# vim: et sw=4 sts=4
@@ -0,0 +1,170 @@
+"""Counting and memoizing wrappers for objective functions.
+
+An `EvaluationCounter` counts every evaluation that PSO asks for, so that
+runs can report their cost and stop on an evaluation budget.
+
+Speculative evaluation, the ReproducePSO and PickBestChild methods, and
+subswarm shuffling all evaluate positions that have already been evaluated.
+For a deterministic function, an `EvaluationCache` answers these from a
+bounded table of recent results, keyed by the exact bytes of the position.
+
+>>> from optprime.functions.sphere import Sphere
+>>> f = Sphere()
+>>> f.dims, f.center = 2, '0.5'
+>>> f.setup(None)
+>>> cache = EvaluationCache(f, 2)
+>>> vec = np.array((3.0, 4.0))
+>>> cache(vec), cache(vec), cache.is_opt(cache(vec))
+(25.0, 25.0, False)
+>>> cache.hits, cache.misses
+(2, 1)
+>>> cache.evaluate_batch(np.array(((3.0, 4.0), (0.0, 1.0), (0.0, 1.0))))
+array([25.,  1.,  1.])
+>>> cache.hits, cache.misses
+(3, 3)
+>>>
+"""
+
+from __future__ import division
+
+import collections
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+
+class EvaluationCache(object):
+    """Wraps a function and caches up to `size` of its most recent values.
+
+    All other attributes (e.g., comparator and constraints) are those of the
+    wrapped function.  The `hits` and `misses` counters only count the
+    evaluations done in this process.  The function must be deterministic;
+    functions whose `stochastic` attribute is True should not be wrapped.
+    """
+    def __init__(self, function, size):
+        self.function = function
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._values = collections.OrderedDict()
+        # The cache may be shared by threads (e.g., in AsyncPSO).
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Only called for attributes that the cache itself doesn't have.
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.function, name)
+
+    def _key(self, vec):
+        return np.ascontiguousarray(vec, dtype=float).tostring()
+
+    def _lookup(self, key):
+        """Returns the cached value for the key, or None if it's missing."""
+        with self._lock:
+            value = self._values.pop(key, None)
+            if value is None:
+                self.misses += 1
+            else:
+                # Reinsert the value to mark it as the most recently used.
+                self._values[key] = value
+                self.hits += 1
+            return value
+
+    def _store(self, key, value):
+        with self._lock:
+            self._values[key] = value
+            while len(self._values) > self.size:
+                self._values.popitem(last=False)
+
+    def __call__(self, vec):
+        key = self._key(vec)
+        value = self._lookup(key)
+        if value is None:
+            value = self.function(vec)
+            self._store(key, value)
+        return value
+
+    def evaluate_batch(self, matrix):
+        """Evaluates each row, calling the function's `evaluate_batch` once
+        for all of the rows that are not in the cache.
+        """
+        matrix = np.asarray(matrix)
+        values = np.empty(len(matrix))
+        keys = [self._key(vec) for vec in matrix]
+        missing = []
+        for i, key in enumerate(keys):
+            value = self._lookup(key)
+            if value is None:
+                missing.append(i)
+            else:
+                values[i] = value
+        if missing:
+            new_values = self.function.evaluate_batch(matrix[missing])
+            values[missing] = new_values
+            for i, value in zip(missing, new_values.tolist()):
+                self._store(keys[i], value)
+        return values
+
+    def report(self):
+        """Returns a summary of the hit and miss counts."""
+        return 'Evaluation cache: %s hits, %s misses' % (self.hits,
+                self.misses)
+
+
+class EvaluationCounter(object):
+    """Wraps a function and counts its evaluations.
+
+    Every call counts, as does every row given to `evaluate_batch`, even if
+    the position was evaluated before (or is answered by an EvaluationCache
+    that this wraps).  Only evaluations in this process are counted.  All
+    other attributes are those of the wrapped function.
+
+    >>> from optprime.functions.sphere import Sphere
+    >>> f = Sphere()
+    >>> f.dims, f.center = 2, '0.5'
+    >>> f.setup(None)
+    >>> counter = EvaluationCounter(f)
+    >>> counter(np.array((3.0, 4.0))), counter.is_opt(1.0)
+    (25.0, False)
+    >>> counter.evaluate_batch(np.zeros((3, 2))).tolist()
+    [0.0, 0.0, 0.0]
+    >>> counter.evals
+    4
+    >>>
+    """
+    def __init__(self, function):
+        self.function = function
+        self.evals = 0
+        # The counter may be shared by threads (e.g., in AsyncPSO).
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.function, name)
+
+    def add(self, evals):
+        with self._lock:
+            self.evals += evals
+
+    def collect(self):
+        """Returns the number of evaluations and resets it to zero."""
+        with self._lock:
+            evals = self.evals
+            self.evals = 0
+        return evals
+
+    def __call__(self, vec):
+        self.add(1)
+        return self.function(vec)
+
+    def evaluate_batch(self, matrix):
+        self.add(len(matrix))
+        return self.function.evaluate_batch(matrix)
+
+
+# vim: et sw=4 sts=4
@@ -23,6 +23,10 @@ except NameError:
 
 class BaseFunction(ParamObj):
     """An arbitrary objective function."""
+    # Whether evaluating the same position twice may give different values
+    # (or has side effects that matter), so the values cannot be cached.
+    stochastic = False
+
     _params = dict(
             success=Param(default=10.0**(-10), type='float',
                 doc='Success value (the algorithm stops when reached)'),
@@ -39,6 +43,15 @@ class BaseFunction(ParamObj):
     def __call__(self, vec):
         return 0
 
+    def evaluate_batch(self, matrix):
+        """Evaluates the function at each row of the given matrix.
+
+        Returns an array of values.  This default implementation calls the
+        function once per row, so subclasses should override it with a
+        vectorized version where possible.
+        """
+        return np.array([self(vec) for vec in matrix], dtype=float)
+
     def is_opt(self, value):
         """Determines whether the value is officially optimal.
 
@@ -107,6 +120,17 @@ class Benchmark(BaseFunction):
             vec = np.squeeze(rotated)
         return self._standard_call(vec)
 
+    def evaluate_batch(self, matrix):
+        """Evaluates the function at each row of the given matrix.
+
+        The shift and rotation are applied to the whole matrix at once before
+        calling `_standard_batch`.
+        """
+        matrix = np.asarray(matrix) - self.abscenter
+        if self._sep_matrix is not None:
+            matrix = np.dot(matrix, self._sep_matrix.T)
+        return self._standard_batch(matrix)
+
     def _standard_call(self, vec):
         """Evaluate the function in its standard form.
 
@@ -114,3 +138,13 @@ class Benchmark(BaseFunction):
         method should be overridden.
         """
         return 0
+
+    def _standard_batch(self, matrix):
+        """Evaluate the function in its standard form for each row.
+
+        This is the batch counterpart of `_standard_call`.  It falls back to
+        calling `_standard_call` once per row, so it should be overridden with
+        a vectorized version where possible.
+        """
+        return np.array([self._standard_call(vec) for vec in matrix],
+                dtype=float)
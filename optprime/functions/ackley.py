@@ -4,6 +4,11 @@ from math import e, exp, sqrt, cos, pi
 
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 
 class Ackley(Benchmark):
     _each_constraints = (-32.768, 32.768)
@@ -15,3 +20,10 @@ class Ackley(Benchmark):
         # Add up the cosine thingy
         s2 = sum(imap(lambda x,c: cos(2*pi*(x-c)), vec, self.abscenter))
         return 20 + e + -20 * exp(-0.2 * sqrt(s1/n)) - exp(s2/n)
+
+    def evaluate_batch(self, matrix):
+        n = self.dims
+        shifted = np.asarray(matrix) - self.abscenter
+        s1 = (shifted ** 2).sum(axis=1)
+        s2 = np.cos(2*pi*shifted).sum(axis=1)
+        return 20 + e + -20 * np.exp(-0.2 * np.sqrt(s1/n)) - np.exp(s2/n)
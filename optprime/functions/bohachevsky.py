@@ -3,6 +3,11 @@ from math import cos, pi
 
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 
 class Bohachevsky(Benchmark):
     _each_constraints = (-15, 15)
@@ -17,3 +22,10 @@ class Bohachevsky(Benchmark):
             sum += x**2 + 2*vec[i+1]**2-.3*cos(3*pi*x) - .4*cos(4*pi*vec[i+1])
             sum += .7
         return sum
+
+    def _standard_batch(self, matrix):
+        # Each element is paired with the next one (wrapping around).
+        following = np.roll(matrix, -1, axis=1)
+        terms = (matrix**2 + 2*following**2 - .3*np.cos(3*pi*matrix)
+                - .4*np.cos(4*pi*following) + .7)
+        return terms.sum(axis=1)
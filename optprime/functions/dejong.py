@@ -1,6 +1,11 @@
 from __future__ import division
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     from itertools import izip as zip
 except ImportError:
@@ -15,3 +20,6 @@ class DeJongF4(Benchmark):
         for i, v in enumerate(vec):
             s += (i+1) * v**4
         return s
+
+    def _standard_batch(self, matrix):
+        return (np.arange(1, self.dims + 1) * matrix**4).sum(axis=1)
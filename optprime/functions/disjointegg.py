@@ -1,6 +1,10 @@
 #!/usr/bin/env python2.2
 
 import math
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
 from numpy import array
 from . import BaseFunction
 
@@ -16,3 +20,10 @@ class DisjointEgg(BaseFunction):
 
         return ((2.5-x)**2 + (2.5-y)**2)/10 + math.sin(x*alpha) * math.cos(y)
 
+    def evaluate_batch(self, matrix):
+        x, y = np.asarray(matrix).T
+
+        alpha = 0.71 * np.trunc(y) + 1.0
+
+        return ((2.5-x)**2 + (2.5-y)**2)/10 + np.sin(x*alpha) * np.cos(y)
+
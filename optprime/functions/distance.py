@@ -20,3 +20,7 @@ class Distance(Benchmark):
     def _standard_call(self, vec):
         s = (abs(vec) ** self.norm).sum()
         return s ** (1/self.norm)
+
+    def _standard_batch(self, matrix):
+        s = (abs(matrix) ** self.norm).sum(axis=1)
+        return s ** (1/self.norm)
@@ -1,4 +1,8 @@
 from math import sin, cos
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
 from . import BaseFunction
 
 class Egg(BaseFunction):
@@ -9,3 +13,7 @@ class Egg(BaseFunction):
     def __call__(self, vec):
         x, y = vec
         return sin(x) * cos(y)
+
+    def evaluate_batch(self, matrix):
+        x, y = np.asarray(matrix).T
+        return np.sin(x) * np.cos(y)
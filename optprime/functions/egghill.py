@@ -1,6 +1,10 @@
 from math import sin, cos
 from . import BaseFunction
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
 from numpy import array
 
 class egghill(BaseFunction):
@@ -15,3 +19,10 @@ class egghill(BaseFunction):
         a = self.alpha
         x, y = vec
         return a * ((1-p) * (sin(x) * cos(y)) - p * ((x/10)**2 + (y/10)**2))
+
+    def evaluate_batch(self, matrix):
+        p = self.p
+        a = self.alpha
+        x, y = np.asarray(matrix).T
+        return a * ((1-p) * (np.sin(x) * np.cos(y))
+                - p * ((x/10)**2 + (y/10)**2))
@@ -1,5 +1,12 @@
 from __future__ import division
 
+import atexit
+import collections
+import os
+import select
+import sys
+import time
+
 from numpy import array
 from . import BaseFunction
 from mrs.param import Param
@@ -27,10 +34,13 @@ class CommandLine(BaseFunction):
             quiet=Param(type='bool',
                 doc="Don't print messages to and from the external program"),
             args=Param(default='',
-                doc="Args to be parsed shell-style and prepended to the command line")
+                doc="Args to be parsed shell-style and prepended to the command line"),
+            stochastic=Param(type='bool',
+                doc='The program may give different values for the same'
+                    ' position (so values are never cached)'),
             )
 
-    def setup(self):
+    def setup(self, rand=None):
         if not self.exe:
             raise RuntimeError('Must supply an external function!')
         if not self.constraintsfile:
@@ -53,7 +63,7 @@ class CommandLine(BaseFunction):
 
         # We call the superclass's setup() after dims is set so it doesn't
         # die.
-        super(CommandLine, self).setup()
+        super(CommandLine, self).setup(rand)
 
         self.constraints = array(constraints)
 
@@ -90,9 +100,9 @@ class Stdin(CommandLine):
                     ' it open'),
             )
 
-    def setup(self):
+    def setup(self, rand=None):
         from subprocess import Popen, PIPE
-        super(Stdin, self).setup()
+        super(Stdin, self).setup(rand)
         if not self.restart:
             self.func_proc = Popen(self.command, stdout=PIPE, stdin=PIPE)
 
@@ -108,3 +118,171 @@ class Stdin(CommandLine):
         if not self.quiet:
             print >> sys.stderr, 'Received from program:',retval
         return float(retval)
+
+
+class StdinPool(CommandLine):
+    """Like Stdin, but with a pool of long-lived evaluator processes.
+
+    Each process must read one line of parameters from stdin and write one
+    line with the function value to stdout, in a loop (as with Stdin).  The
+    positions in a batch (see `evaluate_batch`) are spread across the
+    processes, and up to `depth` requests are written to each process ahead
+    of its results, so the pipe round trips overlap with evaluation.
+
+    A process that exits, or that takes more than `timeout` seconds on a
+    request, is killed and restarted, and its outstanding requests are sent
+    again.  A request that fails more than `retries` times raises an error.
+    """
+
+    _params = dict(
+            processes=Param(default=4, type='int',
+                doc='Number of evaluator processes'),
+            depth=Param(default=2, type='int',
+                doc='Number of requests in flight per process'),
+            timeout=Param(default=0.0, type='float',
+                doc='Seconds to wait for each result (0 for no limit)'),
+            retries=Param(default=2, type='int',
+                doc='Number of times to restart a process and resend a '
+                    'request before giving up'),
+            )
+
+    def setup(self, rand=None):
+        super(StdinPool, self).setup(rand)
+        self.pool = [_Worker(self.command) for _ in range(self.processes)]
+        atexit.register(self.close)
+
+    def close(self):
+        """Stops all of the evaluator processes."""
+        for worker in self.pool:
+            worker.stop()
+
+    def __call__(self, vec):
+        return float(self.evaluate_batch([vec])[0])
+
+    def evaluate_batch(self, matrix):
+        """Evaluates the rows of the matrix concurrently in the pool."""
+        lines = [' '.join(repr(x) for x in vec) + '\n' for vec in matrix]
+        results = array([0.0] * len(lines))
+        attempts = [0] * len(lines)
+        unsent = collections.deque(range(len(lines)))
+        remaining = len(lines)
+
+        while remaining:
+            for worker in self.pool:
+                while unsent and len(worker.pending) < self.depth:
+                    index = unsent.popleft()
+                    if not self.quiet:
+                        sys.stderr.write('Sending to program: %s' %
+                                lines[index])
+                    try:
+                        worker.send(index, lines[index])
+                    except (IOError, OSError):
+                        self._restart(worker, unsent, attempts, 'exited')
+                        break
+
+            busy = dict((w.fd, w) for w in self.pool if w.pending)
+            if not busy:
+                # Every send failed (the processes had exited before this
+                # batch).  They have been restarted, so send again; the
+                # retry limit in _restart keeps this from looping forever.
+                continue
+            if self.timeout:
+                now = time.time()
+                wait = min(w.started + self.timeout for w in busy.values())
+                wait = max(wait - now, 0)
+            else:
+                wait = None
+            ready, _, _ = select.select(list(busy), [], [], wait)
+
+            for fd in ready:
+                worker = busy[fd]
+                try:
+                    received = worker.receive()
+                except EOFError:
+                    self._restart(worker, unsent, attempts, 'exited')
+                    continue
+                for index, line in received:
+                    if not self.quiet:
+                        sys.stderr.write('Received from program: %s\n' %
+                                line)
+                    results[index] = float(line)
+                    remaining -= 1
+
+            if self.timeout:
+                now = time.time()
+                for worker in busy.values():
+                    if (worker.pending and
+                            now - worker.started > self.timeout):
+                        self._restart(worker, unsent, attempts, 'timed out')
+
+        return results
+
+    def _restart(self, worker, unsent, attempts, reason):
+        """Restarts a failed worker and requeues its outstanding requests.
+
+        The first outstanding request is the one that was being evaluated,
+        so it is the one charged with the failure.
+        """
+        failed = worker.pending[0]
+        attempts[failed] += 1
+        if attempts[failed] > self.retries:
+            worker.stop()
+            raise RuntimeError('External program %s %s times on one request'
+                    % (reason, attempts[failed]))
+        unsent.extendleft(reversed(worker.pending))
+        worker.restart()
+
+
+class _Worker(object):
+    """An evaluator process with a queue of outstanding requests."""
+
+    def __init__(self, command):
+        self.command = command
+        self.start()
+
+    def start(self):
+        from subprocess import Popen, PIPE
+        self.proc = Popen(self.command, stdout=PIPE, stdin=PIPE,
+                close_fds=True)
+        self.fd = self.proc.stdout.fileno()
+        self.buffer = b''
+        self.pending = collections.deque()
+        # Time when the first pending request began to be evaluated.
+        self.started = None
+
+    def stop(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        for f in (self.proc.stdin, self.proc.stdout):
+            try:
+                f.close()
+            except (IOError, OSError):
+                pass
+
+    def restart(self):
+        self.stop()
+        self.start()
+
+    def send(self, index, line):
+        if not self.pending:
+            self.started = time.time()
+        self.pending.append(index)
+        self.proc.stdin.write(line.encode('ascii'))
+        self.proc.stdin.flush()
+
+    def receive(self):
+        """Reads the available output and returns (index, line) pairs.
+
+        Raises EOFError if the process has exited.
+        """
+        data = os.read(self.fd, 65536)
+        if not data:
+            raise EOFError
+        self.buffer += data
+        received = []
+        while b'\n' in self.buffer:
+            line, self.buffer = self.buffer.split(b'\n', 1)
+            received.append((self.pending.popleft(), line.decode('ascii')))
+            self.started = time.time()
+        return received
@@ -3,6 +3,11 @@ from __future__ import division
 from . import Benchmark
 from math import sqrt, cos
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     from itertools import izip as zip
 except ImportError:
@@ -21,3 +26,8 @@ class Griewank(Benchmark):
 
         val = s/4000 - p + 1
         return val
+
+    def _standard_batch(self, matrix):
+        s = (matrix ** 2).sum(axis=1)
+        p = np.cos(matrix / np.sqrt(np.arange(1, self.dims + 1))).prod(axis=1)
+        return s/4000 - p + 1
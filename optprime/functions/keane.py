@@ -3,6 +3,11 @@ from operator import mul
 from math import cos, sqrt
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     from itertools import izip as zip
 except ImportError:
@@ -37,3 +42,20 @@ class Keane(Benchmark):
                 v = 0
 
         return v
+
+    def evaluate_batch(self, matrix):
+        matrix = np.asarray(matrix)
+        feasible = ((matrix.min(axis=1) >= 0) & (matrix.max(axis=1) <= 10) &
+                (matrix.prod(axis=1) >= 0.75) &
+                (matrix.sum(axis=1) <= self.dims*7.5))
+
+        # This has a non-symmetric feasible space, so we fix that.
+        diffs = matrix - (self.abscenter - 5)
+        sqs = (np.arange(1, self.dims + 1) * diffs**2).sum(axis=1)
+        s = (np.cos(diffs)**4).sum(axis=1)
+        p = (np.cos(diffs)**2).prod(axis=1)
+
+        values = np.zeros(len(matrix))
+        valid = feasible & (sqs != 0)
+        values[valid] = abs((s[valid] - 2*p[valid]) / np.sqrt(sqs[valid]))
+        return values
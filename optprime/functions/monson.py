@@ -3,6 +3,11 @@ from __future__ import division
 from math import sqrt, exp, cos, sin, pi
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     from itertools import izip as zip
 except ImportError:
@@ -28,6 +33,16 @@ class TwoGaussians(Benchmark):
 
         return (1-oogaussian) + 0.4*(outergaussian - innergaussian)
 
+    def evaluate_batch(self, matrix):
+        sqs = ((np.asarray(matrix) - self.abscenter)**2).sum(axis=1)
+        outersdev = 30
+        innersdev = 1
+        oosdev = 50.0
+        oogaussian = np.exp(-sqs/(2*oosdev**2))
+        outergaussian = np.exp(-sqs/(2*outersdev**2))
+        innergaussian = np.exp(-sqs/(2*innersdev**2))
+        return (1-oogaussian) + 0.4*(outergaussian - innergaussian)
+
 class ValleyNeedle(Benchmark):
     _each_constraints = (-50, 50)
 
@@ -46,6 +61,16 @@ class ValleyNeedle(Benchmark):
                 prod *= exp((-(x-c)**2)/(2*sdev**2))
             return flatheight*(1 - prod)
 
+    def evaluate_batch(self, matrix):
+        magsq = ((np.asarray(matrix) - self.abscenter)**2).sum(axis=1)
+        mag = np.sqrt(magsq)
+        flatradius=30
+        flatheight=5
+        sdev = flatradius / 100
+        cone = mag - flatradius + flatheight
+        needle = flatheight*(1 - np.exp(-magsq/(2*sdev**2)))
+        return np.where(mag > flatradius, cone, needle)
+
 class AsymmetricCone(Benchmark):
     _each_constraints = (-50, 50)
 
@@ -61,3 +86,14 @@ class AsymmetricCone(Benchmark):
         sa = sin(2*angle)
 
         return (-x*sa - sqrt(x**2 + const*ca)) / -ca
+
+    def evaluate_batch(self, matrix):
+        shifted = np.asarray(matrix) - self.abscenter
+        x = shifted[:, 0]
+        const = (shifted**2).sum(axis=1) - x**2
+        angle = pi/8
+
+        ca = cos(2*angle)
+        sa = sin(2*angle)
+
+        return (-x*sa - np.sqrt(x**2 + const*ca)) / -ca
@@ -2,6 +2,11 @@ from __future__ import division
 from math import exp
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     range = xrange
 except NameError:
@@ -17,3 +22,8 @@ class Quadratic(Benchmark):
             for j in range(self.dims):
                 s += exp(-((vec[i] - vec[j])**2)) * vec[i] * vec[j]
         return s + sum(vec[:self.dims])
+
+    def _standard_batch(self, matrix):
+        diffs = matrix[:, :, np.newaxis] - matrix[:, np.newaxis, :]
+        s = np.einsum('ni,nij,nj->n', matrix, np.exp(-diffs**2), matrix)
+        return s + matrix.sum(axis=1)
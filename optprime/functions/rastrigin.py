@@ -3,6 +3,11 @@ from __future__ import division
 from math import cos, pi
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     from itertools import izip as zip
 except ImportError:
@@ -17,3 +22,6 @@ class Rastrigin(Benchmark):
         for v in vec:
             s += v**2 - 10*cos(2*pi*v) + 10
         return s
+
+    def _standard_batch(self, matrix):
+        return (matrix**2 - 10*np.cos(2*pi*matrix) + 10).sum(axis=1)
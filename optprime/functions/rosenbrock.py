@@ -16,7 +16,12 @@ class Rosenbrock(Benchmark):
     """
     _each_constraints = (-100, 100)
 
-    def _standard_call(self, vec):
+    def _standard_call(self, v):
         part1 = ((v[1:] - v[:-1] ** 2) ** 2).sum()
         part2 = ((v[:-1] - 1) ** 2).sum()
         return 100 * part1 + part2
+
+    def _standard_batch(self, m):
+        part1 = ((m[:, 1:] - m[:, :-1] ** 2) ** 2).sum(axis=1)
+        part2 = ((m[:, :-1] - 1) ** 2).sum(axis=1)
+        return 100 * part1 + part2
@@ -3,18 +3,31 @@ from __future__ import division
 from math import sqrt, sin
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 
 class SchafferF6(Benchmark):
     _each_constraints = (-100, 100)
 
     def _standard_call(self, vec):
-        xsq = sum(imap(lambda x: x**2, vec))
+        xsq = sum([x**2 for x in vec])
         return 0.5 + (sin(sqrt(xsq))**2 - 0.5)/((1 + 0.001*xsq)**2)
 
+    def _standard_batch(self, matrix):
+        xsq = (matrix**2).sum(axis=1)
+        return 0.5 + (np.sin(np.sqrt(xsq))**2 - 0.5)/((1 + 0.001*xsq)**2)
+
 
 class SchafferF7(Benchmark):
     _each_constraints = (-100, 100)
 
     def _standard_call(self, vec):
-        xsq = sum(imap(lambda x: x**2, vec))
+        xsq = sum([x**2 for x in vec])
         return xsq**0.25 * (sin(50*xsq**0.1)**2 + 1)
+
+    def _standard_batch(self, matrix):
+        xsq = (matrix**2).sum(axis=1)
+        return xsq**0.25 * (np.sin(50*xsq**0.1)**2 + 1)
@@ -3,6 +3,11 @@ from __future__ import division
 from math import sqrt, sin
 from . import Benchmark
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     from itertools import izip as zip
 except ImportError:
@@ -26,6 +31,10 @@ class Schwefel(Benchmark):
         s = sum([-x * sin(sqrt(abs(x))) for x in vec])
         return 418.9829 * self.dims + s
 
+    def _standard_batch(self, matrix):
+        s = (-matrix * np.sin(np.sqrt(abs(matrix)))).sum(axis=1)
+        return 418.9829 * self.dims + s
+
 
 class Schwefel221(Benchmark):
     """The Schwefel 2.21 benchmark function.
@@ -36,6 +45,9 @@ class Schwefel221(Benchmark):
     def _standard_call(self, vec):
         return max([abs(x) for x in vec])
 
+    def _standard_batch(self, matrix):
+        return abs(matrix).max(axis=1)
+
 
 class Schwefel12(Benchmark):
     """The Schwefel 1.2 benchmark function.
@@ -47,3 +59,9 @@ class Schwefel12(Benchmark):
 
     def _standard_call(self, vec):
         return sum((sum(vec[:i]) ** 2) for i in xrange(self.dims))
+
+    def _standard_batch(self, matrix):
+        # The partial sums exclude the last element (and include an empty
+        # first sum, which contributes nothing).
+        partial_sums = np.cumsum(matrix, axis=1)[:, :-1]
+        return (partial_sums ** 2).sum(axis=1)
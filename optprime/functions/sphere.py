@@ -1,5 +1,7 @@
 from __future__ import division
 
+import random
+
 from . import Benchmark
 from mrs.param import Param
 
@@ -20,14 +22,43 @@ class Sphere(Benchmark):
     def _standard_call(self, vec):
         return (vec ** 2).sum()
 
+    def _standard_batch(self, matrix):
+        return (matrix ** 2).sum(axis=1)
+
 
 class SleepSphere(Sphere):
+    # The sleep is the point of the function, so it shouldn't be cached.
+    stochastic = True
+
     _params = dict(
             sleep_time=Param(type='float', default=0.0),
+            sleep_spread=Param(type='float', default=0.0,
+                doc='Fraction by which each sleep varies (uniformly) around'
+                ' sleep_time'),
             )
 
+    def setup(self, rand):
+        super(SleepSphere, self).setup(rand)
+        # The sleep times don't affect the values, so they have their own
+        # Random (which may be shared by several threads).
+        self._sleep_rand = random.Random(rand.getrandbits(64))
+
+    def sleep_duration(self):
+        spread = self.sleep_spread
+        if spread:
+            return self.sleep_time * self._sleep_rand.uniform(1 - spread,
+                    1 + spread)
+        else:
+            return self.sleep_time
+
     def __call__(self, vec):
         from time import sleep
         val = super(SleepSphere, self).__call__(vec)
-        sleep(self.sleep_time)
+        sleep(self.sleep_duration())
         return val
+
+    def evaluate_batch(self, matrix):
+        from time import sleep
+        values = super(SleepSphere, self).evaluate_batch(matrix)
+        sleep(sum(self.sleep_duration() for row in values))
+        return values
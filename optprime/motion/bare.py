@@ -12,6 +12,7 @@ class Bare(basic._Base):
         sdev = array([abs(x) for x in (particle.pbestpos - particle.nbestpos)])
 
         newpos = array([rand.gauss(m,s) for m,s in izip(mean,sdev)])
+        newpos = self.bound(newpos)
         newvel = newpos - particle.pos
 
         return newpos, newvel
@@ -3,7 +3,8 @@ import operator
 from math import sqrt
 
 from mrs.param import ParamObj, Param
-from ..cube import Cube
+from ..cube import Cube, BOUNDARY_MODES
+from ..randstream import CounterRandom, StreamBatch
 
 try:
     from numpy import empty
@@ -17,7 +18,22 @@ except NameError:
 
 
 class _Base(ParamObj):
+    _params = dict(
+        boundary=Param(default='none',
+            doc='How to handle positions outside the constraints: none, '
+            'clamp, reflect, or wrap'),
+        )
+
+    # Whether the motion gives new positions (rather than None), so that the
+    # boundary handling can be applied to them.
+    gives_positions = True
+
     def setup(self, function, *args, **kargs):
+        if self.boundary != 'none' and self.boundary not in BOUNDARY_MODES:
+            raise ValueError('Unknown boundary mode: %s' % self.boundary)
+        if self.boundary != 'none' and not self.gives_positions:
+            raise ValueError('%s motion does not support boundary handling'
+                    % type(self).__name__)
         if function.maximize:
             self.comparator = operator.gt
         else:
@@ -32,6 +48,28 @@ class _Base(ParamObj):
     def __call__(self, particle, rand):
         raise NotImplementedError
 
+    def bound(self, pos):
+        """Applies the boundary handling to a position (or a matrix of them).
+
+        Velocities are not changed.
+        """
+        if self.boundary == 'none':
+            return pos
+        return self.cube.constrain(pos, self.boundary)
+
+    def move_swarm(self, swarm, rands):
+        """Get the next positions and velocities for an ArraySwarm.
+
+        The `rands` sequence gives the Random for each row of the swarm.  This
+        default implementation moves one particle at a time, so subclasses
+        should override it with a batched version where possible.
+        """
+        newpos = empty(swarm.pos.shape)
+        newvel = empty(swarm.vel.shape)
+        for i, rand in enumerate(rands):
+            newpos[i], newvel[i] = self(swarm.particle(i), rand)
+        return newpos, newvel
+
 
 class Constricted(_Base):
     _params = dict(
@@ -66,7 +104,26 @@ class Constricted(_Base):
         if self.restrictvel:
             self.vcube.constrain_vec(newvel)
 
-        return particle.pos + newvel, newvel
+        return self.bound(particle.pos + newvel), newvel
+
+    def move_swarm(self, swarm, rands):
+        """Get the next positions and velocities for an ArraySwarm.
+
+        Random values are drawn from each particle's Random in the same order
+        as in `__call__`, so the result is identical to moving each particle
+        individually.
+        """
+        r1 = rand_uniform_rows(0, self.phi1, self.dims, rands)
+        r2 = rand_uniform_rows(0, self.phi2, self.dims, rands)
+
+        grel = swarm.nbestpos - swarm.pos
+        prel = swarm.pbestpos - swarm.pos
+        newvel = self.const * (swarm.vel + grel*r1 + prel*r2)
+
+        if self.restrictvel:
+            self.vcube.constrain_vec(newvel)
+
+        return self.bound(swarm.pos + newvel), newvel
 
 
 class BasicAdaptive(_Base):
@@ -133,10 +190,12 @@ class BasicAdaptive(_Base):
         # Store the value before the state change for future use
         particle.prev_val = particle.val
 
-        return newpos, newvel
+        return self.bound(newpos), newvel
 
 
 class BasicGauss(_Base):
+    gives_positions = False
+
     def __call__(self, particle, rand):
         """Get the next velocity from this particle given a particle that it
         should be moving toward"""
@@ -159,7 +218,22 @@ class BasicGauss(_Base):
 # TODO: once numpypy supports the numpy.random module, use it instead.
 def rand_uniform(a, b, n, rand):
     """Draw an array of n random variables distributed as Uniform(a, b)."""
+    if isinstance(rand, CounterRandom):
+        return rand.uniform_array(a, b, n)
     v = empty(n)
     for i in range(n):
         v[i] = rand.uniform(a, b)
     return v
+
+
+def rand_uniform_rows(a, b, n, rands):
+    """Draw one row of n Uniform(a, b) random variables for each Random.
+
+    If `rands` is a StreamBatch, all of the rows are drawn at once.
+    """
+    if isinstance(rands, StreamBatch):
+        return rands.uniform(a, b, n)
+    v = empty((len(rands), n))
+    for i, rand in enumerate(rands):
+        v[i] = rand_uniform(a, b, n, rand)
+    return v
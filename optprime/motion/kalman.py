@@ -153,7 +153,8 @@ class Kalman(basic._Base):
         # from state less good
         state = RandomState(rand.randint(0, sys.maxint))
         newstate = state.multivariate_normal(mean, var)
-        return array(newstate[:self.dims]),array(newstate[self.dims:])
+        return (self.bound(array(newstate[:self.dims])),
+                array(newstate[self.dims:]))
 
 
 def ddot(*args):
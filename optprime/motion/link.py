@@ -9,6 +9,8 @@ class Link1(basic._Base):
     """This particle is the first linear kalman approximation -- the one that
     makes mathematical sense"""
 
+    gives_positions = False
+
     _params = dict(
             variance=Param(default=0.6, type='float', doc='Sample variance' ),
             weight=Param(default=0.45, type='float', 
@@ -221,7 +223,7 @@ class Link2(basic._Base):
         if self.restrictvel:
             self.cube.constrain_vec(nvel, True)
 
-        return particle.pos + nvel, nvel
+        return self.bound(particle.pos + nvel), nvel
 
 
 class Link3(basic._Base):
@@ -229,6 +231,8 @@ class Link3(basic._Base):
     a weighted average of the old position, rather than an average over
     velocities."""
 
+    gives_positions = False
+
     _params = dict(
             cfac=Param(default=0.0001, type='float', doc='Covariance factor' ),
             weight=Param(default=0.45, type='float', 
@@ -280,6 +284,8 @@ class Link4(basic._Base):
     a weighted average of the old position, rather than an average over
     velocities."""
 
+    gives_positions = False
+
     _params = dict(
             variance=Param(default=0.6, type='float', doc='Weight variance' ),
             weight=Param(default=0.45, type='float', 
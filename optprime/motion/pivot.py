@@ -53,6 +53,7 @@ class Pivot(basic._Base):
             pw = 1-pw
 
         newpos = pw * ppart + (1-pw) * pbest
+        newpos = self.bound(newpos)
         newvel = newpos - particle.pos
 
         return newpos, newvel
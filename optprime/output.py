@@ -3,10 +3,21 @@
 from __future__ import division, print_function
 
 import datetime
+import json
 import sys
+import time
 from mrs.param import Param, ParamObj
 
-VALID_ARGS = frozenset(('iteration', 'particles', 'best'))
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+from .profiling import PHASES
+from .psodata import DONE_ITERATION, LOG_DTYPE, open_log
+
+VALID_ARGS = frozenset(('iteration', 'particles', 'best', 'evals', 'profile',
+    'locality'))
 
 
 class Output(ParamObj):
@@ -85,6 +96,63 @@ class Pair(Output):
         sys.stdout.flush()
 
 
+class Evals(Output):
+    """Outputs the number of function evaluations and the best value."""
+
+    args = frozenset(('evals', 'best'))
+
+    def __call__(self, **kwds):
+        print(kwds['evals'], kwds['best'].pbestval)
+        sys.stdout.flush()
+
+
+class Locality(Output):
+    """Outputs the iteration, best value, and fraction of cross-task messages.
+
+    The fraction is of the neighbor messages that would go between different
+    MapReduce tasks (see --range-partition and --num-tasks).
+    """
+
+    args = frozenset(('iteration', 'best', 'locality'))
+
+    def __call__(self, **kwds):
+        print(kwds['iteration'], kwds['best'].pbestval,
+                '%.6f' % kwds['locality'])
+        sys.stdout.flush()
+
+
+class Binary(Output):
+    """Appends the iteration, evaluations, best value, and time to a log.
+
+    The log is binary (see `psodata`), so that `psodata.PSOData` can
+    memory-map it instead of parsing text.  Each run adds a batch to the log.
+    """
+
+    args = frozenset(('iteration', 'evals', 'best'))
+
+    _params = dict(
+            path=Param(default='pso.log',
+                doc='Binary log file (appended to if it exists)'),
+            )
+
+    def start(self):
+        self._file, self.batch = open_log(self.path)
+        self.start_time = time.time()
+
+    def _write(self, iteration, evals, value):
+        record = np.array([(self.batch, iteration, evals, value,
+            time.time() - self.start_time)], dtype=LOG_DTYPE)
+        self._file.write(record.tostring())
+        self._file.flush()
+
+    def __call__(self, **kwds):
+        self._write(kwds['iteration'], kwds['evals'], kwds['best'].pbestval)
+
+    def finish(self):
+        self._write(DONE_ITERATION, -1, np.nan)
+        self._file.close()
+
+
 class TimedBasic(Output):
     """Outputs the average elapsed time per iteration and best value."""
 
@@ -164,6 +232,47 @@ class Timer(Output):
         self.last_iter = iteration
 
 
+class Profile(Output):
+    """Outputs the iteration, best value, and seconds spent in each phase.
+
+    The seconds are for the iterations since the previous output (see
+    `profiling.PHASES` for the order).  At the end, a summary of the whole
+    run is written as JSON to the given file or, by default, printed as a
+    comment.
+    """
+
+    args = frozenset(('iteration', 'best', 'profile'))
+
+    _params = dict(
+            path=Param(default='',
+                doc='File for the JSON summary (default: print it)'),
+            )
+
+    def start(self):
+        self.profiler = None
+        self.last_totals = None
+        print('# iteration best', ' '.join(PHASES))
+
+    def __call__(self, **kwds):
+        self.profiler = kwds['profile']
+        totals = self.profiler.totals()
+        last = self.last_totals or dict.fromkeys(PHASES, (0.0, 0))
+        seconds = ['%.6f' % (totals[p][0] - last[p][0]) for p in PHASES]
+        print(kwds['iteration'], kwds['best'].pbestval, ' '.join(seconds))
+        sys.stdout.flush()
+        self.last_totals = totals
+
+    def finish(self):
+        if self.profiler is None:
+            return
+        self.profiler.reported = True
+        if self.path:
+            with open(self.path, 'w') as f:
+                json.dump(self.profiler.summary(), f, sort_keys=True)
+        else:
+            print('# Profile:', self.profiler.dumps())
+
+
 class Extended(Output):
     """Outputs the best value and best position."""
 
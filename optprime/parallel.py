@@ -0,0 +1,110 @@
+"""Process pools that operate on an ArraySwarm in shared memory.
+
+The Bypass implementation runs on one core.  A `SwarmPool` forks worker
+processes that share the arrays of an ArraySwarm with the parent, so each
+worker can read the whole swarm and update its own block of rows without any
+particle state being pickled.  Each call to `SwarmPool.map` runs a method of
+the program on every block and returns once all of the blocks are done,
+which is the barrier between the phases of an iteration.
+"""
+
+from __future__ import division
+
+import multiprocessing
+
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+try:
+    range = xrange
+except NameError:
+    pass
+
+# The program and swarm of a worker process (set by _init_worker).
+_program = None
+_swarm = None
+
+
+def shared_array(array):
+    """Returns a copy of the array whose data is in shared memory.
+
+    The memory is inherited by processes forked after the copy is made.
+    """
+    raw = multiprocessing.RawArray('b', max(array.nbytes, 1))
+    shared = np.frombuffer(raw, dtype=array.dtype,
+            count=array.size).reshape(array.shape)
+    shared[...] = array
+    return shared
+
+
+def share_swarm(swarm):
+    """Moves each of the swarm's arrays into shared memory."""
+    for name in swarm.arrays:
+        setattr(swarm, name, shared_array(getattr(swarm, name)))
+
+
+def _init_worker(program, swarm):
+    global _program, _swarm
+    _program = program
+    _swarm = swarm
+    # Only count the evaluations and time in this process.
+    program.eval_counter.collect()
+    if program.profiler is not None:
+        program.profiler.collect()
+
+
+def _run_block(task):
+    """Runs the task.
+
+    Returns the number of evaluations and the profiler's totals (or None if
+    not profiling).
+    """
+    method, start, stop, swarmid = task
+    getattr(_program, method)(_swarm, start, stop, swarmid)
+    evals = _program.eval_counter.collect()
+    if _program.profiler is not None:
+        return evals, _program.profiler.collect()
+    else:
+        return evals, None
+
+
+class SwarmPool(object):
+    """A pool of processes that each handle a block of an ArraySwarm's rows.
+
+    The swarm's arrays must already be in shared memory (see `share_swarm`),
+    and they must be modified in place thereafter.
+    """
+    def __init__(self, program, swarm, processes):
+        bounds = np.linspace(0, len(swarm), processes + 1).astype(int)
+        self.blocks = [(start, stop) for start, stop in
+                zip(bounds[:-1].tolist(), bounds[1:].tolist()) if stop > start]
+        self.program = program
+        self.pool = multiprocessing.Pool(len(self.blocks), _init_worker,
+                (program, swarm))
+
+    def map(self, method, swarmid=0):
+        """Calls program.method(swarm, start, stop, swarmid) for each block.
+
+        Returns after every block is finished.  The evaluations (and, when
+        profiling, the time) in the workers are added to the program's.
+        """
+        tasks = [(method, start, stop, swarmid)
+                for start, stop in self.blocks]
+        results = self.pool.map(_run_block, tasks, chunksize=1)
+        for evals, totals in results:
+            self.program.eval_counter.add(evals)
+            if totals is not None:
+                self.program.profiler.merge(totals)
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+# vim: et sw=4 sts=4
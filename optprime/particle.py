@@ -11,8 +11,63 @@ except ImportError:
 
 # TODO: change repr to be a human-readable string for debugging.
 
+_slot_names = {}
 
-class Particle(object):
+
+def slot_names(cls):
+    """Returns the names of the slots defined by cls and its bases.
+
+    The `__dict__` and `__weakref__` slots are not included.
+    """
+    try:
+        return _slot_names[cls]
+    except KeyError:
+        pass
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = (slots,)
+        for name in slots:
+            if name not in ('__dict__', '__weakref__') and name not in names:
+                names.append(name)
+    names = tuple(names)
+    _slot_names[cls] = names
+    return names
+
+
+class Slotted(object):
+    """Base class for objects whose attributes are kept in `__slots__`.
+
+    Slots take much less memory per object than a `__dict__` and are faster
+    to access.  The `fields` method takes the place of `vars` and is also used
+    for pickling.  Subclasses that list `__dict__` in their slots may still be
+    given arbitrary extra attributes.
+    """
+    __slots__ = ()
+
+    def fields(self):
+        """Returns a dict of the attributes that are set on the object."""
+        state = {}
+        for name in slot_names(type(self)):
+            try:
+                state[name] = getattr(self, name)
+            except AttributeError:
+                pass
+        extra = getattr(self, '__dict__', None)
+        if extra:
+            state.update(extra)
+        return state
+
+    def __getstate__(self):
+        return self.fields()
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+
+class Particle(Slotted):
     """Particle for Particle Swarm Optimization.
 
     The particle assumes that the position and velocity are arrays so it
@@ -59,7 +114,14 @@ class Particle(object):
     >>> p > q
     True
     >>>
+
+    Particles only have their slots (no `__dict__`), so other attributes
+    cannot be set on them.  A subclass that needs extra attributes lists
+    `__dict__` in its own slots (as BranchParticle does for SpecEx's tokens).
     """
+    __slots__ = ('id', 'iters', 'pos', 'vel', 'value', 'pbestpos', 'pbestval',
+            'nbestpos', 'nbestval')
+
     def __init__(self, id, pos, vel, value=None):
         self.id = id
         self.iters = 0
@@ -105,7 +167,10 @@ class Particle(object):
         return m
 
     def update(self, newpos, newvel, newval, comparator):
-        """Uses the given pos, vel, and value, and considers a new pbest."""
+        """Uses the given pos, vel, and value, and considers a new pbest.
+
+        Returns True if the pbest changed.
+        """
         self.pos = newpos
         self.vel = newvel
         self.value = newval
@@ -113,13 +178,22 @@ class Particle(object):
         if self.isbetter(newval, self.pbestval, comparator):
             self.pbestval = newval
             self.pbestpos = newpos
+            return True
+        else:
+            return False
 
     def update_value(self, newval, comparator):
-        """Updates the value of the particle, considers a new pbest"""
+        """Updates the value of the particle, considers a new pbest.
+
+        Returns True if the pbest changed.
+        """
         self.value = newval
         if self.isbetter(newval, self.pbestval, comparator):
             self.pbestval = newval
             self.pbestpos = self.pos
+            return True
+        else:
+            return False
 
     def update_pos(self, newpos, newvel, comparator):
         """Updates the position and velocity and iterations."""
@@ -188,7 +262,7 @@ class Particle(object):
     def __repr__(self):
         cls_name = type(self).__name__
         args = []
-        for attr, value in sorted(vars(self).iteritems()):
+        for attr, value in sorted(self.fields().items()):
             args.append('{}={}'.format(attr, repr(value)))
         return '{}({})'.format(cls_name, ', '.join(args))
 
@@ -197,15 +271,17 @@ class Particle(object):
                 self.pos, self.vel, self.value, self.pbestpos, self.pbestval)
 
     def __getstate__(self):
-        state = self.__dict__.copy()
+        state = self.fields()
         for name in ('pos', 'vel', 'pbestpos', 'nbestpos'):
-            state[name] = state[name].tostring()
+            if name in state:
+                state[name] = state[name].tostring()
         return state
 
     def __setstate__(self, state):
         for name in ('pos', 'vel', 'pbestpos', 'nbestpos'):
-            state[name] = fromstring(state[name])
-        self.__dict__ = state
+            if name in state:
+                state[name] = fromstring(state[name])
+        super(Particle, self).__setstate__(state)
 
     def __lt__(self, other):
         if isinstance(other, Particle):
@@ -226,7 +302,7 @@ class Particle(object):
             return NotImplemented
 
 
-class Message(object):
+class Message(Slotted):
     """Message used to update bests in Mrs PSO.
 
     >>> m = Message(128, array((1.0, 2.0)), -5.0)
@@ -265,6 +341,8 @@ class Message(object):
         position: Position of the particle.
         value: Value of the particle at `position`.
     """
+    __slots__ = ('sender', 'position', 'value')
+
     def __init__(self, sender, position, value):
         self.sender = sender
         self.position = position
@@ -289,7 +367,7 @@ class Message(object):
             return NotImplemented
 
     def __getstate__(self):
-        state = self.__dict__.copy()
+        state = self.fields()
         for name in ('position',):
             state[name] = state[name].tostring()
         return state
@@ -297,7 +375,7 @@ class Message(object):
     def __setstate__(self, state):
         for name in ('position',):
             state[name] = fromstring(state[name])
-        self.__dict__ = state
+        super(Message, self).__setstate__(state)
 
 
 class SEParticle(Particle):
@@ -325,6 +403,8 @@ class SEParticle(Particle):
     'sep:42;100;200;1.0,2.0;3.0,4.0;-10.0;6.0,7.0;-11.0;8.0,9.0;-12.0;False;4'
     >>>
     """
+    __slots__ = ('specpbest', 'specnbestid')
+
     def __init__(self, p, specpbest=False, specnbestid=-1):
         self.id = p.id
         self.pos = p.pos
@@ -361,25 +441,37 @@ class SEParticle(Particle):
     def copy(self):
         """Performs a deep copy and returns the new Particle.
         """
-        p = Particle(self.id, self.pos, self.vel, self.value)
-        p.pbestpos = self.pbestpos
-        p.pbestval = self.pbestval
-        p.nbestpos = self.nbestpos
-        p.nbestval = self.nbestval
-        p.iters = self.iters
-        sep = SEParticle(p, self.specpbest, self.specnbestid)
-        return sep
+        return SEParticle(self, self.specpbest, self.specnbestid)
 
 
 class BranchParticle(Particle):
-    """A particle that keeps track of its last branch."""
+    """A particle that keeps track of its last branch.
+
+    SpecEx also gives it a number of tokens, so it may have extra attributes.
+    """
+    __slots__ = ('lastbranch', '__dict__')
+
     def __init__(self, *args):
         super(BranchParticle, self).__init__(*args)
         self.lastbranch = [False, -1]
 
+    def copy(self):
+        """Performs a deep copy and returns the new BranchParticle.
+        """
+        p = BranchParticle(self.id, self.pos, self.vel, self.value)
+        p.pbestpos = self.pbestpos
+        p.pbestval = self.pbestval
+        p.nbestpos = self.nbestpos
+        p.nbestval = self.nbestval
+        p.iters = self.iters
+        p.lastbranch = list(self.lastbranch)
+        p.__dict__.update(self.__dict__)
+        return p
+
 
 class Dummy(Particle):
     """A dummy particle that just has an id, for use with SpecEx."""
+    __slots__ = ()
 
     def __init__(self, id, iters):
         self.id = id
@@ -388,6 +480,7 @@ class Dummy(Particle):
 
 class MessageParticle(Particle):
     """A complete particle that is actually a message."""
+    __slots__ = ()
 
     def __init__(self, p):
         self.id = p.id
@@ -403,18 +496,12 @@ class MessageParticle(Particle):
     def copy(self):
         """Performs a deep copy and returns the new Particle.
         """
-        p = Particle(self.id, self.pos, self.vel, self.value)
-        p.pbestpos = self.pbestpos
-        p.pbestval = self.pbestval
-        p.nbestpos = self.nbestpos
-        p.nbestval = self.nbestval
-        p.iters = self.iters
-        mp = MessageParticle(p)
-        return mp
+        return MessageParticle(self)
 
 
 class SEMessageParticle(SEParticle):
     """A complete particle that is actually a message."""
+    __slots__ = ()
 
     def __init__(self, p):
         self.id = p.id
@@ -432,18 +519,10 @@ class SEMessageParticle(SEParticle):
     def copy(self):
         """Performs a deep copy and returns the new Particle.
         """
-        p = Particle(self.id, self.pos, self.vel, self.value)
-        p.pbestpos = self.pbestpos
-        p.pbestval = self.pbestval
-        p.nbestpos = self.nbestpos
-        p.nbestval = self.nbestval
-        p.iters = self.iters
-        sep = SEParticle(p, self.specpbest, self.specnbestid)
-        semp = SEMessageParticle(sep)
-        return semp
+        return SEMessageParticle(self)
 
 
-class Swarm(object):
+class Swarm(Slotted):
     """A set of particles.
 
     >>> particles = [Particle(42, 1.0, 2.0), Particle(41, 3.0, 4.0)]
@@ -452,6 +531,8 @@ class Swarm(object):
     's:17&p:42;0;0;1.0;2.0;;1.0;;1.0;;0;False,-1&p:41;0;0;3.0;4.0;;3.0;;3.0;;0;False,-1'
     >>>
     """
+    __slots__ = ('id', 'particles')
+
     def __init__(self, sid, particles):
         self.id = sid
         self.particles = list(particles)
@@ -474,12 +555,50 @@ class Swarm(object):
         rand.shuffle(shuffled)
         return shuffled
 
-    def __getstate__(self):
-        state = self.__dict__.copy()
-        return state
 
-    def __setstate__(self, state):
-        self.__dict__ = state
+class SwarmRef(Slotted):
+    """Stands in for the state of a swarm that stays resident on a slave.
+
+    The `token` identifies the saved state (see `SubswarmPSO.keep_resident`).
+    A token of None means that the state was lost.
+
+    >>> SwarmRef(3, None).lost()
+    True
+    >>>
+    """
+    __slots__ = ('id', 'token')
+
+    def __init__(self, sid, token):
+        self.id = sid
+        self.token = token
+
+    def lost(self):
+        return self.token is None
+
+
+class EvalCount(Slotted):
+    """The number of function evaluations done for one key of a dataset.
+
+    MapReduce slaves evaluate the function, so each map emits the count of
+    its evaluations beside its other records, and each reduce sums the counts
+    for its key.  The master sums the counts in an output dataset.
+
+    >>> EvalCount.total([EvalCount(3), 'x', EvalCount(4)])
+    7
+    >>>
+    """
+    __slots__ = ('evals',)
+
+    def __init__(self, evals):
+        self.evals = evals
+
+    def __repr__(self):
+        return 'EvalCount(%s)' % self.evals
+
+    @staticmethod
+    def total(records):
+        """Returns the sum of the counts among the records."""
+        return sum(r.evals for r in records if isinstance(r, EvalCount))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,171 @@
+"""Timing of the phases of PSO.
+
+A `Profiler` records the time spent in each of the `PHASES`.  Nothing is
+timed unless profiling is enabled (see `StandardPSO.enable_profiling`), which
+replaces the function, the motion, and the methods for each phase with timed
+wrappers, so that there is no overhead at all otherwise.
+
+Phases may be nested (e.g., communication may construct Randoms), and the
+time of an inner phase is not counted in the outer one.  Time spent in other
+threads (e.g., AsyncPSO's evaluation threads) is added up, so the total can
+exceed the elapsed time.
+
+>>> profiler = Profiler()
+>>> double = profiler.timed('motion', lambda x: 2 * x)
+>>> double(21)
+42
+>>> profiler.calls['motion']
+1
+>>>
+"""
+
+from __future__ import division
+from __future__ import print_function
+
+import functools
+import json
+import sys
+import threading
+import time
+from timeit import default_timer
+
+PHASES = ('motion', 'evaluation', 'rng', 'communication', 'serialization',
+        'output')
+
+
+class Profiler(object):
+    """Accumulates the seconds spent in, and number of calls to, each phase.
+
+    Totals can be moved between processes with `collect` and `merge`.
+    """
+    def __init__(self):
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.start_time = time.time()
+        # Whether the summary has been given to an Output.
+        self.reported = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def add(self, phase, seconds, calls=1):
+        with self._lock:
+            self.seconds[phase] += seconds
+            self.calls[phase] += calls
+
+    def _run(self, phase, func, args, kwds):
+        """Calls the function and adds the time to the given phase."""
+        try:
+            stack = self._local.stack
+        except AttributeError:
+            stack = self._local.stack = []
+        # The time spent in nested phases during this call.
+        stack.append(0.0)
+        start = default_timer()
+        try:
+            return func(*args, **kwds)
+        finally:
+            elapsed = default_timer() - start
+            inner = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            self.add(phase, elapsed - inner)
+
+    def timed(self, phase, func):
+        """Returns a version of the function that is timed in the phase."""
+        @functools.wraps(func)
+        def wrapper(*args, **kwds):
+            return self._run(phase, func, args, kwds)
+        return wrapper
+
+    def timed_generator(self, phase, func):
+        """Returns a version of the generator function that is timed.
+
+        Getting each item is timed separately, so that time spent by the
+        consumer (e.g., serializing the item) is not counted.
+        """
+        @functools.wraps(func)
+        def wrapper(*args, **kwds):
+            iterator = self._run(phase, func, args, kwds)
+            while True:
+                try:
+                    item = self._run(phase, next, (iterator,), {})
+                except StopIteration:
+                    return
+                yield item
+        return wrapper
+
+    def wrap(self, obj, phase, methods=()):
+        """Returns a proxy for the object that times calls in the phase.
+
+        Calling the proxy or any of the given methods is timed.  Other
+        attributes are those of the object.
+        """
+        return Timed(obj, self, phase, methods)
+
+    def totals(self):
+        """Returns a dict mapping each phase to (seconds, calls)."""
+        with self._lock:
+            return dict((phase, (self.seconds[phase], self.calls[phase]))
+                    for phase in PHASES)
+
+    def collect(self):
+        """Returns the totals (see `totals`) and resets them to zero."""
+        with self._lock:
+            totals = dict((phase, (self.seconds[phase], self.calls[phase]))
+                    for phase in PHASES)
+            self.seconds = dict.fromkeys(PHASES, 0.0)
+            self.calls = dict.fromkeys(PHASES, 0)
+        return totals
+
+    def merge(self, totals):
+        """Adds totals from `collect` (e.g., from another process)."""
+        for phase, (seconds, calls) in totals.items():
+            self.add(phase, seconds, calls)
+
+    def summary(self):
+        """Returns a JSON-compatible summary of the totals."""
+        totals = self.totals()
+        return {
+                'elapsed': time.time() - self.start_time,
+                'seconds': dict((p, totals[p][0]) for p in PHASES),
+                'calls': dict((p, totals[p][1]) for p in PHASES),
+                }
+
+    def dumps(self):
+        """Returns the summary as a line of JSON."""
+        return json.dumps(self.summary(), sort_keys=True)
+
+    def report(self, file=None):
+        """Prints the summary unless it has already been reported."""
+        if not self.reported:
+            self.reported = True
+            print('# Profile:', self.dumps(), file=file)
+
+
+def report_to_stderr(profiler):
+    """Reports the profile to the current `sys.stderr` (e.g., when a slave
+    exits)."""
+    profiler.report(sys.stderr)
+
+
+class Timed(object):
+    """A proxy that times calls to an object (see `Profiler.wrap`)."""
+    def __init__(self, obj, profiler, phase, methods=()):
+        self._obj = obj
+        self._profiler = profiler
+        self._phase = phase
+        for name in methods:
+            method = getattr(obj, name, None)
+            if method is not None:
+                setattr(self, name, profiler.timed(phase, method))
+
+    def __call__(self, *args, **kwds):
+        return self._profiler._run(self._phase, self._obj, args, kwds)
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self._obj, name)
+
+
+# vim: et sw=4 sts=4
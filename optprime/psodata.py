@@ -1,7 +1,78 @@
-"""A library for reading output from amlpso."""
+"""A library for reading output from amlpso.
 
+Text logs (from `output.Basic` or `output.Pair`) are parsed line by line.
+Binary logs (from `output.Binary`) are memory-mapped, so even very long runs
+load instantly.  Either way, the values are aligned in a (batches x
+iterations) matrix the first time that they are needed, and statistics for
+every iteration are computed from it at once (see `averages` and
+`all_statistics`).
+
+A binary log is a short header followed by fixed-size records (see
+`LOG_DTYPE`), one per output, appended as the run progresses.  Each batch
+(run) in a log ends with a record whose iteration is `DONE_ITERATION`.
+Records are only read from the mapped file when they are used.
+"""
+
+from __future__ import division, print_function
+
+import os
+
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+LOG_MAGIC = b'OPLOG\x00\x00\x01'
+LOG_DTYPE = np.dtype([('batch', '<i4'), ('iteration', '<i8'),
+    ('evals', '<i8'), ('value', '<f8'), ('seconds', '<f8')])
+DONE_ITERATION = -1
+
+
+def is_binary_log(infile):
+    """Determines whether the file (opened for reading) is a binary log."""
+    start = infile.tell()
+    magic = infile.read(len(LOG_MAGIC))
+    infile.seek(start)
+    return magic == LOG_MAGIC
+
+
+def open_log(path):
+    """Opens a binary log for appending.
+
+    Any partial record at the end (from a crash) is removed.  Returns the
+    file and the number of the next batch.
+    """
+    if not os.path.exists(path) or not os.path.getsize(path):
+        f = open(path, 'wb')
+        f.write(LOG_MAGIC)
+        return f, 0
+
+    f = open(path, 'r+b')
+    if f.read(len(LOG_MAGIC)) != LOG_MAGIC:
+        f.close()
+        raise ValueError('Not a binary log: %s' % path)
+    f.seek(0, os.SEEK_END)
+    count = (f.tell() - len(LOG_MAGIC)) // LOG_DTYPE.itemsize
+    end = len(LOG_MAGIC) + count * LOG_DTYPE.itemsize
+    f.truncate(end)
+    f.seek(end)
+    if count:
+        f.seek(end - LOG_DTYPE.itemsize)
+        last = np.frombuffer(f.read(LOG_DTYPE.itemsize), dtype=LOG_DTYPE)
+        batch = int(last['batch'][0]) + 1
+    else:
+        batch = 0
+    return f, batch
+
+
+def map_log(path):
+    """Memory-maps the complete records of a binary log."""
+    count = (os.path.getsize(path) - len(LOG_MAGIC)) // LOG_DTYPE.itemsize
+    if not count:
+        return np.zeros(0, dtype=LOG_DTYPE)
+    return np.memmap(path, dtype=LOG_DTYPE, mode='r', offset=len(LOG_MAGIC),
+            shape=(count,))
 
-from __future__ import division
 
 class Batch(object):
     def __init__(self):
@@ -21,6 +92,10 @@ class Batch(object):
     def __getitem__(self, key):
         return self.map[key]
 
+    def column(self, keys):
+        """Returns an array of the values for the given keys."""
+        return np.array([self.map[key] for key in keys], dtype=float)
+
     def __iter__(self):
         return iter(self.keys)
 
@@ -35,12 +110,58 @@ class Batch(object):
         return key, self.map[key]
 
 
+class ArrayBatch(object):
+    """A batch whose records are a slice of a memory-mapped binary log.
+
+    This acts like a `Batch` keyed by iteration, and it also gives the
+    `evals` and `seconds` columns as arrays.
+    """
+    def __init__(self, records):
+        self.records = records
+        self.keys = records['iteration']
+        self.values = records['value']
+        self.evals = records['evals']
+        self.seconds = records['seconds']
+        self.done = True
+
+    def index(self, key):
+        i = np.searchsorted(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            raise KeyError(key)
+        return i
+
+    def __getitem__(self, key):
+        return float(self.values[self.index(key)])
+
+    def column(self, keys):
+        """Returns an array of the values for the given keys."""
+        return self.values[np.searchsorted(self.keys, keys)]
+
+    def __iter__(self):
+        return iter(self.keys.tolist())
+
+    def __len__(self):
+        return len(self.keys)
+
+    def last(self):
+        return int(self.keys[-1])
+
+    def lastitem(self):
+        return self.last(), float(self.values[-1])
+
+
 class PSOData(object):
     def __init__(self, infile):
         self.options = {}
         self.batches = []
-        in_options = False
+        self._iterations = None
+        self._values = None
 
+        if is_binary_log(infile):
+            self._load_binary(infile.name)
+            return
+
+        in_options = False
         for line in infile:
             lastbatch = self.batches[-1] if self.batches else None
 
@@ -72,14 +193,27 @@ class PSOData(object):
             lastbatch.add(iteration, value)
 
         if not lastbatch.done:
-            print 'WARNING: ignoring last batch (incomplete)'
+            print('WARNING: ignoring last batch (incomplete)')
             del self.batches[-1]
 
+    def _load_binary(self, path):
+        records = map_log(path)
+        # Find where each batch starts.
+        starts = np.flatnonzero(np.diff(records['batch'])) + 1
+        for chunk in np.split(records, starts):
+            if not len(chunk):
+                continue
+            if chunk['iteration'][-1] != DONE_ITERATION:
+                print('WARNING: ignoring batch %s (incomplete)'
+                        % chunk['batch'][0])
+                continue
+            self.batches.append(ArrayBatch(chunk[:-1]))
+
     def _add_option_line(self, line):
         assert line[0] == '#'
         line = line[1:]
         if '=' not in line:
-            print line
+            print(line)
         key, value = line.split('=', 1)
         key = key.strip()
         value = value.strip()
@@ -94,10 +228,50 @@ class PSOData(object):
     def __len__(self):
         return len(self.batches)
 
+    def _align(self):
+        """Builds the matrix of values for the iterations in every batch."""
+        if not self.batches:
+            self._iterations = np.zeros(0, dtype=int)
+            self._values = np.zeros((0, 0))
+            return
+        iterations = np.array(list(self.batches[0]), dtype=int)
+        for batch in self.batches[1:]:
+            keys = np.array(list(batch), dtype=int)
+            iterations = iterations[np.in1d(iterations, keys)]
+        self._iterations = iterations
+        self._values = np.array([batch.column(iterations)
+            for batch in self.batches], dtype=float)
+
+    @property
+    def iterations(self):
+        """The iterations that appear in every batch (an array)."""
+        if self._iterations is None:
+            self._align()
+        return self._iterations
+
+    @property
+    def values(self):
+        """A (batches x iterations) matrix of the values at `iterations`."""
+        if self._values is None:
+            self._align()
+        return self._values
+
+    def _key_values(self, key):
+        """Returns an array of the value for the given key in each batch."""
+        index = np.searchsorted(self.iterations, key)
+        if index < len(self.iterations) and self.iterations[index] == key:
+            return self.values[:, index]
+        else:
+            return np.array([batch[key] for batch in self.batches])
+
     def average(self, key):
         """Finds the average for a given key."""
-        values = [batch[key] for batch in self.batches]
-        return sum(values) / len(values)
+        values = self._key_values(key)
+        return float(values.sum()) / len(values)
+
+    def averages(self):
+        """Finds the average for each of the `iterations` (an array)."""
+        return self.values.sum(axis=0) / len(self.batches)
 
     def statistics(self, key, trim):
         """Finds low, median, and high values after trimming outliers.
@@ -105,12 +279,26 @@ class PSOData(object):
         Note that if trim is 2, and we have 20 samples, this is the 10th,
         50th, and 90th percentiles.
         """
-        values = [batch[key] for batch in self.batches]
-        values.sort()
+        values = np.sort(self._key_values(key)).tolist()
         trimmed = values[trim:-1-trim]
         midpoint = int(len(values) / 2)
         med = (values[midpoint] + values[-midpoint]) / 2
         return trimmed[0], med, trimmed[-1]
 
+    def all_statistics(self, trim):
+        """Finds low, median, and high values for each of the `iterations`.
+
+        Returns three arrays, which hold the values that `statistics` gives
+        for each iteration.
+        """
+        values = np.sort(self.values, axis=0)
+        count = len(values)
+        if count - 2 - 2 * trim < 0:
+            raise IndexError('Too few batches to trim %s from each end'
+                    % trim)
+        midpoint = int(count / 2)
+        med = (values[midpoint] + values[-midpoint]) / 2
+        return values[trim], med, values[count - 2 - trim]
+
 
 # vim: et sw=4 sts=4
@@ -0,0 +1,279 @@
+"""Counter-based random number streams.
+
+Seeding a Mersenne Twister for every particle on every iteration is
+expensive, and so is drawing its values one scalar at a time.  A
+counter-based generator needs no seeding: the output for any position in any
+stream is a pure function of the key and the counter, so whole blocks of
+values for many particles can be computed with a few array operations.  We
+use the Philox4x32-10 generator of Salmon et al., "Parallel Random Numbers:
+As Easy as 1, 2, 3" (SC 2011).
+
+A stream is identified by the Mrs seed and by an (offset, id, iters, swarmid)
+tuple, just like the Randoms given by `StandardPSO.random`.  Since the values
+depend only on that identity, runs are reproducible regardless of whether
+they are done in Bypass, Serial, or parallel Mrs.
+"""
+
+from __future__ import division
+
+import random
+
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+try:
+    range = xrange
+except NameError:
+    pass
+
+_MASK32 = np.uint64(0xFFFFFFFF)
+_SHIFT32 = np.uint64(32)
+_SHIFT11 = np.uint64(11)
+_PHILOX_M0 = np.uint64(0xD2511F53)
+_PHILOX_M1 = np.uint64(0xCD9E8D57)
+_PHILOX_W0 = np.uint64(0x9E3779B9)
+_PHILOX_W1 = np.uint64(0xBB67AE85)
+_PHILOX_ROUNDS = 10
+
+# Each Philox block gives four 32-bit words, which we use as two 64-bit draws.
+DRAWS_PER_BLOCK = 2
+# Number of blocks that a CounterRandom computes at a time.
+BUFFER_BLOCKS = 16
+
+MAX_OFFSET = 1 << 8
+MAX_SWARMID = 1 << 24
+MAX_COUNTER = 1 << 32
+
+
+def philox4x32(counter, key):
+    """Computes the Philox4x32-10 function.
+
+    The `counter` is an array of shape (..., 4) and the `key` is an array of
+    shape (..., 2) that is broadcast against it.  Both hold 32-bit words
+    (in any integer dtype).  Returns an array of shape (..., 4) of uint64
+    holding 32-bit words.
+
+    >>> out = philox4x32(np.array([0, 0, 0, 0]), np.array([0, 0]))
+    >>> ' '.join('%08x' % x for x in out)
+    '6627e8d5 e169c58d bc57ac4c 9b00dbd8'
+    >>>
+    """
+    counter = np.asarray(counter).astype(np.uint64)
+    key = np.asarray(key).astype(np.uint64)
+    c0, c1, c2, c3 = (counter[..., i] for i in range(4))
+    k0 = key[..., 0]
+    k1 = key[..., 1]
+    for i in range(_PHILOX_ROUNDS):
+        prod0 = _PHILOX_M0 * c0
+        prod1 = _PHILOX_M1 * c2
+        c0 = (prod1 >> _SHIFT32) ^ c1 ^ k0
+        c1 = prod1 & _MASK32
+        c2 = (prod0 >> _SHIFT32) ^ c3 ^ k1
+        c3 = prod0 & _MASK32
+        k0 = (k0 + _PHILOX_W0) & _MASK32
+        k1 = (k1 + _PHILOX_W1) & _MASK32
+    return np.stack(np.broadcast_arrays(c0, c1, c2, c3), axis=-1)
+
+
+def seed_key(seed):
+    """Converts a Mrs seed (an int or a string of digits) to a Philox key.
+
+    Seeds larger than 64 bits are folded into 64 bits.
+    """
+    seed = abs(int(seed))
+    folded = 0
+    while seed:
+        folded ^= seed & 0xFFFFFFFFFFFFFFFF
+        seed >>= 64
+    return np.array([folded & 0xFFFFFFFF, folded >> 32], dtype=np.uint64)
+
+
+def stream_counters(offset, ids, iters, swarmid):
+    """Returns the fixed counter words (all but the block index) for streams.
+
+    The arguments may be ints or arrays, which are broadcast together.
+    Returns an array of shape (..., 3).
+    """
+    ids = np.asarray(ids)
+    iters = np.asarray(iters)
+    swarmid = np.asarray(swarmid)
+    if not 0 <= offset < MAX_OFFSET:
+        raise ValueError('Stream offset out of range: %s' % offset)
+    if np.any(swarmid < 0) or np.any(swarmid >= MAX_SWARMID):
+        raise ValueError('Swarm id out of range for a random stream')
+    if (np.any(ids < 0) or np.any(ids >= MAX_COUNTER) or np.any(iters < 0)
+            or np.any(iters >= MAX_COUNTER)):
+        raise ValueError('Particle id or iteration out of range for a random'
+                ' stream')
+    tag = (swarmid.astype(np.uint64) << np.uint64(8)) | np.uint64(offset)
+    parts = np.broadcast_arrays(ids.astype(np.uint64),
+            iters.astype(np.uint64), tag)
+    return np.stack(parts, axis=-1)
+
+
+def stream_draws(key, counters, start, num):
+    """Returns 64-bit draws `start` to `start + num` of the given streams.
+
+    The `counters` array has shape (..., 3) as given by `stream_counters`.
+    Returns a uint64 array of shape (..., num).
+    """
+    first_block = start // DRAWS_PER_BLOCK
+    last_block = (start + num - 1) // DRAWS_PER_BLOCK
+    blocks = np.arange(first_block, last_block + 1, dtype=np.uint64)
+
+    counters = np.asarray(counters, dtype=np.uint64)
+    shape = counters.shape[:-1] + (len(blocks), 4)
+    full = np.empty(shape, dtype=np.uint64)
+    full[..., 0] = blocks
+    full[..., 1:] = counters[..., np.newaxis, :]
+    words = philox4x32(full, key)
+
+    draws = (words[..., 0::2] << _SHIFT32) | words[..., 1::2]
+    draws = draws.reshape(counters.shape[:-1] + (-1,))
+    skip = start - first_block * DRAWS_PER_BLOCK
+    return draws[..., skip:skip + num]
+
+
+def draws_to_unit(draws):
+    """Converts 64-bit draws to floats in [0, 1) with 53 bits of precision."""
+    return (draws >> _SHIFT11).astype(float) * (1.0 / 9007199254740992.0)
+
+
+class CounterRandom(random.Random):
+    """A Random whose values come from a single counter-based stream.
+
+    Since this overrides `random` and `getrandbits`, all of the usual methods
+    (uniform, randrange, gauss, shuffle, etc.) are available.  Note that the
+    values differ from those of a Mersenne Twister seeded the same way.
+
+    >>> rand = CounterRandom(seed_key(42), 1, 7, 3)
+    >>> a = [rand.random() for i in range(5)]
+    >>> rand = CounterRandom(seed_key(42), 1, 7, 3)
+    >>> b = list(rand.uniform_array(0, 1, 5))
+    >>> a == b
+    True
+    >>>
+    """
+    def __new__(cls, *args, **kwds):
+        # The underlying C type would otherwise interpret args as a seed.
+        return super(CounterRandom, cls).__new__(cls)
+
+    def __init__(self, key, offset, id=0, iters=0, swarmid=0):
+        self._key = key
+        self._counters = stream_counters(offset, id, iters, swarmid)
+        super(CounterRandom, self).__init__()
+
+    def seed(self, a=None, *args, **kwds):
+        """Rewinds to the start of the stream (the argument is ignored)."""
+        self._position = 0
+        self._buffer = np.zeros(0, dtype=np.uint64)
+        self._units = []
+        self._buffer_start = 0
+        self.gauss_next = None
+
+    def getstate(self):
+        return (self._position, self.gauss_next)
+
+    def setstate(self, state):
+        self._position, self.gauss_next = state
+
+    def jumpahead(self, n):
+        self._position += n
+
+    def _draws(self, num):
+        """Returns the next `num` 64-bit draws as a uint64 array."""
+        start = self._position
+        end = start + num
+        buffer_start = self._buffer_start
+        if start < buffer_start or end > buffer_start + len(self._buffer):
+            count = max(num, BUFFER_BLOCKS * DRAWS_PER_BLOCK)
+            self._buffer = stream_draws(self._key, self._counters, start,
+                    count)
+            self._units = None
+            self._buffer_start = buffer_start = start
+        self._position = end
+        return self._buffer[start - buffer_start:end - buffer_start]
+
+    def random(self):
+        index = self._position - self._buffer_start
+        if self._units is None or not 0 <= index < len(self._units):
+            self._draws(1)
+            self._position -= 1
+            index = self._position - self._buffer_start
+            # Scalar draws are much faster from a list than from an array.
+            self._units = draws_to_unit(self._buffer).tolist()
+        self._position += 1
+        return self._units[index]
+
+    def getrandbits(self, k):
+        if k <= 0:
+            raise ValueError('number of bits must be greater than zero')
+        chunks = (k + 63) // 64
+        value = 0
+        for draw in self._draws(chunks):
+            value = (value << 64) | int(draw)
+        return value >> (chunks * 64 - k)
+
+    def _randbelow(self, n, *args, **kwds):
+        # Python 2's randrange uses int(random() * n) for all reasonable n, and
+        # this makes Python 3 do the same so that `StreamBatch.randbelow` can
+        # match it.
+        return int(self.random() * n)
+
+    def uniform_array(self, a, b, n):
+        """Draw an array of n random variables distributed as Uniform(a, b).
+
+        The values are the same as from n calls to `uniform`.
+        """
+        return a + (b - a) * draws_to_unit(self._draws(n))
+
+
+class StreamBatch(object):
+    """A set of counter-based streams that are advanced together.
+
+    Row i of each block of values comes from the stream for `ids[i]` and
+    `iters[i]`.  Iterating gives a CounterRandom for each row, positioned at
+    the current draw, for code that needs one Random per particle.
+    """
+    def __init__(self, key, offset, ids, iters, swarmid=0):
+        self._key = key
+        self._offset = offset
+        self._ids = np.asarray(ids)
+        self._iters = np.asarray(iters)
+        self._swarmid = np.broadcast_to(swarmid, self._ids.shape)
+        self._counters = stream_counters(offset, self._ids, self._iters,
+                self._swarmid)
+        self._position = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __iter__(self):
+        for id, iters, swarmid in zip(self._ids.tolist(),
+                self._iters.tolist(), self._swarmid.tolist()):
+            rand = CounterRandom(self._key, self._offset, id, iters, swarmid)
+            rand.jumpahead(self._position)
+            yield rand
+
+    def uniform(self, a, b, n):
+        """Draw a (len(self) x n) array of Uniform(a, b) random variables.
+
+        Row i holds the same values as `uniform_array(a, b, n)` on the
+        stream for row i.
+        """
+        draws = stream_draws(self._key, self._counters, self._position, n)
+        self._position += n
+        return a + (b - a) * draws_to_unit(draws)
+
+    def randbelow(self, n, k):
+        """Draw a (len(self) x k) array of random ints in [0, n).
+
+        Row i holds the same values as k calls to `randrange(n)` on the
+        stream for row i.
+        """
+        return (self.uniform(0, 1, k) * n).astype(int)
+
+
+# vim: et sw=4 sts=4
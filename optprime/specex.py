@@ -30,11 +30,15 @@ class SpecExPSO(standardpso.StandardPSO):
         if self.opts.min_tokens * self.topology.num > self.opts.tokens:
             raise ValueError("There aren't enough tokens to satisfy the min "
                     "token requirement.")
+        self.iteration = 0
+        # The evaluations counted in the latest output (see `consumer`).
+        self.evals = 0
 
     ##########################################################################
     # MapReduce Implementation
     def producer(self, job):
-        if self.iteration > self.opts.iters:
+        if (self.iteration > self.opts.iters or
+                self.budget_exhausted(self.evals)):
             return []
 
         elif self.iteration == 0:
@@ -43,7 +47,9 @@ class SpecExPSO(standardpso.StandardPSO):
             out_data = None
 
             rand = self.initialization_rand()
-            particles = list(self.topology.newparticles(rand))
+            # Only BranchParticles may be given tokens.
+            particles = [BranchParticle(p.id, p.pos, p.vel)
+                    for p in self.topology.newparticles(rand)]
             self.move_all(particles)
             for particle in particles:
                 particle.tokens = self.opts.min_tokens
@@ -121,30 +127,39 @@ class SpecExPSO(standardpso.StandardPSO):
             iteration = self.out_datasets[dataset]
             del self.out_datasets[dataset]
 
-            if 'best' in self.output.args or 'particles' in self.output.args:
-                dataset.fetchall()
-                particles = []
-                for reduce_id, particle in dataset.iterdata():
-                    # Only output real particles, not SEParticles.
-                    # Also, outputs that use current particle
-                    # position and value will be off on the value,
-                    # because it hasn't been evaluated yet.
-                    if type(value) == BranchParticle:
-                        particles.append(value)
+            # The slaves send their evaluation counts (including the
+            # speculative children) along with the particles.
+            dataset.fetchall()
+            particles = []
+            evals = 0
+            for reduce_id, particle in dataset.iterdata():
+                if isinstance(particle, EvalCount):
+                    evals += particle.evals
+                # Only output real particles, not SEParticles.
+                # Also, outputs that use current particle
+                # position and value will be off on the value,
+                # because it hasn't been evaluated yet.
+                elif type(particle) == BranchParticle:
+                    particles.append(particle)
             if dataset != self.last_data:
                 dataset.close()
+            self.evals = evals
             kwds = {}
             if 'iteration' in self.output.args:
-                kwds['iteration'] = last_iteration
+                kwds['iteration'] = iteration
+            if 'evals' in self.output.args:
+                kwds['evals'] = evals
             if 'particles' in self.output.args:
                 kwds['particles'] = particles
             if 'best' in self.output.args:
-                print "len=", len(particles)
                 kwds['best'] = self.findbest(particles)
+            if 'profile' in self.output.args:
+                kwds['profile'] = self.profiler
             self.output(**kwds)
             if self.stop_condition(particles):
                 self.output.success()
                 return False
+            return not self.budget_exhausted(evals)
 
         return True
 
@@ -152,9 +167,16 @@ class SpecExPSO(standardpso.StandardPSO):
     # Primary MapReduce
 
     def sepso_map(self, key, particle):
+        if isinstance(particle, EvalCount):
+            yield (key, particle)
+            return
         assert particle.id == int(key)%self.topology.num
         prev_val = particle.pbestval
+        evals = self.eval_counter.evals
         self.just_evaluate(particle)
+        # Children send their counts to the reduce task of their parent.
+        yield (str(particle.id),
+                EvalCount(self.eval_counter.evals - evals))
 
         # If we didn't update our pbest, pass a token to someone else
         if (type(particle) == BranchParticle and particle.pbestval == prev_val
@@ -189,11 +211,14 @@ class SpecExPSO(standardpso.StandardPSO):
         children = []
         it2messages = []
         tokens = 0
+        counts = []
         for value in value_iter:
             if value == 'token':
                 tokens += 1
                 continue
-            if type(value) == BranchParticle:
+            if isinstance(value, EvalCount):
+                counts.append(value)
+            elif type(value) == BranchParticle:
                 particle = value
             elif type(value) == SEParticle:
                 children.append(value)
@@ -253,6 +278,8 @@ class SpecExPSO(standardpso.StandardPSO):
         for i, child in enumerate(nchildren):
             newkey = (i+1)*self.topology.num+int(key)
             yield str(newkey)+'^'+repr(child)
+        if counts:
+            yield EvalCount(EvalCount.total(counts))
 
     def sepso_tmp_map(self, key, value):
         newkey, newvalue = value.split('^', 1)
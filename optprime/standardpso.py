@@ -4,15 +4,29 @@ from __future__ import division
 from __future__ import print_function
 
 import copy
-import datetime
+import multiprocessing.util
+import os
 import sys
 import time
 
 import mrs
 from mrs import param
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
+from . import checkpoint
 from . import cli
-from .particle import Particle, Message
+from . import codec
+from . import parallel
+from . import profiling
+from . import tuning
+from .arrayswarm import ArraySwarm, MessageBlock, neighborhood_best, sort_key
+from .evalcache import EvaluationCache, EvaluationCounter
+from .particle import Particle, Message, Dummy, EvalCount
+from .randstream import CounterRandom, StreamBatch, seed_key
 
 try:
     range = xrange
@@ -23,6 +37,11 @@ except NameError:
 
 
 class StandardPSO(mrs.GeneratorCallbackMR):
+    # Binary serializer for Particle, Message, and Swarm values.  Map
+    # functions give it by name, so Mrs finds the timed one that
+    # `enable_profiling` sets on the instance.
+    particle_serializer = mrs.Serializer(codec.dumps, codec.loads)
+
     def __init__(self, opts, args):
         """Mrs Setup (run on both master and slave)"""
 
@@ -33,10 +52,35 @@ class StandardPSO(mrs.GeneratorCallbackMR):
         self.motion = param.instantiate(opts, 'motion')
         self.topology = param.instantiate(opts, 'top')
 
+        if opts.counter_rng:
+            self.rand_key = seed_key(opts.mrs__seed)
+        else:
+            self.rand_key = None
+
         self.function.setup(self.func_init_rand())
+        if opts.eval_cache and not self.function.stochastic:
+            self.eval_cache = EvaluationCache(self.function, opts.eval_cache)
+            self.function = self.eval_cache
+        else:
+            self.eval_cache = None
+        self.eval_counter = EvaluationCounter(self.function)
+        self.function = self.eval_counter
         self.motion.setup(self.function)
         self.topology.setup(self.function)
 
+        # Blocks already send at most one message per particle to each block.
+        self.broadcast = (opts.broadcast_gbest and self.topology.complete
+                and not opts.block_size)
+
+        if opts.checkpoint:
+            self.checkpointer = checkpoint.CheckpointWriter(opts.checkpoint)
+        else:
+            self.checkpointer = None
+
+        self.profiler = None
+        if opts.profile or 'profile' in param.import_object(opts.out).args:
+            self.enable_profiling()
+
     ##########################################################################
     # Bypass Implementation
 
@@ -48,12 +92,17 @@ class StandardPSO(mrs.GeneratorCallbackMR):
 
         # Perform simulation
         try:
-            self.output = param.instantiate(self.opts, 'out')
-            self.output.start()
+            self.start_output()
             self.bypass_run()
-            self.output.finish()
+            if self.eval_cache is not None:
+                print('#', self.eval_cache.report())
+            self.finish_output()
         except KeyboardInterrupt as e:
             print("# INTERRUPTED")
+        finally:
+            if self.checkpointer is not None:
+                self.checkpointer.wait()
+            self.report_profile()
         return 0
 
     def bypass_run(self):
@@ -62,44 +111,109 @@ class StandardPSO(mrs.GeneratorCallbackMR):
         Compare to the producer/consumer methods, which use MapReduce to do
         the same thing.
         """
-        # Create the Population.
-        particles = []
-        for i in range(self.topology.num):
-            rand = self.initialization_rand(i)
-            p = self.topology.newparticle(i, rand)
-            particles.append(p)
+        if self.opts.processes:
+            return self.parallel_run()
+        if self.opts.vectorized:
+            return self.vectorized_run()
+
+        start, particles = self.initial_particles()
+        # The global best is kept up to date as pbests improve, so the
+        # output phase doesn't need to scan the swarm.
+        best = self.findbest(particles)
 
         # Perform PSO Iterations.  The iteration number represents the total
         # number of function evaluations that have been performed for each
         # particle by the end of the iteration.
-        for iteration in range(1, 1 + self.opts.iters):
-            self.bypass_iteration(particles)
-
-            # Output phase.  (If freq is 5, output after iters 1, 6, 11, etc.)
-            if self.output.freq and not ((iteration - 1) % self.output.freq):
+        for iteration in range(start + 1, 1 + self.opts.iters):
+            improved = self.bypass_iteration(particles)
+            best = self.update_best(best, improved)
+            exhausted = self.budget_exhausted(self.eval_counter.evals)
+
+            # Output phase.  (If freq is 5, output after iters 1, 6, 11, etc.,
+            # and when the budget runs out.)
+            if self.output.freq and (exhausted
+                    or not ((iteration - 1) % self.output.freq)):
                 kwds = {}
                 if 'iteration' in self.output.args:
                     kwds['iteration'] = iteration
+                if 'evals' in self.output.args:
+                    kwds['evals'] = self.eval_counter.evals
                 if 'particles' in self.output.args:
                     kwds['particles'] = particles
                 if 'best' in self.output.args:
-                    kwds['best'] = self.findbest(particles)
+                    kwds['best'] = best
+                if 'profile' in self.output.args:
+                    kwds['profile'] = self.profiler
+                if 'locality' in self.output.args:
+                    kwds['locality'] = self.cross_task_fraction(iteration)
                 self.output(**kwds)
-                if self.stop_condition(particles):
+                if self.function.is_opt(best.pbestval):
                     self.output.success()
                     return
+            if exhausted:
+                return
+            if self.checkpoint_due(iteration):
+                self.save_checkpoint(iteration, particles)
+
+    def initial_particles(self):
+        """Returns the number of completed iterations and the particles.
+
+        When resuming, these come from the checkpoint.  Otherwise, a new
+        swarm is created.
+        """
+        start, particles = self.resume_checkpoint()
+        if particles is None:
+            particles = []
+            for i in range(self.topology.num):
+                rand = self.initialization_rand(i)
+                p = self.topology.newparticle(i, rand)
+                particles.append(p)
+        else:
+            # Each particle has been evaluated once per iteration.
+            self.eval_counter.evals = sum(p.iters for p in particles)
+        return start, particles
+
+    def initial_swarm(self):
+        """Returns the number of completed iterations and an ArraySwarm.
+
+        This is like `initial_particles`, but a new swarm is created directly
+        in arrays (see `new_array_swarm`).
+        """
+        start, particles = self.resume_checkpoint()
+        if particles is None:
+            swarm = self.new_array_swarm(np.arange(self.topology.num))
+        else:
+            self.eval_counter.evals = sum(p.iters for p in particles)
+            swarm = ArraySwarm.from_particles(particles,
+                    self.function.comparator)
+        return start, swarm
+
+    def new_array_swarm(self, ids):
+        """Returns an ArraySwarm of new particles with the given ids.
+
+        The particles are the same as from `topology.newparticle` with
+        `initialization_rand`, but with --counter-rng, they are all drawn at
+        once.
+        """
+        iters = np.zeros(len(ids), dtype=int)
+        rands = self.stream_rands_for(self.INITIALIZATION_OFFSET, ids, iters)
+        pos, vel = self.topology.newarrays(rands)
+        return ArraySwarm(ids, pos, vel, self.function.comparator)
 
     def bypass_iteration(self, particles, swarmid=0):
         """Runs one iteration of PSO.
 
         The swarmid is used for seed initialization when this is used in
-        subswarms.
+        subswarms.  Returns a list of the particles whose pbest improved.
         """
         # Update position and value.
-        for p in particles:
-            self.move_and_evaluate(p, swarmid)
+        improved = [p for p in particles if self.move_and_evaluate(p, swarmid)]
+
+        self.bypass_communicate(particles, swarmid)
+        return improved
 
-        # Communication phase.
+    def bypass_communicate(self, particles, swarmid=0):
+        """Runs the communication phase of `bypass_iteration`."""
         comp = self.function.comparator
         # With shuffled subswarms, the individual topology may be dynamic,
         # so adapt the swarm size of the topology if necessary.
@@ -117,6 +231,185 @@ class StandardPSO(mrs.GeneratorCallbackMR):
                 if self.opts.transitive_best:
                     neighbor.nbest_cand(p.nbestpos, p.nbestval, comp)
 
+    ##########################################################################
+    # Vectorized Bypass Implementation
+
+    def vectorized_run(self):
+        """Performs PSO without MapReduce, storing the swarm in arrays.
+
+        This follows the same steps as the object-based `bypass_run`, but
+        motion, evaluation, and communication operate on an ArraySwarm.
+        """
+        start, swarm = self.initial_swarm()
+        for iteration in range(start + 1, 1 + self.opts.iters):
+            self.vectorized_iteration(swarm)
+            if self.vectorized_output(swarm, iteration):
+                return
+            if self.checkpoint_due(iteration):
+                self.save_checkpoint(iteration, swarm.particles())
+
+    def vectorized_output(self, swarm, iteration):
+        """Runs the output phase for an ArraySwarm.
+
+        Returns True if the stopping criteria have been met or the budget has
+        run out.
+        """
+        exhausted = self.budget_exhausted(self.eval_counter.evals)
+        # If freq is 5, output after iters 1, 6, 11, etc., and when the
+        # budget runs out.
+        if self.output.freq and (exhausted
+                or not ((iteration - 1) % self.output.freq)):
+            kwds = {}
+            if 'iteration' in self.output.args:
+                kwds['iteration'] = iteration
+            if 'evals' in self.output.args:
+                kwds['evals'] = self.eval_counter.evals
+            if 'particles' in self.output.args:
+                kwds['particles'] = swarm.particles()
+            if 'best' in self.output.args:
+                kwds['best'] = swarm.best()
+            if 'profile' in self.output.args:
+                kwds['profile'] = self.profiler
+            if 'locality' in self.output.args:
+                kwds['locality'] = self.cross_task_fraction(iteration)
+            self.output(**kwds)
+            if self.function.is_opt(swarm.pbestval[swarm.best_index()]):
+                self.output.success()
+                return True
+        return exhausted
+
+    def vectorized_iteration(self, swarm, swarmid=0):
+        """Runs one iteration of PSO on an ArraySwarm.
+
+        The results match `bypass_iteration` except with `transitive_best`,
+        where each particle sends the nbest that it had at the start of the
+        communication phase (as in the MapReduce implementation).  Note that
+        the function's `evaluate_batch` may round differently than evaluating
+        one particle at a time, which is enough for trajectories to diverge.
+        """
+        self.vectorized_move(swarm, swarmid)
+        self.vectorized_communicate(swarm, swarmid)
+
+    def vectorized_move(self, swarm, swarmid=0):
+        """Moves, evaluates, and updates every particle of an ArraySwarm.
+
+        Returns a boolean array that is True for particles whose pbest
+        improved.
+        """
+        moving = swarm.iters > 0
+        if moving.any():
+            rands = self.motion_rands(swarm, swarmid)
+            newpos, newvel = self.motion.move_swarm(swarm, rands)
+            if not moving.all():
+                newpos = np.where(moving[:, np.newaxis], newpos, swarm.pos)
+                newvel = np.where(moving[:, np.newaxis], newvel, swarm.vel)
+        else:
+            newpos, newvel = swarm.pos, swarm.vel
+        values = self.function.evaluate_batch(newpos)
+        return swarm.update(newpos, newvel, values)
+
+    def vectorized_communicate(self, swarm, swarmid=0, rows=None):
+        """Runs the communication phase of `vectorized_iteration`.
+
+        If `rows` is given, only the particles in those rows receive messages.
+        """
+        if len(swarm) == self.topology.num:
+            topology = self.topology
+        else:
+            topology = copy.copy(self.topology)
+            topology.num = len(swarm)
+        num = len(swarm)
+        if topology.complete:
+            senders = np.arange(num)
+        else:
+            if topology.static:
+                rands = None
+            else:
+                rands = self.neighborhood_rands(swarm, swarmid)
+            indptr, recipients = topology.adjacency(swarm.ids, rands)
+            senders = np.repeat(np.arange(num), np.diff(indptr))
+
+        if self.opts.transitive_best:
+            # Each message is followed by the sender's nbest.
+            positions = np.concatenate((swarm.pbestpos, swarm.nbestpos))
+            values = np.concatenate((swarm.pbestval, swarm.nbestval))
+            senders = np.column_stack((senders, senders + num)).ravel()
+            if not topology.complete:
+                recipients = np.repeat(recipients, 2)
+        else:
+            positions = swarm.pbestpos
+            values = swarm.pbestval
+
+        if topology.complete:
+            swarm.gbest_cands(senders, positions, values,
+                    not topology.noselflink, rows)
+        else:
+            if rows is not None:
+                keep = np.in1d(recipients, rows)
+                senders = senders[keep]
+                recipients = recipients[keep]
+            swarm.nbest_cands(senders, recipients, positions, values)
+
+    ##########################################################################
+    # Parallel Bypass Implementation
+
+    def parallel_run(self):
+        """Performs PSO without MapReduce using a pool of processes.
+
+        The swarm is stored in an ArraySwarm in shared memory, and each
+        process moves, evaluates, and sends messages to a block of particles.
+        Each particle is handled exactly as in `bypass_run`, so the results
+        are the same.
+        """
+        start, swarm = self.initial_swarm()
+        parallel.share_swarm(swarm)
+
+        pool = parallel.SwarmPool(self, swarm, self.opts.processes)
+        try:
+            for iteration in range(start + 1, 1 + self.opts.iters):
+                self.parallel_iteration(pool, swarm)
+                if self.vectorized_output(swarm, iteration):
+                    break
+                if self.checkpoint_due(iteration):
+                    self.save_checkpoint(iteration, swarm.particles())
+        except:
+            pool.terminate()
+            raise
+        else:
+            pool.close()
+
+    def parallel_iteration(self, pool, swarm, swarmid=0):
+        """Runs one iteration of PSO on a shared ArraySwarm."""
+        pool.map('parallel_move', swarmid)
+        if self.opts.transitive_best:
+            # Each particle sends the nbest that it has after getting the
+            # messages from particles before it, so the order matters.
+            particles = swarm.particles()
+            self.bypass_communicate(particles, swarmid)
+            for i, p in enumerate(particles):
+                swarm.set_particle(i, p)
+        else:
+            pool.map('parallel_communicate', swarmid)
+
+    def parallel_move(self, swarm, start, stop, swarmid=0):
+        """Moves and evaluates the particles in the given rows of the swarm.
+
+        This is run in a worker process of a SwarmPool (and by `block_map`).
+        """
+        for i in range(start, stop):
+            p = swarm.particle(i)
+            self.move_and_evaluate(p, swarmid)
+            swarm.set_particle(i, p)
+
+    def parallel_communicate(self, swarm, start, stop, swarmid=0):
+        """Delivers messages to the particles in the given rows of the swarm.
+
+        This is run in a worker process of a SwarmPool.  Messages to a
+        particle are considered in the order that `bypass_communicate` would
+        send them.
+        """
+        self.vectorized_communicate(swarm, swarmid, np.arange(start, stop))
+
     ##########################################################################
     # MapReduce Implementation
 
@@ -125,20 +418,19 @@ class StandardPSO(mrs.GeneratorCallbackMR):
 
         This is run on the master.
         """
+        if self.opts.checkpoint:
+            raise ValueError('Checkpoints (--checkpoint) are only supported'
+                    ' by the Bypass implementation')
         if not self.cli_startup():
             return 1
 
         # Perform the simulation
         try:
             self.last_data = None
-            self.output = param.instantiate(self.opts, 'out')
-            self.output.start()
+            self.start_output()
 
-            job.default_partition = self.mod_partition
-            if self.opts.numtasks:
-                numtasks = self.opts.numtasks
-            else:
-                numtasks = self.topology.num
+            job.default_partition = self.partition_function()
+            numtasks = self.num_tasks()
             job.default_reduce_tasks = numtasks
             job.default_reduce_splits = numtasks
 
@@ -147,118 +439,204 @@ class StandardPSO(mrs.GeneratorCallbackMR):
                 self.iterative_qmax = 2 * self.output.freq
             else:
                 self.iterative_qmax = 2 * numtasks
+            self.start_async_tuner()
 
             mrs.GeneratorCallbackMR.run(self, job)
-            self.output.finish()
+            self.finish_output()
             return 0
         except KeyboardInterrupt as e:
             print("# INTERRUPTED")
             return 1
+        finally:
+            self.report_profile()
 
     def generator(self, job):
         self.out_datasets = {}
         out_data = None
 
-        kvpairs = ((i, b'') for i in range(self.topology.num))
+        kvpairs = ((i, b'') for i in range(self.num_keys()))
         start_swarm = job.local_data(kvpairs,
                 key_serializer=self.int_serializer,
                 value_serializer=self.raw_serializer)
-        data = job.map_data(start_swarm, self.init_map)
+        if self.opts.block_size:
+            # Messages are already combined within each block.
+            init_map = self.block_init_map
+            pso_map = self.block_map
+            pso_reduce = self.block_reduce
+            combiner = None
+        else:
+            init_map = self.init_map
+            pso_map = self.pso_map
+            pso_reduce = self.pso_reduce
+            if self.opts.combine_messages:
+                combiner = self.pso_combine
+            else:
+                combiner = None
+
+        data = job.map_data(start_swarm, init_map, combiner=combiner)
         start_swarm.close()
+        data = self.broadcast_data(job, data)
         yield data, None
         self.last_data = data
 
+        iters = self.opts.iters
+        if self.opts.max_evals:
+            # Every particle is evaluated once per iteration.
+            iters = min(iters, -(-self.opts.max_evals // self.topology.num))
         iteration = 1
-        while iteration <= self.opts.iters:
+        while iteration <= iters:
             need_output = (self.output.freq and
                     (iteration - 1) % self.output.freq == 0)
 
             if need_output:
-                num_reduce_tasks = getattr(self.opts, 'mrs__reduce_tasks', 1)
-                swarm_data = job.reduce_data(self.last_data, self.pso_reduce,
+                swarm_data = job.reduce_data(self.last_data, pso_reduce,
                         affinity=True)
                 if self.last_data not in self.out_datasets:
                     self.last_data.close()
-                data = job.map_data(swarm_data, self.pso_map, affinity=True)
-                if ('particles' not in self.output.args and
-                        'best' not in self.output.args):
-                    out_data = None
-                    swarm_data.close()
-                elif ('best' in self.output.args and num_reduce_tasks > 1):
-                    interm = job.map_data(swarm_data, self.collapse_map,
-                            splits=num_reduce_tasks)
+                data = job.map_data(swarm_data, pso_map, affinity=True,
+                        combiner=combiner)
+                if 'particles' in self.output.args:
+                    out_data = swarm_data
+                elif 'best' in self.output.args:
+                    out_data = self.findbest_data(job, swarm_data)
                     swarm_data.close()
-                    out_data = job.reduce_data(interm, self.findbest_reduce,
-                            splits=1)
-                    interm.close()
                 else:
-                    out_data = swarm_data
+                    out_data = None
+                    swarm_data.close()
 
             else:
                 out_data = None
                 if self.opts.async:
                     async_r = {"async_start": True}
-                    async_m = {"blocking_ratio": 0.75,
+                    async_m = {"blocking_ratio":
+                            self.async_tuner.map_ratio,
                             "backlink": self.last_data}
                 else:
                     async_r = {}
                     async_m = {}
                 if self.opts.split_reducemap:
-                    swarm = job.reduce_data(self.last_data, self.pso_reduce,
+                    swarm = job.reduce_data(self.last_data, pso_reduce,
                             affinity=True, **async_r)
                     if self.last_data not in self.out_datasets:
                         self.last_data.close()
-                    data = job.map_data(swarm, self.pso_map, affinity=True,
-                            **async_m)
+                    data = job.map_data(swarm, pso_map, affinity=True,
+                            combiner=combiner, **async_m)
                     swarm.close()
                 else:
                     if self.opts.async:
-                        async_rm = {"async_start": True, "blocking_ratio": 0.5,
+                        async_rm = {"async_start": True, "blocking_ratio":
+                                    self.async_tuner.reducemap_ratio,
                                     "backlink": self.last_data}
                     else:
                         async_rm = {}
-                    data = job.reducemap_data(self.last_data, self.pso_reduce,
-                            self.pso_map, affinity=True, **async_rm)
+                    data = job.reducemap_data(self.last_data, pso_reduce,
+                            pso_map, affinity=True,
+                            combiner=combiner, **async_rm)
                     if self.last_data not in self.out_datasets:
                         self.last_data.close()
 
+            data = self.broadcast_data(job, data)
             iteration += 1
             self.last_data = data
             if out_data:
                 self.out_datasets[out_data] = iteration
                 yield out_data, self.output_dataset_handler
 
-            yield data, None
+            if self.async_tuner is not None:
+                self.async_tuner.submitted()
+                yield data, self.async_dataset_handler
+            else:
+                yield data, None
+
+    def start_async_tuner(self):
+        """Creates `self.async_tuner` for the --async pipeline (or None).
+
+        The blocking ratios and `iterative_qmax` are only changed with
+        --async-tune, but every window is logged with --async-log.
+        """
+        if not self.opts.async:
+            self.async_tuner = None
+            return
+        if self.opts.async_tune or self.opts.async_log:
+            log = self.log_async
+        else:
+            log = None
+        self.async_tuner = tuning.AsyncTuner(self.iterative_qmax,
+                window=self.opts.async_window,
+                adaptive=self.opts.async_tune, log=log)
+
+    def log_async(self, message):
+        print('# Async:', message)
+        sys.stdout.flush()
+
+    def async_dataset_handler(self, dataset):
+        """Called when an iteration's dataset is complete (with --async)."""
+        self.async_tuner.completed()
+        self.iterative_qmax = self.async_tuner.qmax
+        return True
+
+    def broadcast_data(self, job, data):
+        """Adds the stage that broadcasts the global best, if enabled.
+
+        Otherwise, returns the given dataset unchanged.
+        """
+        if not self.broadcast:
+            return data
+        broadcast = job.reducemap_data(data, self.gbest_reduce,
+                self.gbest_map, affinity=True)
+        data.close()
+        return broadcast
 
     def output_dataset_handler(self, dataset):
         """Called when an output dataset is complete."""
         iteration = self.out_datasets[dataset]
         del self.out_datasets[dataset]
 
-        if 'best' in self.output.args or 'particles' in self.output.args:
-            dataset.fetchall()
-            particles = [particle for _, particle in dataset.data()]
+        # Without 'particles', the dataset only has the winners of
+        # `findbest_data`, not the whole swarm.  The evaluations happen on
+        # the slaves, which send their counts along with the particles.
+        dataset.fetchall()
+        candidates = []
+        evals = 0
+        for _, value in dataset.data():
+            if isinstance(value, EvalCount):
+                evals += value.evals
+            elif isinstance(value, ArraySwarm):
+                candidates.extend(value.particles())
+            else:
+                candidates.append(value)
         if dataset != self.last_data:
             dataset.close()
         kwds = {}
         if 'iteration' in self.output.args:
             kwds['iteration'] = iteration
+        if 'evals' in self.output.args:
+            kwds['evals'] = evals
         if 'particles' in self.output.args:
-            kwds['particles'] = particles
+            kwds['particles'] = candidates
         if 'best' in self.output.args:
-            kwds['best'] = self.findbest(particles)
+            best = self.findbest(candidates)
+            kwds['best'] = best
+            stop = self.function.is_opt(best.pbestval)
+        else:
+            stop = self.stop_condition(candidates)
+        if 'profile' in self.output.args:
+            kwds['profile'] = self.profiler
+        if 'locality' in self.output.args:
+            kwds['locality'] = self.cross_task_fraction(iteration)
         self.output(**kwds)
 
-        if self.stop_condition(particles):
+        if stop:
             self.output.success()
             return False
 
-        return True
+        return not self.budget_exhausted(evals)
 
     ##########################################################################
     # Primary MapReduce
 
-    @mrs.output_serializers(key=mrs.MapReduce.int_serializer)
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
     def init_map(self, particle_id, value):
         particle_id = int(particle_id)
         rand = self.initialization_rand(particle_id)
@@ -267,37 +645,43 @@ class StandardPSO(mrs.GeneratorCallbackMR):
         for kvpair in self.pso_map(particle_id, p):
             yield kvpair
 
-    @mrs.output_serializers(key=mrs.MapReduce.int_serializer)
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
     def pso_map(self, particle_id, particle):
+        if isinstance(particle, EvalCount):
+            yield (particle_id, particle)
+            return
         comparator = self.function.comparator
         assert particle.id == particle_id
 
-        before = datetime.datetime.now()
-
+        evals = self.eval_counter.evals
         self.move_and_evaluate(particle)
-        after = datetime.datetime.now()
-        delta = after - before
-        seconds = (delta.days * 86400 + delta.seconds
-                + delta.microseconds / 1000000)
 
         # Emit the particle without changing its id:
         yield (particle_id, particle)
+        yield (particle_id, EvalCount(self.eval_counter.evals - evals))
 
         # Emit a message for each dependent particle:
         message = particle.make_message(self.opts.transitive_best, comparator)
-        rand = self.neighborhood_rand(particle, 0)
-        for dep_id in self.topology.iterneighbors(particle, rand):
-            yield (dep_id, message)
+        if self.broadcast:
+            yield (self.GBEST_KEY, message)
+        else:
+            rand = self.neighborhood_rand(particle, 0)
+            for dep_id in self.topology.iterneighbors(particle, rand):
+                yield (dep_id, message)
 
     def pso_reduce(self, key, value_iter):
         comparator = self.function.comparator
         particle = None
         messages = []
+        counts = []
         for record in value_iter:
             if isinstance(record, Particle):
                 particle = record
             elif isinstance(record, Message):
                 messages.append(record)
+            elif isinstance(record, EvalCount):
+                counts.append(record)
             else:
                 raise ValueError('Expected Particle or Message but got %s' %
                         type(record))
@@ -310,28 +694,331 @@ class StandardPSO(mrs.GeneratorCallbackMR):
             yield particle
         else:
             yield best
+        if counts:
+            yield EvalCount(EvalCount.total(counts))
+
+    def pso_combine(self, key, value_iter):
+        """Keeps only the best of the messages to each key in a map task.
+
+        Since `pso_reduce` only uses the best of the messages that it gets,
+        the others can be dropped before they are written.  Messages already
+        carry pbest or nbest as required by `transitive_best`, and they are
+        compared with the function's comparator.  Other records (e.g.,
+        particles) pass through unchanged.
+        """
+        messages = []
+        for record in value_iter:
+            if isinstance(record, Message):
+                messages.append(record)
+            else:
+                yield record
+        if not messages:
+            return
+        if key == self.GBEST_KEY:
+            bests = self.gbest_messages(messages)
+        else:
+            bests = [self.findbest(messages)]
+        for message in bests:
+            yield message
+
+    ##########################################################################
+    # Assignment of Keys to Tasks
+
+    def num_keys(self):
+        """Returns the number of keys (particles or blocks) in the swarm."""
+        if self.opts.block_size:
+            return -(-self.topology.num // self.opts.block_size)
+        else:
+            return self.topology.num
+
+    def num_tasks(self):
+        """Returns the number of reduce tasks (by default, one per key)."""
+        if self.opts.numtasks:
+            return self.opts.numtasks
+        else:
+            return self.num_keys()
+
+    def partition_function(self):
+        """Returns the function that assigns keys to tasks."""
+        if self.opts.range_partition:
+            return self.range_partition
+        else:
+            return self.mod_partition
+
+    def range_partition(self, x, n):
+        """A partition function that gives each task a contiguous range of
+        keys.
+
+        Neighbors in a Ring or DRing have nearby ids, so most messages stay
+        within a task.  The ranges differ in size by at most one key.
+        Negative keys (e.g., `GBEST_KEY`) wrap around as in `mod_partition`.
+        """
+        return (int(x) * n // self.num_keys()) % n
+
+    def particle_keys(self, ids):
+        """Returns the key of the record holding each of the particle ids."""
+        if self.opts.block_size:
+            return ids // self.opts.block_size
+        else:
+            return ids
+
+    def cross_task_fraction(self, iteration):
+        """Returns the fraction of neighbor messages between different tasks.
+
+        This considers the messages sent by each particle to its neighbors in
+        the communication phase of the given iteration, with the partition
+        function and number of tasks that the MapReduce implementation uses.
+        """
+        num = self.topology.num
+        ids = np.arange(num)
+        if self.topology.static:
+            rands = None
+        else:
+            rands = [self.neighborhood_rand(Dummy(i, iteration))
+                    for i in range(num)]
+        indptr, recipients = self.topology.adjacency(ids, rands)
+        if not len(recipients):
+            return 0.0
+        senders = np.repeat(ids, np.diff(indptr))
+
+        partition = self.partition_function()
+        numtasks = self.num_tasks()
+        tasks = np.array([partition(key, numtasks)
+            for key in range(self.num_keys())])
+        cross = (tasks[self.particle_keys(senders)]
+                != tasks[self.particle_keys(recipients)])
+        return float(np.count_nonzero(cross)) / len(cross)
+
+    ##########################################################################
+    # MapReduce with Blocks of Particles (--block-size)
+
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
+    def block_init_map(self, block_id, value):
+        block_id = int(block_id)
+        size = self.opts.block_size
+        stop = min((block_id + 1) * size, self.topology.num)
+        block = self.new_array_swarm(np.arange(block_id * size, stop))
+
+        for kvpair in self.block_map(block_id, block):
+            yield kvpair
+
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
+    def block_map(self, block_id, block):
+        """Moves and evaluates a block of particles and sends its messages.
+
+        The block is an ArraySwarm with a contiguous range of particle ids.
+        Instead of a message per neighbor, the block sends one MessageBlock
+        to each block with any of its neighbors.  With --vectorized, the
+        block moves with array operations (see `vectorized_iteration`).
+        """
+        if isinstance(block, EvalCount):
+            yield (block_id, block)
+            return
+        evals = self.eval_counter.evals
+        if self.opts.vectorized:
+            self.vectorized_move(block)
+        else:
+            self.parallel_move(block, 0, len(block))
+
+        yield (block_id, block)
+
+        recipients, positions, values = self.block_messages(block)
+        num_keys = self.num_keys()
+        bounds = np.searchsorted(recipients,
+                self.opts.block_size * np.arange(num_keys + 1))
+        for dest in range(num_keys):
+            start, stop = bounds[dest], bounds[dest + 1]
+            if start < stop:
+                yield (dest, MessageBlock(block_id, recipients[start:stop],
+                    positions[start:stop], values[start:stop]))
+        yield (block_id, EvalCount(self.eval_counter.evals - evals))
+
+    def block_messages(self, block, swarmid=0):
+        """Finds the best message from the block to each of its neighbors.
+
+        Returns (recipients, positions, values), where the recipients are
+        sorted ids.  Ties go to the message that `bypass_communicate` would
+        send first.  With `transitive_best`, each particle sends its pbest and
+        then the nbest that it had at the start of the communication phase
+        (as in `vectorized_communicate`).
+        """
+        comparator = self.function.comparator
+        topology = self.topology
+        num = len(block)
+        if self.opts.transitive_best:
+            positions = np.concatenate((block.pbestpos, block.nbestpos))
+            values = np.concatenate((block.pbestval, block.nbestval))
+            cands = np.column_stack((np.arange(num),
+                np.arange(num, 2 * num))).ravel()
+        else:
+            positions = block.pbestpos
+            values = block.pbestval
+            cands = np.arange(num)
+
+        if topology.complete:
+            # Every particle gets the best message, except that without
+            # selflinks, its sender gets the best from any other particle.
+            order = np.argsort(sort_key(values[cands], comparator),
+                    kind='mergesort')
+            recipients = np.arange(topology.num)
+            winners = np.empty(topology.num, dtype=int)
+            winners.fill(cands[order[0]])
+            if topology.noselflink:
+                owners = block.ids[cands[order] % num]
+                others = np.flatnonzero(owners != owners[0])
+                if len(others):
+                    winners[owners[0]] = cands[order[others[0]]]
+                else:
+                    keep = recipients != owners[0]
+                    recipients = recipients[keep]
+                    winners = winners[keep]
+        else:
+            if topology.static:
+                rands = None
+            else:
+                rands = self.neighborhood_rands(block, swarmid)
+            indptr, recipients = topology.adjacency(block.ids, rands)
+            senders = np.repeat(np.arange(num), np.diff(indptr))
+            if self.opts.transitive_best:
+                senders = np.column_stack((senders, senders + num)).ravel()
+                recipients = np.repeat(recipients, 2)
+            recipients, winners = neighborhood_best(senders, recipients,
+                    values[senders], comparator)
+            winners = senders[winners]
+        return recipients, positions[winners], values[winners]
+
+    def block_reduce(self, key, value_iter):
+        """Delivers the MessageBlocks for a block to its particles.
+
+        Blocks of messages are considered in order of sender, so each
+        particle's nbest is the same as in `bypass_communicate`.
+        """
+        block = None
+        messages = []
+        counts = []
+        for record in value_iter:
+            if isinstance(record, ArraySwarm):
+                block = record
+            elif isinstance(record, MessageBlock):
+                messages.append(record)
+            elif isinstance(record, EvalCount):
+                counts.append(record)
+            else:
+                raise ValueError('Expected ArraySwarm or MessageBlock but'
+                        ' got %s' % type(record))
+        if block is None:
+            return
+
+        if messages:
+            recipients, positions, values = MessageBlock.concatenate(messages)
+            # The particle ids in a block are contiguous.
+            rows = recipients - block.ids[0]
+            block.nbest_cands(np.arange(len(values)), rows, positions, values)
+        yield block
+        if counts:
+            yield EvalCount(EvalCount.total(counts))
+
+    ##########################################################################
+    # MapReduce to Broadcast the Global Best (Complete topology)
+
+    # Key for the messages that are gathered to find the global best.
+    GBEST_KEY = -1
+
+    def gbest_reduce(self, key, value_iter):
+        """Finds the global best message (particles pass through).
+
+        Each particle in a Complete topology uses the best of all of the
+        messages, so `pso_reduce` gets the same result from just that one.
+        Without selflinks, the sender of the best message instead uses the
+        best message from any other particle, so that is found, too.
+        """
+        if key != self.GBEST_KEY:
+            for value in value_iter:
+                yield value
+            return
+
+        yield self.gbest_messages(list(value_iter))
+
+    def gbest_messages(self, messages):
+        """Returns a list with the best message and, without selflinks, the
+        best message from a different sender (if any)."""
+        best = self.findbest(messages)
+        bests = [best]
+        if self.topology.noselflink:
+            others = [m for m in messages if m.sender != best.sender]
+            if others:
+                bests.append(self.findbest(others))
+        return bests
+
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
+    def gbest_map(self, key, value):
+        if key != self.GBEST_KEY:
+            yield (key, value)
+            return
+
+        bests = value
+        best = bests[0]
+        for dep_id in range(self.topology.num):
+            if self.topology.noselflink and dep_id == best.sender:
+                if len(bests) > 1:
+                    yield (dep_id, bests[1])
+            else:
+                yield (dep_id, best)
 
     ##########################################################################
     # MapReduce to Find the Best Particle
 
-    @mrs.output_serializers(key=mrs.MapReduce.int_serializer)
+    def findbest_data(self, job, swarm_data):
+        """Reduces the swarm to its best particles in a tree.
+
+        Each map task keeps only its best particle for each reduce task (with
+        a combiner), and each reduce task keeps only the best of those, so
+        the master receives just one particle per reduce task.
+        """
+        num_reduce_tasks = getattr(self.opts, 'mrs__reduce_tasks', 1)
+        interm = job.map_data(swarm_data, self.collapse_map,
+                splits=num_reduce_tasks, parter=self.mod_partition,
+                combiner=self.findbest_reduce)
+        out_data = job.reduce_data(interm, self.findbest_reduce, splits=1)
+        interm.close()
+        return out_data
+
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
     def collapse_map(self, key, value):
-        new_key = key % self.opts.mrs__reduce_tasks
+        """Yields the particle (or the best of a block) with a key for one of
+        the reduce tasks.  EvalCounts pass through."""
+        if isinstance(value, ArraySwarm):
+            value = value.best()
+        new_key = key % getattr(self.opts, 'mrs__reduce_tasks', 1)
         yield new_key, value
 
     def findbest_reduce(self, key, value_iter):
-        particles = list(value_iter)
-        assert len(particles) == self.topology.num, (
-            'Only %s particles in findbest_reduce' % len(particles))
-
-        best = self.findbest(particles)
-        yield best
+        """Keeps only the best of the particles and the sum of the EvalCounts
+        (used as a combiner, too)."""
+        particles = []
+        counts = []
+        for value in value_iter:
+            if isinstance(value, EvalCount):
+                counts.append(value)
+            else:
+                particles.append(value)
+        if particles:
+            yield self.findbest(particles)
+        if counts:
+            yield EvalCount(EvalCount.total(counts))
 
     ##########################################################################
     # Helper Functions (shared by bypass and mrs implementations)
 
     def move_and_evaluate(self, p, swarmid=0):
-        """Moves, evaluates, and updates the given particle."""
+        """Moves, evaluates, and updates the given particle.
+
+        Returns True if the particle's pbest improved.
+        """
         motion_rand = self.motion_rand(p, swarmid)
         if p.iters > 0:
             newpos, newvel = self.motion(p, motion_rand)
@@ -340,7 +1027,109 @@ class StandardPSO(mrs.GeneratorCallbackMR):
         # TODO(?): value = self.function(newpos, p.rand)
         # Note that we cast to float because numpy returns numpy.float64. :(
         value = float(self.function(newpos))
-        p.update(newpos, newvel, value, self.function.comparator)
+        return p.update(newpos, newvel, value, self.function.comparator)
+
+    def resume_checkpoint(self):
+        """Returns the iteration and the objects saved in the checkpoint.
+
+        Returns (0, None) unless resuming from a checkpoint that exists.
+        """
+        path = self.opts.checkpoint
+        if self.opts.resume and path and os.path.exists(path):
+            return checkpoint.load(path, self.opts.mrs__seed)
+        else:
+            return 0, None
+
+    def checkpoint_due(self, iteration):
+        """Determines whether a checkpoint should be saved."""
+        return (self.checkpointer is not None
+                and not iteration % self.opts.checkpoint_freq)
+
+    def save_checkpoint(self, iteration, objects):
+        """Starts writing a checkpoint (the objects may be modified after)."""
+        self.checkpointer.write(iteration, self.opts.mrs__seed, list(objects))
+
+    def start_output(self):
+        """Instantiates and starts the output (and the clock for the time
+        budget).
+
+        When profiling, calls to the output are timed.
+        """
+        self.start_time = time.time()
+        self.output = param.instantiate(self.opts, 'out')
+        if self.profiler is not None:
+            self.output = self.profiler.wrap(self.output, 'output')
+        self.output.start()
+
+    def finish_output(self):
+        self.output.finish()
+        self.report_profile()
+
+    def enable_profiling(self):
+        """Times each phase of PSO in `self.profiler`.
+
+        The function, motion, and the methods for the other phases are
+        replaced by timed wrappers (see `profiling`).  This is done in each
+        process.  The master reports its profile at the end of the run, and
+        in parallel Mrs, each slave reports its own to stderr when its worker
+        process exits.
+        """
+        profiler = profiling.Profiler()
+        self.function = profiler.wrap(self.function, 'evaluation',
+                ('evaluate_batch',))
+        self.motion = profiler.wrap(self.motion, 'motion', ('move_swarm',))
+        for name in ('stream_rand', 'stream_rands_for'):
+            setattr(self, name, profiler.timed('rng', getattr(self, name)))
+        for name in ('bypass_communicate', 'vectorized_communicate',
+                'parallel_communicate', 'block_messages'):
+            setattr(self, name, profiler.timed('communication',
+                getattr(self, name)))
+        self.save_checkpoint = profiler.timed('serialization',
+                self.save_checkpoint)
+        for name in ('pso_reduce', 'pso_combine', 'gbest_reduce',
+                'block_reduce'):
+            setattr(self, name, profiler.timed_generator('communication',
+                getattr(self, name)))
+        self.particle_serializer = mrs.Serializer(
+                profiler.timed('serialization', codec.dumps),
+                profiler.timed('serialization', codec.loads))
+        self.profiler = profiler
+        # Mrs has no shutdown hook for slaves, but this runs when a worker
+        # process exits (and not in forked SwarmPool workers).  It doesn't
+        # keep the program alive.
+        multiprocessing.util.Finalize(self, profiling.report_to_stderr,
+                args=(profiler,), exitpriority=0)
+
+    def report_profile(self, file=None):
+        """Prints the profile summary unless it has already been reported."""
+        if self.profiler is not None:
+            self.profiler.report(file)
+
+    def budget_exhausted(self, evals):
+        """Determines whether the evaluation or time budget has run out.
+
+        The `evals` argument is the number of evaluations so far.
+        """
+        if self.opts.max_evals and evals >= self.opts.max_evals:
+            return True
+        return bool(self.opts.max_seconds and
+                time.time() - self.start_time >= self.opts.max_seconds)
+
+    def update_best(self, best, improved):
+        """Returns the global best given the particles whose pbest improved.
+
+        If `best` was the best particle of a swarm before some of its
+        particles improved, then this gives the same result as `findbest` on
+        the whole swarm, as long as the particles in the swarm are in order
+        of id (so ties go to the lowest id).
+        """
+        comparator = self.function.comparator
+        for p in improved:
+            if (best is None or best.pbestval is None
+                    or comparator(p, best)
+                    or (p.id < best.id and p.pbestval == best.pbestval)):
+                best = p
+        return best
 
     def findbest(self, candidates):
         """Returns the best particle or message from the given candidates."""
@@ -411,6 +1200,42 @@ class StandardPSO(mrs.GeneratorCallbackMR):
     FUNCTION_OFFSET = 5
     SUBITERS_OFFSET = 6
 
+    def stream_rand(self, offset, id=0, iters=0, swarmid=0):
+        """Returns a Random for the stream with the given identity.
+
+        With --counter-rng, this is a CounterRandom, which is much cheaper to
+        create than a seeded Mersenne Twister.  Otherwise, it is the same as
+        `self.random(offset, id, iters, swarmid)`.
+        """
+        if self.rand_key is not None:
+            return CounterRandom(self.rand_key, offset, id, iters, swarmid)
+        else:
+            return self.random(offset, id, iters, swarmid)
+
+    def stream_rands(self, offset, swarm, swarmid=0):
+        """Returns a Random for each row of an ArraySwarm.
+
+        With --counter-rng, this is a StreamBatch, which can also draw values
+        for every row at once.  Otherwise, it is a list of Randoms.
+        """
+        return self.stream_rands_for(offset, swarm.ids, swarm.iters, swarmid)
+
+    def stream_rands_for(self, offset, ids, iters, swarmid=0):
+        """Returns a Random for each of the given ids and iterations.
+
+        The swarmid may be an int or an array with one swarm id per entry.
+        As in `stream_rands`, this is a StreamBatch with --counter-rng and a
+        list of Randoms otherwise.
+        """
+        if self.rand_key is not None:
+            return StreamBatch(self.rand_key, offset, ids, iters, swarmid)
+        else:
+            ids = np.asarray(ids)
+            swarmids = np.broadcast_to(swarmid, ids.shape)
+            return [self.random(offset, i, it, sid) for i, it, sid in
+                    zip(ids.tolist(), np.asarray(iters).tolist(),
+                        swarmids.tolist())]
+
     def motion_rand(self, p, swarmid=0):
         """Makes a Random for the given particle and saves it to `p.rand`.
 
@@ -421,7 +1246,7 @@ class StandardPSO(mrs.GeneratorCallbackMR):
         sure that the particles in different subswarms have unique seeds), but
         it doesn't hurt the standardpso case to include it.
         """
-        return self.random(self.MOTION_OFFSET, p.id, p.iters, swarmid)
+        return self.stream_rand(self.MOTION_OFFSET, p.id, p.iters, swarmid)
 
     def neighborhood_rand(self, n, swarmid=0):
         """Returns a Random for the given node.
@@ -435,14 +1260,31 @@ class StandardPSO(mrs.GeneratorCallbackMR):
         sure that the particles in different subswarms have unique seeds), but
         it doesn't hurt the standardpso case to include it.
         """
-        return self.random(self.NEIGHBORHOOD_OFFSET, n.id, n.iters, swarmid)
+        return self.stream_rand(self.NEIGHBORHOOD_OFFSET, n.id, n.iters,
+                swarmid)
+
+    def motion_rands(self, swarm, swarmid=0):
+        """Returns the motion Randoms for the rows of an ArraySwarm.
+
+        Each Random is identical to the one from `motion_rand` for the
+        corresponding particle.
+        """
+        return self.stream_rands(self.MOTION_OFFSET, swarm, swarmid)
+
+    def neighborhood_rands(self, swarm, swarmid=0):
+        """Returns the neighborhood Randoms for the rows of an ArraySwarm.
+
+        Each Random is identical to the one from `neighborhood_rand` for the
+        corresponding particle.
+        """
+        return self.stream_rands(self.NEIGHBORHOOD_OFFSET, swarm, swarmid)
 
     def initialization_rand(self, i):
         """Returns a Random for the given particle id.
 
         This ensures that each run will have a unique initial swarm state.
         """
-        return self.random(self.INITIALIZATION_OFFSET, i)
+        return self.stream_rand(self.INITIALIZATION_OFFSET, i)
 
     def func_init_rand(self):
         """Returns a Random for function initialization."""
@@ -470,6 +1312,18 @@ class StandardPSO(mrs.GeneratorCallbackMR):
                 help='Number of iterations',
                 default=100,
                 )
+        parser.add_option('--max-evals',
+                dest='max_evals', type='int',
+                help='Stop after the iteration in which this many function'
+                ' evaluations are reached (if 0, no limit)',
+                default=0,
+                )
+        parser.add_option('--max-seconds',
+                dest='max_seconds', type='float',
+                help='Stop after the iteration in which this many seconds'
+                ' have elapsed (if 0, no limit)',
+                default=0,
+                )
         parser.add_option('-f', '--func', metavar='FUNCTION',
                 dest='func', action='extend', search=['optprime.functions'],
                 help='Function to optimize',
@@ -496,6 +1350,76 @@ class StandardPSO(mrs.GeneratorCallbackMR):
                 help='Number of tasks (if 0, create 1 task per particle)',
                 default=0,
                 )
+        parser.add_option('--range-partition',
+                dest='range_partition', action='store_true',
+                help='Assign a contiguous range of ids to each task (so'
+                ' that Ring neighbors are mostly in the same task)',
+                default=False,
+                )
+        parser.add_option('--block-size',
+                dest='block_size', type='int',
+                help='Number of particles in each MapReduce record, stored'
+                ' as arrays (if 0, one particle per record)',
+                default=0,
+                )
+        parser.add_option('--vectorized',
+                dest='vectorized', action='store_true',
+                help='Store the swarm in arrays in the Bypass implementation'
+                ' (and move blocks with array operations)',
+                default=False
+                )
+        parser.add_option('--processes',
+                dest='processes', type='int',
+                help='Number of processes for the Bypass implementation (if'
+                ' 0, run in a single process)',
+                default=0
+                )
+        parser.add_option('--eval-cache',
+                dest='eval_cache', type='int',
+                help='Number of recent function values to cache (ignored'
+                ' for stochastic functions)',
+                default=0
+                )
+        parser.add_option('--counter-rng',
+                dest='counter_rng', action='store_true',
+                help='Use counter-based random streams (faster, but gives'
+                ' different trajectories than the default)',
+                default=False
+                )
+        parser.add_option('--combine-messages',
+                dest='combine_messages', action='store_true',
+                help='Keep only the best message to each particle from each'
+                ' map task',
+                default=False
+                )
+        parser.add_option('--broadcast-gbest',
+                dest='broadcast_gbest', action='store_true',
+                help='With the Complete topology, send each particle just'
+                ' the global best (O(n) instead of O(n^2) messages)',
+                default=False
+                )
+        parser.add_option('--checkpoint', metavar='FILE',
+                dest='checkpoint',
+                help='File for periodic checkpoints of the Bypass'
+                ' implementation',
+                default='',
+                )
+        parser.add_option('--checkpoint-freq',
+                dest='checkpoint_freq', type='int',
+                help='Number of iterations between checkpoints',
+                default=100,
+                )
+        parser.add_option('--resume',
+                dest='resume', action='store_true',
+                help='Resume from the checkpoint file (if it exists)',
+                default=False,
+                )
+        parser.add_option('--profile',
+                dest='profile', action='store_true',
+                help='Record the time spent in each phase of PSO (see'
+                ' output.Profile)',
+                default=False,
+                )
         parser.add_option('--transitive-best',
                 dest='transitive_best', action='store_true',
                 help='Whether to send nbest to others instead of pbest',
@@ -511,6 +1435,24 @@ class StandardPSO(mrs.GeneratorCallbackMR):
                 help='Run in asynchronous mode',
                 default=False
                 )
+        parser.add_option('--async-tune',
+                dest='async_tune', action='store_true',
+                help='Tune the blocking ratios and queue length of the'
+                ' asynchronous mode from the observed throughput',
+                default=False
+                )
+        parser.add_option('--async-log',
+                dest='async_log', action='store_true',
+                help='Log the throughput and asynchronous settings'
+                ' (implied by --async-tune)',
+                default=False
+                )
+        parser.add_option('--async-window',
+                dest='async_window', type='int',
+                help='Number of iterations between asynchronous tuning'
+                ' decisions',
+                default=10
+                )
         parser.add_option('--hey-im-testing',
                 dest='hey_im_testing', action='store_true',
                 help='Ignore errors from uncommitted changes (testing only!)',
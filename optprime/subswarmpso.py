@@ -1,16 +1,25 @@
 #!/usr/bin/env python
 
 from __future__ import division
+import binascii
 import collections
-from itertools import chain
+import copy
+from itertools import chain, count
 import operator
+import os
 import sys
 
 import mrs
 from mrs import param
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 from . import standardpso
-from .particle import Swarm, Particle, Message
+from .arrayswarm import ArraySwarm, neighborhood_best
+from .particle import Swarm, SwarmRef, Particle, Message, EvalCount
 
 try:
     range = xrange
@@ -29,6 +38,11 @@ class SubswarmPSO(standardpso.StandardPSO):
         self.link = param.instantiate(opts, 'link')
         self.link.setup(self.function)
 
+        # Swarm state kept in this process for --resident, by token.
+        self.resident = collections.OrderedDict()
+        self.resident_tokens = count()
+        self.resident_nonce = binascii.hexlify(os.urandom(4)).decode('ascii')
+
     ##########################################################################
     # Bypass Implementation
 
@@ -38,22 +52,18 @@ class SubswarmPSO(standardpso.StandardPSO):
         Compare to the run_batch method, which uses MapReduce to do the same
         thing.
         """
-        comp = self.function.comparator
+        if self.opts.vectorized:
+            return self.vectorized_run()
 
-        # Create the Population.
-        subswarms = []
-        for swarm_id in range(self.link.num):
-            init_rand = self.initialization_rand(swarm_id)
-            swarm = Swarm(swarm_id, self.topology.newparticles(init_rand))
-            subswarms.append(swarm)
+        comp = self.function.comparator
+        start, subswarms = self.initial_subswarms()
 
         # Perform PSO Iterations.  The iteration number represents the total
         # number of function evaluations that have been performed for each
         # particle by the end of the iteration.
-        output = param.instantiate(self.opts, 'out')
-        output.start()
+        output = self.output
         outer_iters = self.opts.iters // self.opts.subiters
-        for i in range(1, 1 + outer_iters):
+        for i in range(start + 1, 1 + outer_iters):
             iteration = i * self.opts.subiters
             for swarm in subswarms:
                 subiters = self.subiters(swarm.id, i)
@@ -98,19 +108,374 @@ class SubswarmPSO(standardpso.StandardPSO):
                                 neighbor.nbest_cand(p.nbestpos, p.nbestval,
                                         comp)
 
-            # Output phase.  (If freq is 5, output after iters 1, 6, 11, etc.)
-            if output.freq and not ((i - 1) % output.freq):
+            exhausted = self.budget_exhausted(self.eval_counter.evals)
+
+            # Output phase.  (If freq is 5, output after iters 1, 6, 11, etc.,
+            # and when the budget runs out.)
+            if output.freq and (exhausted or not ((i - 1) % output.freq)):
                 kwds = {}
                 if 'iteration' in output.args:
                     kwds['iteration'] = iteration
+                if 'evals' in output.args:
+                    kwds['evals'] = self.eval_counter.evals
                 if 'particles' in output.args:
                     kwds['particles'] = particles
                 if 'best' in output.args:
                     kwds['best'] = self.findbest(chain(*subswarms))
+                if 'profile' in output.args:
+                    kwds['profile'] = self.profiler
+                if 'locality' in output.args:
+                    kwds['locality'] = self.cross_task_fraction(iteration)
                 output(**kwds)
                 if self.stop_condition(chain(*subswarms)):
-                    output.finish()
+                    output.success()
+                    return
+            if exhausted:
+                return
+            if self.checkpoint_due(i):
+                self.save_checkpoint(i, subswarms)
+
+    def initial_subswarms(self):
+        """Returns the number of completed outer iterations and the subswarms.
+
+        When resuming, these come from the checkpoint (which counts outer
+        iterations).  Otherwise, new subswarms are created.
+        """
+        start, subswarms = self.resume_checkpoint()
+        if subswarms is None:
+            subswarms = []
+            for swarm_id in range(self.link.num):
+                init_rand = self.initialization_rand(swarm_id)
+                swarm = Swarm(swarm_id, self.topology.newparticles(init_rand))
+                subswarms.append(swarm)
+        else:
+            self.eval_counter.evals = sum(p.iters for p in chain(*subswarms))
+        return start, subswarms
+
+    ##########################################################################
+    # Vectorized Bypass Implementation
+
+    def vectorized_run(self):
+        """Performs PSO without MapReduce, storing all subswarms in arrays.
+
+        The particles of every subswarm are rows of a single ArraySwarm,
+        grouped by subswarm (so with equal sizes, each array is a (swarms x
+        particles x dims) array with the first two axes flattened).  The
+        subiterations of all subswarms are done at once, and communication
+        within and between subswarms is done with array gathers and scatters,
+        so there is no per-swarm work in the interpreter.  The results match
+        `bypass_run` with the same caveats as `vectorized_iteration`.
+        """
+        output = self.output
+        start, subswarms = self.resume_checkpoint()
+        if subswarms is None:
+            sids = np.arange(self.link.num)
+            sizes = np.empty(self.link.num, dtype=int)
+            sizes.fill(self.topology.num)
+            swarm = self.new_array_subswarms(sids)
+        else:
+            self.eval_counter.evals = sum(p.iters for p in chain(*subswarms))
+            sids = np.array([swarm.id for swarm in subswarms], dtype=int)
+            sizes = np.array([len(swarm) for swarm in subswarms], dtype=int)
+            swarm = ArraySwarm.from_particles(chain(*subswarms),
+                    self.function.comparator)
+            del subswarms
+
+        outer_iters = self.opts.iters // self.opts.subiters
+        for i in range(start + 1, 1 + outer_iters):
+            iteration = i * self.opts.subiters
+            self.vectorized_subiterations(swarm, sids, sizes, i)
+
+            # Communication phase.
+            if self.opts.shuffle:
+                swarm, sids, sizes = self.vectorized_shuffle(swarm, sids,
+                        sizes)
+            else:
+                self.vectorized_link(swarm, sids, sizes)
+
+            exhausted = self.budget_exhausted(self.eval_counter.evals)
+
+            # Output phase.
+            if output.freq and (exhausted or not ((i - 1) % output.freq)):
+                kwds = {}
+                if 'iteration' in output.args:
+                    kwds['iteration'] = iteration
+                if 'evals' in output.args:
+                    kwds['evals'] = self.eval_counter.evals
+                if 'particles' in output.args:
+                    kwds['particles'] = swarm.particles()
+                if 'best' in output.args:
+                    kwds['best'] = swarm.best()
+                if 'profile' in output.args:
+                    kwds['profile'] = self.profiler
+                if 'locality' in output.args:
+                    kwds['locality'] = self.cross_task_fraction(iteration)
+                output(**kwds)
+                if any(self.function.is_opt(value)
+                        for value in swarm.value.tolist()):
+                    output.success()
                     return
+            if exhausted:
+                return
+            if self.checkpoint_due(i):
+                self.save_checkpoint(i, self.array_subswarms(swarm, sids,
+                    sizes))
+
+    def new_array_subswarms(self, sids):
+        """Returns an ArraySwarm of new subswarms with the given ids.
+
+        Each subswarm is the same as in `initial_subswarms`, where one
+        initialization Random creates all of its particles in turn.  Each
+        particle is drawn for all subswarms at once.
+        """
+        num = self.topology.num
+        dims = self.topology.cube.dims
+        iters = np.zeros(len(sids), dtype=int)
+        rands = self.stream_rands_for(self.INITIALIZATION_OFFSET, sids, iters)
+        pos = np.empty((len(sids), num, dims))
+        vel = np.empty((len(sids), num, dims))
+        for i in range(num):
+            pos[:, i], vel[:, i] = self.topology.newarrays(rands)
+        ids = np.tile(np.arange(num), len(sids))
+        return ArraySwarm(ids, pos.reshape(-1, dims), vel.reshape(-1, dims),
+                self.function.comparator)
+
+    def array_subswarms(self, swarm, sids, sizes):
+        """Returns a list of Swarms with a copy of the state in the arrays."""
+        particles = swarm.particles()
+        stops = np.cumsum(sizes).tolist()
+        starts = [0] + stops[:-1]
+        return [Swarm(sid, particles[start:stop]) for sid, start, stop in
+                zip(sids.tolist(), starts, stops)]
+
+    def vectorized_subiterations(self, swarm, sids, sizes, iteration):
+        """Runs the subiterations of every subswarm of the ArraySwarm.
+
+        Rows are grouped into subswarms with the given ids and sizes.  If the
+        subswarms do different numbers of subiterations, the ones that are
+        done sit out the rest.
+        """
+        if self.opts.subiters_stddev == 0:
+            subiters = np.empty(len(sids), dtype=int)
+            subiters.fill(self.opts.subiters)
+        else:
+            subiters = np.array([self.subiters(sid, iteration)
+                for sid in sids.tolist()], dtype=int)
+        row_sids = np.repeat(sids, sizes)
+        for j in range(subiters.max()):
+            active = subiters > j
+            if active.all():
+                self.vectorized_move(swarm, row_sids)
+                self.vectorized_group_communicate(swarm, row_sids, sizes)
+            else:
+                rows = np.flatnonzero(np.repeat(active, sizes))
+                part = swarm.take(rows)
+                self.vectorized_move(part, row_sids[rows])
+                self.vectorized_group_communicate(part, row_sids[rows],
+                        sizes[active])
+                swarm.put(rows, part)
+
+    def vectorized_group_communicate(self, swarm, row_sids, sizes):
+        """Runs the communication phase within each subswarm.
+
+        As in `bypass_communicate`, the topology is adapted to the size of
+        each subswarm, and messages never cross subswarms.
+        """
+        num = len(swarm)
+        groups = np.repeat(np.arange(len(sizes)), sizes)
+        if self.topology.complete:
+            senders = np.arange(num)
+        else:
+            senders, recipients = self.group_adjacency(swarm, row_sids,
+                    sizes)
+
+        if self.opts.transitive_best:
+            # Each message is followed by the sender's nbest.
+            positions = np.concatenate((swarm.pbestpos, swarm.nbestpos))
+            values = np.concatenate((swarm.pbestval, swarm.nbestval))
+            senders = np.column_stack((senders, senders + num)).ravel()
+            if not self.topology.complete:
+                recipients = np.repeat(recipients, 2)
+        else:
+            positions = swarm.pbestpos
+            values = swarm.pbestval
+
+        if self.topology.complete:
+            swarm.group_best_cands(groups, senders, positions, values,
+                    not self.topology.noselflink)
+        else:
+            swarm.nbest_cands(senders, recipients, positions, values)
+
+    def group_adjacency(self, swarm, row_sids, sizes):
+        """Returns the (senders, recipients) rows of the messages sent within
+        each subswarm.
+
+        Particle ids are the row numbers within each subswarm.  Static
+        neighborhoods are computed once for each subswarm size and shifted to
+        the rows of every subswarm of that size.
+        """
+        starts = np.cumsum(sizes) - sizes
+        all_senders = []
+        all_recipients = []
+        for size in np.unique(sizes).tolist():
+            if size == self.topology.num:
+                topology = self.topology
+            else:
+                topology = copy.copy(self.topology)
+                topology.num = size
+            offsets = starts[sizes == size]
+            if topology.static:
+                indptr, indices = topology.adjacency(np.arange(size))
+                senders = np.repeat(np.arange(size), np.diff(indptr))
+                all_senders.append((offsets[:, np.newaxis] + senders).ravel())
+                all_recipients.append(
+                        (offsets[:, np.newaxis] + indices).ravel())
+            else:
+                rows = (offsets[:, np.newaxis] + np.arange(size)).ravel()
+                rands = self.stream_rands_for(self.NEIGHBORHOOD_OFFSET,
+                        swarm.ids[rows], swarm.iters[rows], row_sids[rows])
+                indptr, indices = topology.adjacency(swarm.ids[rows], rands)
+                counts = np.diff(indptr)
+                all_senders.append(np.repeat(rows, counts))
+                all_recipients.append(indices
+                        + np.repeat(rows - swarm.ids[rows], counts))
+        return np.concatenate(all_senders), np.concatenate(all_recipients)
+
+    def vectorized_link(self, swarm, sids, sizes):
+        """Sends each subswarm's message to the subswarms linked to it.
+
+        As in `bypass_run`, the message (from the first or best particle)
+        goes to the neighbors of the head of each dependent subswarm.
+        """
+        num = len(swarm)
+        starts = np.cumsum(sizes) - sizes
+        groups = np.repeat(np.arange(len(sizes)), sizes)
+        if self.opts.send_best:
+            _, chosen = neighborhood_best(np.arange(num), groups,
+                    swarm.pbestval, self.function.comparator)
+        else:
+            chosen = starts
+
+        if self.link.static:
+            rands = None
+        else:
+            rands = self.stream_rands_for(self.SUBSWARM_OFFSET, sids,
+                    swarm.iters[starts])
+        indptr, dests = self.link.adjacency(sids, rands)
+        if not len(dests):
+            return
+        edge_senders = np.repeat(chosen, np.diff(indptr))
+        edge_sids = np.repeat(sids, np.diff(indptr))
+        heads = starts[dests]
+
+        if self.opts.transitive_best:
+            positions = np.concatenate((swarm.pbestpos, swarm.nbestpos))
+            values = np.concatenate((swarm.pbestval, swarm.nbestval))
+            senders = np.column_stack((edge_senders,
+                edge_senders + num)).ravel()
+            edges = np.repeat(np.arange(len(dests)), 2)
+        else:
+            positions = swarm.pbestpos
+            values = swarm.pbestval
+            senders = edge_senders
+            edges = np.arange(len(dests))
+
+        if self.topology.static:
+            # Every message to a subswarm goes to the same particles, so only
+            # the best one matters.
+            indptr, indices = self.topology.adjacency(swarm.ids[heads[:1]])
+            targets, best = neighborhood_best(senders, dests[edges],
+                    values[senders], self.function.comparator)
+            local = indices[indptr[0]:indptr[1]]
+            recipients = (starts[targets][:, np.newaxis] + local).ravel()
+            senders = np.repeat(senders[best], len(local))
+        else:
+            rands = self.stream_rands_for(self.NEIGHBORHOOD_OFFSET,
+                    swarm.ids[heads], swarm.iters[heads], edge_sids)
+            indptr, indices = self.topology.adjacency(swarm.ids[heads], rands)
+            counts = np.diff(indptr)
+            recipients = indices + np.repeat(heads, counts)
+            # Each edge's messages go to each of its recipients in order.
+            edge_messages = np.repeat(np.arange(len(dests)), counts)
+            if self.opts.transitive_best:
+                recipients = np.repeat(recipients, 2)
+                senders = np.column_stack((edge_senders[edge_messages],
+                    edge_senders[edge_messages] + num)).ravel()
+            else:
+                senders = edge_senders[edge_messages]
+        swarm.nbest_cands(senders, recipients, positions, values)
+
+    def vectorized_shuffle(self, swarm, sids, sizes):
+        """Shuffles particles between subswarms (as with --shuffle).
+
+        Returns a new ArraySwarm and the ids and sizes of its subswarms.  The
+        particles go where they would in `bypass_run`.
+        """
+        num = len(swarm)
+        starts = np.cumsum(sizes) - sizes
+        groups = np.repeat(np.arange(len(sizes)), sizes)
+        rands = self.stream_rands_for(self.SUBSWARM_OFFSET, sids,
+                swarm.iters[starts])
+        if self.link.static:
+            indptr, neighbors = self.link.adjacency(sids)
+        else:
+            indptr, neighbors = self.link.adjacency(sids, rands)
+        orders = self.shuffled_orders(rands, sizes)
+
+        rows = starts[groups] + orders
+        shifts = np.arange(num) - starts[groups]
+        choices = shifts % self.link.num
+        if np.any(choices >= np.diff(indptr)[groups]):
+            raise IndexError('Too few linked subswarms to shuffle into')
+        dests = neighbors[indptr[groups] + choices]
+        # Convert to a global particle id to ensure determinism.
+        global_ids = swarm.ids[rows] + sids[groups] * self.link.num
+        order = np.lexsort((np.arange(num), global_ids, dests))
+
+        newswarm = swarm.take(rows[order])
+        newsids, newsizes = np.unique(dests, return_counts=True)
+        newstarts = np.cumsum(newsizes) - newsizes
+        newswarm.ids = np.arange(num) - np.repeat(newstarts, newsizes)
+        return newswarm, newsids, newsizes
+
+    def shuffled_orders(self, rands, sizes):
+        """Returns the order of the rows of each subswarm after shuffling.
+
+        Each subswarm's Random shuffles its rows as `Swarm.shuffled` would.
+        The result gives the shuffled row numbers (within each subswarm) for
+        all subswarms, one after the other.  If the Randoms can draw for all
+        subswarms at once (as a StreamBatch can), the shuffles are done in
+        one pass over the particles rather than one pass per subswarm.
+        """
+        uniform = getattr(rands, 'uniform', None)
+        if uniform is None:
+            orders = []
+            for rand, size in zip(rands, sizes.tolist()):
+                order = list(range(size))
+                rand.shuffle(order)
+                orders.extend(order)
+            return np.array(orders, dtype=int)
+
+        # Each swap is the same as in random.shuffle, which goes from the end.
+        width = sizes.max()
+        units = uniform(0, 1, max(width - 1, 0))
+        orders = np.tile(np.arange(width), (len(sizes), 1))
+        for k in range(width - 1):
+            swapping = np.flatnonzero(sizes - 1 > k)
+            i = sizes[swapping] - 1 - k
+            j = (units[swapping, k] * (i + 1)).astype(int)
+            orders[swapping, i], orders[swapping, j] = (
+                    orders[swapping, j], orders[swapping, i])
+        keep = np.arange(width) < sizes[:, np.newaxis]
+        return orders[keep]
+
+    def enable_profiling(self):
+        """Also times the communication of the vectorized implementation."""
+        super(SubswarmPSO, self).enable_profiling()
+        for name in ('vectorized_group_communicate', 'vectorized_link',
+                'vectorized_shuffle'):
+            setattr(self, name, self.profiler.timed('communication',
+                getattr(self, name)))
 
     ##########################################################################
     # MapReduce Implementation
@@ -120,20 +485,19 @@ class SubswarmPSO(standardpso.StandardPSO):
 
         This is run on the master.
         """
+        if self.opts.checkpoint:
+            raise ValueError('Checkpoints (--checkpoint) are only supported'
+                    ' by the Bypass implementation')
         if not self.cli_startup():
             return 1
 
         # Perform the simulation
         try:
             self.last_data = None
-            self.output = param.instantiate(self.opts, 'out')
-            self.output.start()
+            self.start_output()
 
-            job.default_partition = self.mod_partition
-            if self.opts.numtasks:
-                numtasks = self.opts.numtasks
-            else:
-                numtasks = self.link.num
+            job.default_partition = self.partition_function()
+            numtasks = self.num_tasks()
             job.default_reduce_tasks = numtasks
             job.default_reduce_splits = numtasks
 
@@ -142,56 +506,91 @@ class SubswarmPSO(standardpso.StandardPSO):
                 self.iterative_qmax = 2 * self.output.freq
             else:
                 self.iterative_qmax = 2 * numtasks
+            self.start_async_tuner()
 
             mrs.GeneratorCallbackMR.run(self, job)
-            self.output.finish()
+            self.finish_output()
             return 0
         except KeyboardInterrupt as e:
             print("# INTERRUPTED")
             return 1
+        finally:
+            self.report_profile()
 
     def generator(self, job):
-        self.out_datasets = {}
-        out_data = None
-
         self.out_datasets = {}
         self.datasets = {}
+        # The iterations that have been output.
+        self.output_done = set()
+        # With --resident, the datasets to check for lost state, the
+        # keyframes that a reload could start from, and whether to reload.
+        self.resident_checks = {}
+        self.keyframes = []
+        self.resident_lost = False
+        # Whether full swarms are written until the next keyframe (after a
+        # reload), and whether every iteration since the latest complete
+        # keyframe wrote full swarms (so the next keyframe is complete, too).
+        self.resident_backoff = False
+        self.resident_unbroken = True
+        self.generation = 0
         out_data = None
 
         kvpairs = ((i, b'') for i in range(self.link.num))
         start_swarm = job.local_data(kvpairs,
                 key_serializer=self.int_serializer,
                 value_serializer=self.raw_serializer)
+        if self.opts.combine_messages:
+            combiner = self.pso_combine
+        else:
+            combiner = None
+
         data = job.map_data(start_swarm, self.init_map,
-                format=mrs.ZipWriter)
+                format=mrs.ZipWriter, combiner=combiner)
         start_swarm.close()
         yield data, None
         self.last_data = data
 
         iteration = 1
-        while iteration <= self.opts.iters // self.opts.subiters:
+        if self.opts.resident:
+            # The initial swarms are complete, so no reload goes further back.
+            self.keyframes.append([iteration, data, True])
+
+        iters = self.opts.iters // self.opts.subiters
+        if self.opts.max_evals and not self.opts.subiters_stddev:
+            # Otherwise, the number of subiterations varies, so the budget
+            # is only checked against the counts in the outputs.
+            evals_per_iter = (self.opts.subiters * self.link.num
+                    * self.topology.num)
+            iters = min(iters, -(-self.opts.max_evals // evals_per_iter))
+        while iteration <= iters or self.resident_unfinished(job, iteration):
+            if self.resident_lost:
+                iteration = self.reload_keyframe()
             need_output = (self.output.freq and
                     (iteration - 1) % self.output.freq == 0)
+            # Full swarms cross the dataset boundary in keyframe iterations.
+            reload_freq = self.opts.resident_reload
+            keyframe = not self.opts.resident or bool(reload_freq and
+                    not (iteration + 1) % reload_freq)
+            full = keyframe or self.resident_backoff
+            if full:
+                pso_map = self.pso_map
+            else:
+                pso_map = self.resident_map
+                self.resident_unbroken = False
 
             if need_output:
-                num_reduce_tasks = getattr(self.opts, 'mrs__reduce_tasks', 1)
                 swarm_data = job.reduce_data(self.last_data, self.pso_reduce,
                         affinity=True, format=mrs.ZipWriter)
-                if self.last_data not in self.out_datasets:
-                    self.last_data.close()
-                data = job.map_data(swarm_data, self.pso_map, affinity=True,
-                        format=mrs.ZipWriter)
+                self.release(self.last_data)
+                data = job.map_data(swarm_data, pso_map, affinity=True,
+                        format=mrs.ZipWriter, combiner=combiner)
                 if ('particles' not in self.output.args and
                         'best' not in self.output.args):
                     out_data = None
                     swarm_data.close()
                 elif ('best' in self.output.args):
-                    interm = job.map_data(swarm_data, self.collapse_map,
-                            splits=num_reduce_tasks)
+                    out_data = self.findbest_data(job, swarm_data)
                     swarm_data.close()
-                    out_data = job.reduce_data(interm, self.findbest_reduce,
-                            splits=1)
-                    interm.close()
                 else:
                     out_data = swarm_data
 
@@ -199,7 +598,8 @@ class SubswarmPSO(standardpso.StandardPSO):
                 out_data = None
                 if self.opts.async:
                     async_r = {"async_start": True}
-                    async_m = {"blocking_ratio": 0.75,
+                    async_m = {"blocking_ratio":
+                            self.async_tuner.map_ratio,
                             "backlink": self.last_data}
                 else:
                     async_r = {}
@@ -207,23 +607,22 @@ class SubswarmPSO(standardpso.StandardPSO):
                 if self.opts.split_reducemap:
                     interm = job.reduce_data(self.last_data, self.pso_reduce,
                             affinity=True, format=mrs.ZipWriter, **async_r)
-                    if self.last_data not in self.out_datasets:
-                        self.last_data.close()
+                    self.release(self.last_data)
 
-                    data = job.map_data(interm, self.pso_map, affinity=True,
-                            format=mrs.ZipWriter, **async_m)
+                    data = job.map_data(interm, pso_map, affinity=True,
+                            format=mrs.ZipWriter, combiner=combiner, **async_m)
                     interm.close()
                 else:
                     if self.opts.async:
-                        async_rm = {"async_start": True, "blocking_ratio": 0.5,
+                        async_rm = {"async_start": True, "blocking_ratio":
+                                self.async_tuner.reducemap_ratio,
                                 "backlink": self.last_data}
                     else:
                         async_rm = {}
                     data = job.reducemap_data(self.last_data, self.pso_reduce,
-                            self.pso_map, affinity=True, format=mrs.ZipWriter,
-                            **async_rm)
-                    if self.last_data not in self.out_datasets:
-                        self.last_data.close()
+                            pso_map, affinity=True, format=mrs.ZipWriter,
+                            combiner=combiner, **async_rm)
+                    self.release(self.last_data)
 
             iteration += 1
             self.last_data = data
@@ -231,40 +630,102 @@ class SubswarmPSO(standardpso.StandardPSO):
                 self.out_datasets[out_data] = iteration
                 yield out_data, self.output_dataset_handler
 
-            yield data, None
+            if self.async_tuner is not None:
+                self.async_tuner.submitted()
+            if keyframe and self.opts.resident:
+                # If only full swarms were written since the latest complete
+                # keyframe, this one cannot have lost state either.
+                self.keyframes.append([iteration, data,
+                    self.resident_unbroken])
+                self.resident_backoff = False
+                self.prune_keyframes()
+            elif not full:
+                self.resident_checks[data] = (self.generation, iteration)
+            if self.async_tuner is not None or not full:
+                yield data, self.iteration_dataset_handler
+            else:
+                yield data, None
+
+    def iteration_dataset_handler(self, dataset):
+        """Called when an iteration's dataset is complete (with --async or
+        --resident)."""
+        if self.async_tuner is not None:
+            self.async_dataset_handler(dataset)
+        if dataset in self.resident_checks:
+            self.check_resident(dataset)
+        return True
+
+    def release(self, dataset):
+        """Closes the dataset unless the master still needs it."""
+        if (dataset in self.out_datasets or dataset in self.resident_checks
+                or any(dataset is k[1] for k in self.keyframes)):
+            return
+        dataset.close()
 
     def output_dataset_handler(self, dataset):
         """Called when an output dataset is complete."""
+        if dataset not in self.out_datasets:
+            # The iteration was abandoned by `reload_keyframe`.
+            dataset.close()
+            return True
         iteration = self.out_datasets[dataset]
         del self.out_datasets[dataset]
+        if iteration in self.output_done:
+            # It was output before `reload_keyframe` went back past it.
+            dataset.close()
+            return True
 
-        if 'best' in self.output.args or 'particles' in self.output.args:
-            dataset.fetchall()
-            particles = []
-            particles = [particle for _, particle in dataset.data()]
-            if 'particles' in self.output.args:
-                particles = list(chain(*particles))
+        # The slaves send their evaluation counts along with the particles.
+        dataset.fetchall()
+        particles = []
+        evals = 0
+        for _, value in dataset.data():
+            if isinstance(value, EvalCount):
+                evals += value.evals
+            else:
+                particles.append(value)
+        if any(isinstance(p, SwarmRef) for p in particles):
+            # Some resident state was lost, so this iteration is redone.
+            self.resident_lost = True
+            if dataset != self.last_data:
+                dataset.close()
+            return True
+        if 'particles' in self.output.args:
+            particles = list(chain(*particles))
         if dataset != self.last_data:
             dataset.close()
         kwds = {}
         if 'iteration' in self.output.args:
             kwds['iteration'] = iteration
+        if 'evals' in self.output.args:
+            kwds['evals'] = evals
         if 'particles' in self.output.args:
             kwds['particles'] = particles
         if 'best' in self.output.args:
-            kwds['best'] = self.findbest(particles)
+            best = self.findbest(particles)
+            kwds['best'] = best
+            stop = self.function.is_opt(best.pbestval)
+        else:
+            stop = self.stop_condition(particles)
+        if 'profile' in self.output.args:
+            kwds['profile'] = self.profiler
+        if 'locality' in self.output.args:
+            kwds['locality'] = self.cross_task_fraction(
+                    iteration * self.opts.subiters)
         self.output(**kwds)
+        self.output_done.add(iteration)
 
-        if self.stop_condition(particles):
+        if stop:
             self.output.success()
             return False
 
-        return True
+        return not self.budget_exhausted(evals)
 
     ##########################################################################
     # Primary MapReduce
 
-    @mrs.output_serializers(key=mrs.MapReduce.int_serializer)
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
     def init_map(self, swarm_id, value):
         rand = self.initialization_rand(swarm_id)
         swarm = Swarm(swarm_id, self.topology.newparticles(rand))
@@ -272,12 +733,19 @@ class SubswarmPSO(standardpso.StandardPSO):
         for kvpair in self.pso_map(swarm_id, swarm):
             yield kvpair
 
-    @mrs.output_serializers(key=mrs.MapReduce.int_serializer)
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
     def pso_map(self, swarm_id, swarm):
+        if isinstance(swarm, (SwarmRef, EvalCount)):
+            # Lost state is passed on, and the master will find out.
+            yield (swarm_id, swarm)
+            return
         assert swarm.id == swarm_id
+        evals = self.eval_counter.evals
         subiters = self.subiters(swarm.id, swarm.iters())
         for i in range(subiters):
             self.bypass_iteration(swarm, swarm.id)
+        yield (swarm_id, EvalCount(self.eval_counter.evals - evals))
 
         rand = self.swarm_rand(swarm)
 
@@ -303,15 +771,46 @@ class SubswarmPSO(standardpso.StandardPSO):
             for dep_id in self.link.iterneighbors(swarm, rand):
                 yield (dep_id, message)
 
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
+    def resident_map(self, swarm_id, swarm):
+        """Like `pso_map`, but the swarm (or with --shuffle, the particles
+        that stay in it) is kept in this process.
+
+        Only a SwarmRef for the state is emitted, so just messages and
+        migrating particles cross the dataset boundary.
+        """
+        staying = []
+        for key, value in self.pso_map(swarm_id, swarm):
+            if key != swarm_id:
+                yield (key, value)
+            elif isinstance(value, Swarm):
+                yield (key, self.keep_resident(swarm_id, value))
+            elif self.opts.shuffle and isinstance(value, Particle):
+                staying.append(value)
+            else:
+                yield (key, value)
+        if staying:
+            yield (swarm_id, self.keep_resident(swarm_id, staying))
+
     def pso_reduce(self, swarm_id, value_iter):
+        counts = []
         if self.opts.shuffle:
             particles = []
             for record in value_iter:
-                if isinstance(record, Particle):
+                if isinstance(record, EvalCount):
+                    counts.append(record)
+                elif isinstance(record, Particle):
                     particles.append(record)
                 elif isinstance(record, Swarm):
                     for particle in record:
                         particles.append(particle)
+                elif isinstance(record, SwarmRef):
+                    state = self.take_resident(record)
+                    if state is None:
+                        yield SwarmRef(swarm_id, None)
+                        return
+                    particles.extend(state)
                 else:
                     raise ValueError
             particles.sort(key=lambda p: p.id)
@@ -323,8 +822,15 @@ class SubswarmPSO(standardpso.StandardPSO):
             swarm = None
             messages = []
             for record in value_iter:
-                if isinstance(record, Swarm):
+                if isinstance(record, EvalCount):
+                    counts.append(record)
+                elif isinstance(record, Swarm):
                     swarm = record
+                elif isinstance(record, SwarmRef):
+                    swarm = self.take_resident(record)
+                    if swarm is None:
+                        yield SwarmRef(swarm_id, None)
+                        return
                 elif isinstance(record, Message):
                     messages.append(record)
                 else:
@@ -346,24 +852,181 @@ class SubswarmPSO(standardpso.StandardPSO):
                 yield swarm
             else:
                 yield best
+        if counts:
+            yield EvalCount(EvalCount.total(counts))
+
+    def num_keys(self):
+        """Returns the number of keys (subswarms)."""
+        return self.link.num
+
+    def cross_task_fraction(self, iteration):
+        """Returns the fraction of messages between subswarms that go between
+        different tasks.
+
+        This considers the messages (or with --shuffle, the migrating
+        particles) that each subswarm sends to the subswarms linked to it
+        after the given iteration.  Messages within a subswarm never leave its
+        task.  With --shuffle, each subswarm is assumed to have `top.num`
+        particles.
+        """
+        num = self.link.num
+        ids = np.arange(num)
+        if self.link.static:
+            rands = None
+        else:
+            iters = np.empty(num, dtype=int)
+            iters.fill(iteration)
+            rands = self.stream_rands_for(self.SUBSWARM_OFFSET, ids, iters)
+        indptr, dests = self.link.adjacency(ids, rands)
+        if not len(dests):
+            return 0.0
+        counts = np.diff(indptr)
+        senders = np.repeat(ids, counts)
+        if self.opts.shuffle:
+            # Shift k of each subswarm goes to its neighbor k % link.num.
+            positions = np.arange(len(dests)) - np.repeat(indptr[:-1], counts)
+            shifts = np.bincount(np.arange(self.topology.num) % num,
+                    minlength=positions.max() + 1)
+            weights = shifts[positions]
+        else:
+            weights = np.ones(len(dests), dtype=int)
+
+        partition = self.partition_function()
+        numtasks = self.num_tasks()
+        tasks = np.array([partition(key, numtasks)
+            for key in range(self.num_keys())])
+        cross = tasks[senders] != tasks[dests]
+        return float(weights[cross].sum()) / weights.sum()
+
+    ##########################################################################
+    # Resident Swarm State (--resident)
+
+    # The number of states kept per subswarm (older ones are abandoned).
+    RESIDENT_LIMIT = 4
+
+    def keep_resident(self, swarm_id, state):
+        """Keeps the state of a swarm in this process and returns a SwarmRef.
+
+        The state is a Swarm or (with --shuffle) a list of the particles that
+        stay in the swarm.
+        """
+        token = '%s-%s' % (self.resident_nonce, next(self.resident_tokens))
+        self.resident[token] = state
+        while len(self.resident) > self.RESIDENT_LIMIT * self.link.num:
+            self.resident.popitem(last=False)
+        return SwarmRef(swarm_id, token)
+
+    def take_resident(self, ref):
+        """Returns (and forgets) the state for the SwarmRef.
+
+        Returns None if the state is not in this process (e.g., if the task
+        ran on a different slave or the slave restarted).
+        """
+        if ref.lost():
+            return None
+        return self.resident.pop(ref.token, None)
+
+    def check_resident(self, dataset):
+        """Looks for lost state in an iteration's dataset.
+
+        If there is none, the keyframes up to the iteration are complete.
+        """
+        generation, iteration = self.resident_checks.pop(dataset)
+        if generation == self.generation and not self.resident_lost:
+            dataset.fetchall()
+            if any(isinstance(value, SwarmRef) and value.lost()
+                    for _, value in dataset.data()):
+                self.resident_lost = True
+            else:
+                for keyframe in self.keyframes:
+                    if keyframe[0] <= iteration:
+                        keyframe[2] = True
+                self.prune_keyframes()
+        if dataset != self.last_data:
+            self.release(dataset)
+
+    def prune_keyframes(self):
+        """Releases the keyframes before the latest complete one, which is
+        the only one that a reload needs."""
+        while len(self.keyframes) > 1 and self.keyframes[1][2]:
+            self.release(self.keyframes.pop(0)[1])
+
+    def resident_unfinished(self, job, iteration):
+        """Waits for the remaining checks once the last iteration has been
+        submitted, and returns True if some state was lost.
+
+        A loss found after the generator returns could not be redone.  The
+        last dataset is checked, too, unless it is known to be complete.
+        """
+        if not self.opts.resident:
+            return False
+        if not self.resident_unbroken:
+            self.resident_checks.setdefault(self.last_data,
+                    (self.generation, iteration))
+        checks = sorted(self.resident_checks.items(), key=lambda x: x[1])
+        for dataset, _ in checks:
+            job.wait(dataset)
+            self.check_resident(dataset)
+        return self.resident_lost
+
+    def reload_keyframe(self):
+        """Abandons the iterations after the latest complete keyframe.
+
+        Full swarms are reloaded from the keyframe, which becomes
+        `self.last_data`.  Returns the iteration to continue from.
+
+        Full swarms are then written until the next keyframe, which is thus
+        known to be complete.  Otherwise, if state were lost often (e.g.,
+        affinity misses with --async or many subswarms), the run could keep
+        going back to the same keyframe.
+        """
+        self.generation += 1
+        self.resident_lost = False
+        self.resident_backoff = True
+        self.resident_unbroken = True
+        self.release(self.last_data)
+        while not self.keyframes[-1][2]:
+            self.release(self.keyframes.pop()[1])
+        iteration, data, _ = self.keyframes[-1]
+        for out_data, out_iteration in list(self.out_datasets.items()):
+            if out_iteration > iteration:
+                del self.out_datasets[out_data]
+        self.last_data = data
+        print('# Resident state lost; reloading from iteration %s' % iteration)
+        sys.stdout.flush()
+        return iteration
 
     ##########################################################################
     # MapReduce to Find the Best Particle
 
-    @mrs.output_serializers(key=mrs.MapReduce.int_serializer)
+    @mrs.output_serializers(key=mrs.MapReduce.int_serializer,
+            value='particle_serializer')
     def collapse_map(self, key, swarm):
         """Finds the best particle in the swarm and yields it with id 0."""
-        new_key = key % self.opts.mrs__reduce_tasks
+        new_key = key % getattr(self.opts, 'mrs__reduce_tasks', 1)
+        if isinstance(swarm, (SwarmRef, EvalCount)):
+            # Lost state and counts are passed on to the master.
+            yield new_key, swarm
+            return
         best = self.findbest(swarm)
         yield new_key, best
 
     def findbest_reduce(self, key, value_iter):
-        particles = list(value_iter)
-        assert len(particles) == self.link.num, (
-            'Only %s particles in findbest_reduce' % len(particles))
-
-        best = self.findbest(particles)
-        yield best
+        """Keeps only the best of the particles and the sum of the EvalCounts
+        (lost SwarmRefs pass through)."""
+        particles = []
+        counts = []
+        for value in value_iter:
+            if isinstance(value, SwarmRef):
+                yield value
+            elif isinstance(value, EvalCount):
+                counts.append(value)
+            else:
+                particles.append(value)
+        if particles:
+            yield self.findbest(particles)
+        if counts:
+            yield EvalCount(EvalCount.total(counts))
 
     ##########################################################################
     # Helper Functions (shared by bypass and mrs implementations)
@@ -373,14 +1036,14 @@ class SubswarmPSO(standardpso.StandardPSO):
 
         Note that the Random depends on the swarm id and iteration.
         """
-        return self.random(self.SUBSWARM_OFFSET, s.id, s.iters())
+        return self.stream_rand(self.SUBSWARM_OFFSET, s.id, s.iters())
 
     def subiters_rand(self, swarmid, iteration):
         """Makes a Random for the given particle and saves it to `p.rand`.
 
         Note that the Random depends on the particle id, and iteration.
         """
-        return self.random(self.SUBITERS_OFFSET, swarmid, iteration)
+        return self.stream_rand(self.SUBITERS_OFFSET, swarmid, iteration)
 
     def subiters(self, swarmid, iteration):
         """Return the number of subiterations to be performed."""
@@ -419,6 +1082,16 @@ class SubswarmPSO(standardpso.StandardPSO):
                 help='Shuffle particles between swarms '
                     '(Dynamic Multi Swarm PSO)',
                 )
+        parser.add_option('--resident',
+                dest='resident', action='store_true', default=False,
+                help='Keep swarm state on the slaves between iterations'
+                    ' (only messages and migrating particles are written)',
+                )
+        parser.add_option('--resident-reload',
+                dest='resident_reload', type='int', default=10,
+                help='Number of iterations between full copies of the'
+                    ' swarms with --resident (if 0, only the initial swarms)',
+                )
         parser.add_option('--send-best',
                 dest='send_best', action='store_true', default=False,
                 help='Send the best particle from the swarm '
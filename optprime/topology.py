@@ -1,6 +1,11 @@
 from __future__ import division
 from mrs.param import ParamObj, Param
 
+try:
+    import numpy as np
+except ImportError:
+    import numpypy as np
+
 try:
     range = xrange
 except NameError:
@@ -63,6 +68,15 @@ class _Topology(ParamObj):
         p = Particle(id=i, pos=newpos, vel=newvel)
         return p
 
+    def newarrays(self, rands):
+        """Returns matrices of positions and velocities for new particles.
+
+        Row i is the position and velocity of `newparticle(i, rands[i])`.  If
+        `rands` is a `randstream.StreamBatch`, the values for every particle
+        are drawn at once (see `Cube.random_vecs`).
+        """
+        return self.cube.random_vecs(rands), self.vcube.random_vecs(rands)
+
     def newparticles(self, rand):
         """Yields new particles.
 
@@ -74,10 +88,63 @@ class _Topology(ParamObj):
         for i in range(self.num):
             yield self.newparticle(i, rand)
 
+    # Whether the neighborhoods are the same in every iteration.
+    static = True
+    # Whether every member sends to every member (i.e., gbest).
+    complete = False
+
     def iterneighbors(self, particle, rand):
         """Yields the particle ids of the neighbors of the give particle."""
         raise NotImplementedError
 
+    def adjacency(self, ids, rands=None):
+        """Returns the neighborhoods of the given members in CSR form.
+
+        Returns a pair of arrays (indptr, indices) such that the ids yielded
+        by `iterneighbors` for the member with id `ids[i]` are
+        `indices[indptr[i]:indptr[i+1]]`, in the same order.  The `rands`
+        sequence gives the neighborhood Random for each member; it is not
+        needed for static topologies, whose adjacency is computed once and
+        cached.
+        """
+        ids = np.asarray(ids, dtype=int)
+        if not self.static:
+            return self._adjacency(ids, rands)
+
+        key = (self.num, self.noselflink, ids.tostring())
+        cache = getattr(self, '_adjacency_cache', None)
+        if cache is None or cache[0] != key:
+            cache = (key, self._adjacency(ids, rands))
+            self._adjacency_cache = cache
+        return cache[1]
+
+    def _adjacency(self, ids, rands):
+        """Computes the adjacency by calling `iterneighbors` for each id.
+
+        Subclasses should override this with a vectorized version.
+        """
+        from .particle import Dummy
+        if rands is None:
+            rands = [None] * len(ids)
+        indptr = [0]
+        indices = []
+        for id, rand in zip(ids.tolist(), rands):
+            # The iteration does not matter for these neighborhoods.
+            indices.extend(self.iterneighbors(Dummy(id, 0), rand))
+            indptr.append(len(indices))
+        return np.array(indptr, dtype=int), np.array(indices, dtype=int)
+
+
+def offset_adjacency(ids, offsets, num):
+    """Returns a CSR adjacency where the neighbors of i are (i + offset) % num.
+
+    The neighbors of each id are given in the order of `offsets`.
+    """
+    offsets = np.array(offsets, dtype=int)
+    indptr = np.arange(len(ids) + 1) * len(offsets)
+    indices = (ids[:, np.newaxis] + offsets) % num
+    return indptr, indices.ravel()
+
 
 class Isolated(_Topology):
     """Independent isolated particles."""
@@ -86,6 +153,13 @@ class Isolated(_Topology):
         if not self.noselflink:
             yield particle.id
 
+    def _adjacency(self, ids, rands):
+        if self.noselflink:
+            offsets = []
+        else:
+            offsets = [0]
+        return offset_adjacency(ids, offsets, self.num)
+
 
 class Ring(_Topology):
     """Bidirectional Ring (aka lbest)"""
@@ -101,6 +175,19 @@ class Ring(_Topology):
             yield (particle.id + i) % self.num
             yield (particle.id - i) % self.num
 
+    def offsets(self):
+        """Returns the offsets of the neighbors in `iterneighbors` order."""
+        if self.noselflink:
+            offsets = []
+        else:
+            offsets = [0]
+        for i in range(1, self.neighbors + 1):
+            offsets.extend((i, -i))
+        return offsets
+
+    def _adjacency(self, ids, rands):
+        return offset_adjacency(ids, self.offsets(), self.num)
+
 
 class DRing(Ring):
     """Directed (one-way) Ring"""
@@ -110,9 +197,19 @@ class DRing(Ring):
         for i in range(1,self.neighbors+1):
             yield (particle.id + i) % self.num
 
+    def offsets(self):
+        if self.noselflink:
+            offsets = []
+        else:
+            offsets = [0]
+        offsets.extend(range(1, self.neighbors + 1))
+        return offsets
+
 
 class Complete(_Topology):
     """Complete (aka fully connected, gbest, or star)"""
+    complete = True
+
     def iterneighbors(self, particle, rand):
         # Yield all of the particles up to this one, and all after, then this
         # one last.
@@ -120,6 +217,23 @@ class Complete(_Topology):
             if not (i == particle.id and self.noselflink):
                 yield i
 
+    def _adjacency(self, ids, rands):
+        # Note that engines should use the gbest shortcut instead when
+        # possible, since this has num entries for each id.
+        num = self.num
+        indices = np.tile(np.arange(num), (len(ids), 1))
+        if self.noselflink:
+            keep = indices != ids[:, np.newaxis]
+            counts = keep.sum(axis=1)
+            indices = indices[keep]
+        else:
+            counts = np.empty(len(ids), dtype=int)
+            counts.fill(num)
+            indices = indices.ravel()
+        indptr = np.zeros(len(ids) + 1, dtype=int)
+        np.cumsum(counts, out=indptr[1:])
+        return indptr, indices
+
 
 class Rand(_Topology):
     """Random topology (pick n particles and send a message to them)"""
@@ -128,6 +242,8 @@ class Rand(_Topology):
             doc='Number of neighbors to send to.'),
         )
 
+    static = False
+
     def iterneighbors(self, particle, rand):
         randrange = rand.randrange
         id = particle.id
@@ -141,4 +257,25 @@ class Rand(_Topology):
         if not self.noselflink:
             yield id
 
+    def _adjacency(self, ids, rands):
+        """Regenerates the adjacency from the given Randoms.
+
+        If `rands` can draw for all members at once (as a `StreamBatch`
+        can), no per-member Python calls are needed.
+        """
+        randbelow = getattr(rands, 'randbelow', None)
+        if randbelow is None:
+            return super(Rand, self)._adjacency(ids, rands)
+
+        num = self.num
+        if (self.neighbors == -1):
+            neighbors = num
+        else:
+            neighbors = self.neighbors
+        indices = randbelow(num, neighbors)
+        if not self.noselflink:
+            indices = np.column_stack((indices, ids))
+        indptr = np.arange(len(ids) + 1) * indices.shape[1]
+        return indptr, indices.ravel()
+
 
@@ -0,0 +1,148 @@
+"""Run-time tuning of the asynchronous (--async) MapReduce pipeline.
+
+Mrs starts the tasks of an asynchronous dataset once `blocking_ratio` of the
+tasks of its backlink have finished, and the master keeps at most
+`iterative_qmax` iterations in flight.  Lower ratios and longer queues keep
+the slaves busier, but particles then move with older messages from their
+neighbors.  An `AsyncTuner` adjusts these knobs from the times at which
+iterations are submitted and completed:
+
+- The blocking ratios are tuned by hill climbing on throughput.  After each
+  window of iterations, the ratios take a step in the current direction.  If
+  throughput dropped after the previous step, that step is undone and the
+  direction is reversed.
+- The queue grows while it is full (so the master is what limits the
+  pipeline) and throughput is not dropping.  It shrinks to just above the
+  observed queue depth when it is not full.
+
+>>> tuner = AsyncTuner(qmax=4, window=2)
+>>> for i in range(4):
+...     tuner.submitted(now=i)
+>>> tuner.completed(now=4)
+>>> tuner.completed(now=5)
+>>> tuner.map_ratio, tuner.reducemap_ratio, tuner.qmax
+(0.7, 0.45, 5)
+>>>
+"""
+
+from __future__ import division
+
+import math
+import time
+
+# The fixed settings used without tuning.
+MAP_RATIO = 0.75
+REDUCEMAP_RATIO = 0.5
+
+
+class AsyncTuner(object):
+    """Chooses blocking ratios and a queue length for the async pipeline.
+
+    Call `submitted` when an iteration's dataset is submitted and `completed`
+    when it is done.  The current settings are in `map_ratio`,
+    `reducemap_ratio`, and `qmax`.  The map ratio is kept the same distance
+    above the reducemap ratio as in the fixed settings, and both are kept
+    within [min_ratio, max_ratio].  Each decision is passed as a string to
+    the `log` function (if given).  If `adaptive` is False, the settings are
+    never changed, but decisions are still logged, so throughput can be
+    compared with the fixed settings.
+    """
+    def __init__(self, qmax, window=10, step=0.05, min_ratio=0.25,
+            max_ratio=1.0, tolerance=0.05, adaptive=True, log=None):
+        self.map_ratio = MAP_RATIO
+        self.reducemap_ratio = REDUCEMAP_RATIO
+        self.qmax = qmax
+        self.window = window
+        self.step = step
+        self.min_ratio = min_ratio
+        self.max_ratio = max_ratio
+        self.tolerance = tolerance
+        self.adaptive = adaptive
+        self.log = log
+
+        self.num_submitted = 0
+        self.num_completed = 0
+        # Start by trying more asynchrony.
+        self.direction = -1
+        self.last_step = 0.0
+        self.last_throughput = None
+        self._window_start = None
+        self._depths = []
+
+    def submitted(self, now=None):
+        """Records that an iteration was submitted."""
+        if now is None:
+            now = time.time()
+        if self._window_start is None:
+            self._window_start = now
+        self.num_submitted += 1
+
+    def completed(self, now=None):
+        """Records that an iteration completed (and maybe adjusts)."""
+        if now is None:
+            now = time.time()
+        # The queue depth includes the iteration that just completed.
+        self._depths.append(self.num_submitted - self.num_completed)
+        self.num_completed += 1
+        if len(self._depths) < self.window:
+            return
+
+        elapsed = now - self._window_start
+        if elapsed > 0:
+            throughput = len(self._depths) / elapsed
+        else:
+            throughput = float('inf')
+        depth = sum(self._depths) / len(self._depths)
+        self._window_start = now
+        self._depths = []
+        self.adjust(throughput, depth)
+
+    def adjust(self, throughput, depth):
+        """Updates the settings given the throughput (iterations per second)
+        and mean queue depth of the last window."""
+        worse = (self.last_throughput is not None and
+                throughput < (1 - self.tolerance) * self.last_throughput)
+        decision = 'keep'
+        if self.adaptive:
+            if worse and self.last_step:
+                # Undo the last step and go the other way next time.
+                self._set_ratio(self.reducemap_ratio - self.last_step)
+                self.direction = -self.direction
+                self.last_step = 0.0
+                decision = 'revert'
+                # The throughput before the step is the baseline.
+                throughput = self.last_throughput
+            else:
+                old = self.reducemap_ratio
+                self._set_ratio(old + self.direction * self.step)
+                self.last_step = self.reducemap_ratio - old
+                if not self.last_step:
+                    # At a bound, so try the other way next time.
+                    self.direction = -self.direction
+                decision = 'step'
+
+            if depth >= self.qmax - 0.5:
+                if not worse:
+                    self.qmax += 1
+            elif depth < self.qmax - 1:
+                self.qmax = max(2, int(math.ceil(depth)) + 1)
+
+        self.last_throughput = throughput
+        if self.log is not None:
+            self.log(('iteration=%s throughput=%.4g depth=%.2f %s'
+                    ' map_ratio=%.2f reducemap_ratio=%.2f qmax=%s')
+                    % (self.num_completed, throughput, depth, decision,
+                        self.map_ratio, self.reducemap_ratio, self.qmax))
+
+    def _set_ratio(self, reducemap_ratio):
+        """Sets both ratios from the reducemap ratio (within the bounds)."""
+        offset = MAP_RATIO - REDUCEMAP_RATIO
+        low = self.min_ratio
+        high = self.max_ratio - offset
+        reducemap_ratio = min(max(reducemap_ratio, low), high)
+        # Rounding keeps repeated steps from drifting.
+        self.reducemap_ratio = round(reducemap_ratio, 6)
+        self.map_ratio = round(reducemap_ratio + offset, 6)
+
+
+# vim: et sw=4 sts=4
@@ -3,7 +3,6 @@
 from __future__ import division
 import math
 import optparse
-from itertools import islice
 
 from psodata import PSOData
 from evilplot import Plot, Points, RawData
@@ -27,16 +26,16 @@ plot.ylabel = 'Best Function Value'
 for filename in args:
     data = PSOData(open(filename))
     trim = int(len(data) / 10)
-    points = []
-    bars = []
-    iterations = len(data[0])
-    samples_step = int(math.ceil(iterations / MAX_SAMPLES))
-    bar_samples_step = int(math.ceil(iterations / MAX_BAR_SAMPLES))
-    for iteration in islice(data[0], 0, None, samples_step):
-        points.append((iteration, data.average(iteration)))
-    for iteration in islice(data[0], 0, None, bar_samples_step):
-        low, med, high = data.statistics(iteration, trim)
-        bars.append((iteration, med, low, high))
+    iterations = data.iterations
+    samples_step = int(math.ceil(len(iterations) / MAX_SAMPLES))
+    bar_samples_step = int(math.ceil(len(iterations) / MAX_BAR_SAMPLES))
+    averages = data.averages()
+    points = list(zip(iterations[::samples_step].tolist(),
+        averages[::samples_step].tolist()))
+    low, med, high = data.all_statistics(trim)
+    bar_slice = slice(None, None, bar_samples_step)
+    bars = list(zip(iterations[bar_slice].tolist(), med[bar_slice].tolist(),
+        low[bar_slice].tolist(), high[bar_slice].tolist()))
     plot.append(Points(points, title=filename, style='lines'))
     plot.append(RawData(bars, style='errorbars'))
 
@@ -35,6 +35,23 @@ def default_specex_opts():
     opts.min_tokens = 0
     opts.tokens = 0
     opts.mrs__profile = False
+    opts.vectorized = False
+    opts.counter_rng = False
+    opts.broadcast_gbest = False
+    opts.combine_messages = False
+    opts.processes = 0
+    opts.eval_cache = 0
+    opts.checkpoint = ''
+    opts.checkpoint_freq = 100
+    opts.resume = False
+    opts.profile = False
+    opts.max_evals = 0
+    opts.max_seconds = 0
+    opts.block_size = 0
+    opts.range_partition = False
+    opts.async_tune = False
+    opts.async_log = False
+    opts.async_window = 10
     return opts
 
 # vim: et sw=4 sts=4
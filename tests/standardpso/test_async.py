@@ -0,0 +1,71 @@
+from __future__ import division, print_function
+
+import pytest
+
+from mrs.main import option_parser
+from optprime.asyncpso import AsyncPSO
+
+BASE_ARGS = ['-f', 'sphere.SleepSphere', '--func-sleep-spread', '1.0',
+        '-t', 'Ring', '-n', '8', '-d', '3', '-i', '30', '--out-freq', '4',
+        '--mrs-seed', '42', '--hey-im-testing', '-q']
+
+
+def bypass_output(args, capfd):
+    parser = AsyncPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args)
+    program = AsyncPSO(opts, args)
+    program.bypass()
+
+    out, err = capfd.readouterr()
+    assert err == ''
+    return [line for line in out.splitlines() if not line.startswith('#')]
+
+
+def test_deterministic(capfd):
+    args = BASE_ARGS + ['--func-sleep-time', '0.001', '--deterministic']
+    expected = bypass_output(args + ['--threads', '1'], capfd)
+    assert len(expected) == 8
+    assert float(expected[-1]) < float(expected[0])
+    for threads in (3, 8):
+        lines = bypass_output(args + ['--threads', str(threads)], capfd)
+        assert lines == expected
+
+
+def test_completion_order(capfd):
+    args = BASE_ARGS + ['--func-sleep-time', '0.001', '--threads', '4']
+    lines = bypass_output(args, capfd)
+    assert len(lines) == 8
+    assert float(lines[-1]) < float(lines[0])
+
+
+def test_evaluation_error(capfd):
+    args = BASE_ARGS + ['--func-sleep-time', '-1']
+    with pytest.raises((IOError, ValueError)):
+        bypass_output(args, capfd)
+
+
+def test_max_evals(capfd):
+    args = ['-o', 'Evals'] + BASE_ARGS + ['--max-evals', '100', '--threads',
+            '3']
+    lines = bypass_output(args, capfd)
+    assert [line.split()[0] for line in lines] == ['8', '40', '72', '100']
+
+
+def test_locality_rejected():
+    parser = AsyncPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(['-o', 'Locality'] + BASE_ARGS)
+    with pytest.raises(ValueError):
+        AsyncPSO(opts, args)
+
+
+@pytest.mark.parametrize('option_args', [['--checkpoint', 'ckpt'],
+    ['--resume'], ['--vectorized'], ['--processes', '2'],
+    ['--block-size', '4'], ['--broadcast-gbest']])
+def test_ignored_options_rejected(option_args):
+    parser = AsyncPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(BASE_ARGS + option_args)
+    with pytest.raises(ValueError):
+        AsyncPSO(opts, args)
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,89 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pytest
+
+from optprime import codec
+from optprime.arrayswarm import ArraySwarm
+from optprime.particle import EvalCount
+
+from .test_combine import make_program
+
+TOPOLOGIES = [
+    ['-t', 'Ring', '--top-neighbors', '2'],
+    ['-t', 'Complete'],
+    ['-t', 'Complete', '--top-noselflink'],
+    ['-t', 'Rand', '--top-neighbors', '3'],
+]
+
+
+def block_iterations(program, iters):
+    """Runs the block map and reduce functions as MapReduce would.
+
+    Every record is serialized, and the records for each key are grouped in
+    an arbitrary order.  Returns the swarm as a list of particles and the
+    number of evaluations counted by the slaves.
+    """
+    keys = range(program.num_keys())
+    records = [kvpair for key in keys
+            for kvpair in program.block_init_map(key, b'')]
+    for iteration in range(iters):
+        groups = {}
+        for key, value in reversed(records):
+            value = codec.loads(codec.dumps(value))
+            groups.setdefault(key, []).append(value)
+        blocks = [(key, block) for key in sorted(groups)
+                for block in program.block_reduce(key, iter(groups[key]))]
+        if iteration == iters - 1:
+            break
+        records = [kvpair for block_id, block in blocks
+                for kvpair in program.block_map(block_id, block)]
+    values = [block for _, block in blocks]
+    particles = [p for block in values if isinstance(block, ArraySwarm)
+            for p in block.particles()]
+    return particles, EvalCount.total(values)
+
+
+@pytest.mark.parametrize('top_args', TOPOLOGIES)
+def test_blocks_match_bypass(top_args):
+    args = top_args + ['-n', '10', '-d', '3', '--block-size', '4',
+            '--mrs-seed', '42']
+    program = make_program(args)
+    assert program.num_keys() == 3
+    particles, evals = block_iterations(program, 12)
+    assert evals == 12 * 10
+
+    program = make_program(args)
+    start, expected = program.initial_particles()
+    for iteration in range(12):
+        program.bypass_iteration(expected)
+
+    for p, q in zip(particles, expected):
+        assert p.id == q.id
+        assert p.iters == q.iters == 12
+        assert np.array_equal(p.pos, q.pos)
+        assert p.pbestval == q.pbestval
+        assert p.nbestval == q.nbestval
+        assert np.array_equal(p.nbestpos, q.nbestpos)
+
+
+def test_block_codec():
+    program = make_program(['-t', 'Ring', '-n', '5', '--block-size', '5',
+        '--func-maximize', '--mrs-seed', '42'])
+    records = list(program.block_init_map(0, b''))
+    block = records[0][1]
+    assert isinstance(block, ArraySwarm)
+    copy = codec.loads(codec.dumps(block))
+    assert copy.comparator is block.comparator
+    for name in ArraySwarm.arrays:
+        assert np.array_equal(getattr(copy, name), getattr(block, name))
+
+    key, messages = records[1]
+    assert key == 0
+    copy = codec.loads(codec.dumps(messages))
+    assert copy.sender == 0
+    assert copy.recipients.tolist() == list(range(5))
+    assert np.array_equal(copy.positions, messages.positions)
+
+
+# vim: et sw=4 sts=4
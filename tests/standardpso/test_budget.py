@@ -0,0 +1,41 @@
+from __future__ import division, print_function
+
+import pytest
+
+from .test_vectorized import BASE_ARGS, bypass_output
+
+TOP_ARGS = ['-t', 'Ring', '--top-neighbors', '2']
+
+
+@pytest.mark.parametrize('mode_args', [[], ['--vectorized'],
+    ['--processes', '2']])
+def test_evals_output(mode_args, capfd):
+    args = TOP_ARGS + BASE_ARGS + mode_args
+    pairs = [line.split() for line in bypass_output(['-o', 'Pair'] + args,
+        capfd)]
+    lines = [line.split() for line in bypass_output(['-o', 'Evals'] + args,
+        capfd)]
+    assert [int(evals) for evals, value in lines] == [8 * int(iteration)
+            for iteration, value in pairs]
+    assert [value for evals, value in lines] == [value for _, value in pairs]
+
+
+@pytest.mark.parametrize('mode_args', [[], ['--vectorized'],
+    ['--processes', '2']])
+def test_max_evals(mode_args, capfd):
+    args = ['-o', 'Evals'] + TOP_ARGS + BASE_ARGS + mode_args
+    expected = bypass_output(args, capfd)
+    lines = bypass_output(args + ['--max-evals', '90'], capfd)
+    # The run stops after iteration 12 (96 evaluations) with an output.
+    assert lines[:-1] == expected[:3]
+    assert lines[-1].split()[0] == '96'
+
+
+def test_max_seconds(capfd):
+    args = ['-o', 'Evals'] + TOP_ARGS + BASE_ARGS
+    lines = bypass_output(args + ['--max-seconds', '1e-9'], capfd)
+    assert len(lines) == 1
+    assert lines[0].split()[0] == '8'
+
+
+# vim: et sw=4 sts=4
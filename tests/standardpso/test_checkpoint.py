@@ -0,0 +1,48 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pytest
+
+from optprime import checkpoint
+from optprime.particle import Particle
+
+from .test_combine import make_program
+from .test_vectorized import BASE_ARGS, bypass_output
+
+TOP_ARGS = ['-t', 'Ring', '--top-neighbors', '2']
+
+
+@pytest.mark.parametrize('mode_args', [[], ['--vectorized']])
+def test_resume(mode_args, tmpdir, capfd):
+    path = str(tmpdir.join('checkpoint'))
+    args = TOP_ARGS + BASE_ARGS + mode_args
+    expected = bypass_output(args + ['-i', '30'], capfd)
+
+    ckpt_args = ['--checkpoint', path, '--checkpoint-freq', '5']
+    first = bypass_output(args + ckpt_args + ['-i', '17'], capfd)
+    iteration, particles = checkpoint.load(path, '42')
+    assert iteration == 15
+    assert len(particles) == 8
+    assert all(p.iters == 15 for p in particles)
+
+    rest = bypass_output(args + ckpt_args + ['-i', '30', '--resume'], capfd)
+    assert first + rest[1:] == expected
+
+
+def test_mapreduce_rejects_checkpoint(tmpdir):
+    program = make_program(['--checkpoint', str(tmpdir.join('checkpoint'))])
+    with pytest.raises(ValueError):
+        program.run(None)
+
+
+def test_seed_mismatch(tmpdir):
+    path = str(tmpdir.join('checkpoint'))
+    writer = checkpoint.CheckpointWriter(path)
+    writer.write(3, '42', [Particle(0, np.ones(2), np.zeros(2))])
+    writer.wait()
+    assert checkpoint.load(path, '42')[0] == 3
+    with pytest.raises(ValueError):
+        checkpoint.load(path, '43')
+
+
+# vim: et sw=4 sts=4
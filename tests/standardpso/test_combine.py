@@ -0,0 +1,77 @@
+from __future__ import division, print_function
+
+import numpy as np
+
+from mrs.main import option_parser
+from optprime.particle import Particle, Message, EvalCount
+from optprime.standardpso import StandardPSO
+
+
+def make_program(args):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args + ['--hey-im-testing'])
+    return StandardPSO(opts, args)
+
+
+def make_messages():
+    return [Message(i, np.array((i, i)), value)
+            for i, value in enumerate((3.0, 1.0, 2.0, 1.0))]
+
+
+def test_combine_keeps_best_message():
+    program = make_program(['-t', 'Ring'])
+    particle = Particle(7, np.zeros(2), np.zeros(2))
+    records = make_messages()
+    records.insert(2, particle)
+
+    combined = list(program.pso_combine(7, iter(records)))
+    assert combined[0] is particle
+    assert len(combined) == 2
+    # Ties go to the first message, as in findbest.
+    assert combined[1].sender == 1
+
+
+def test_combine_maximize():
+    program = make_program(['-t', 'Ring', '--func-maximize'])
+    combined = list(program.pso_combine(0, iter(make_messages())))
+    assert [m.sender for m in combined] == [0]
+
+
+def test_combine_gbest_noselflink():
+    program = make_program(['-t', 'Complete', '--top-noselflink'])
+    combined = list(program.pso_combine(program.GBEST_KEY,
+        iter(make_messages())))
+    assert [m.sender for m in combined] == [1, 3]
+
+
+def test_findbest_tree():
+    program = make_program(['-t', 'Ring'])
+    program.opts.mrs__reduce_tasks = 3
+    particles = []
+    for i, value in enumerate((5.0, 2.0, 4.0, 1.0, 3.0, 1.0, 6.0)):
+        p = Particle(i, np.zeros(2), np.zeros(2))
+        p.pbestval = value
+        particles.append(p)
+
+    # Two map tasks, each combining its particles for each reduce task.
+    interm = {}
+    for task in particles[:4], particles[4:]:
+        collapsed = {}
+        for p in task:
+            for record in p, EvalCount(p.id):
+                for key, value in program.collapse_map(p.id, record):
+                    collapsed.setdefault(key, []).append(value)
+        for key, values in collapsed.items():
+            combined = list(program.findbest_reduce(key, iter(values)))
+            assert len(combined) == 2
+            interm.setdefault(key, []).extend(combined)
+
+    winners = [best for key in sorted(interm)
+            for best in program.findbest_reduce(key, iter(interm[key]))]
+    assert len(winners) == 6
+    assert program.findbest(winners[::2]).id == 3
+    # The master adds up the counts that come with the winners.
+    assert EvalCount.total(winners) == sum(range(7))
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,47 @@
+from __future__ import division, print_function
+
+import operator
+
+import numpy as np
+import pytest
+
+from optprime import parallel
+from optprime.arrayswarm import ArraySwarm
+from optprime.particle import Particle
+
+from .test_vectorized import BASE_ARGS, bypass_output
+
+
+@pytest.mark.parametrize('top_args', [
+    ['-t', 'Complete'],
+    ['-t', 'Complete', '--top-noselflink'],
+    ['-t', 'Ring', '--top-neighbors', '2', '--transitive-best'],
+    ['-t', 'DRing', '--top-noselflink'],
+    ['-t', 'Rand', '--top-neighbors', '3'],
+    ])
+def test_parallel_matches_bypass(top_args, capfd):
+    expected = bypass_output(top_args + BASE_ARGS, capfd)
+    lines = bypass_output(top_args + BASE_ARGS + ['--processes', '3'], capfd)
+    assert len(lines) == 8
+    assert lines == expected
+
+
+def test_share_swarm():
+    particles = [Particle(i, np.arange(3.0) + i, np.zeros(3))
+            for i in range(4)]
+    swarm = ArraySwarm.from_particles(particles, operator.lt)
+    parallel.share_swarm(swarm)
+    p = swarm.particle(2)
+    assert np.array_equal(p.pos, particles[2].pos)
+    assert p.value is None
+
+    p.iters = 5
+    p.value = p.pbestval = 1.5
+    swarm.set_particle(2, p)
+    q = swarm.particle(2)
+    assert q.iters == 5
+    assert q.pbestval == 1.5
+    assert swarm.particle(1).pbestval is None
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,49 @@
+from __future__ import division, print_function
+
+from .test_combine import make_program
+from .test_vectorized import BASE_ARGS, bypass_output
+
+RING_ARGS = ['-t', 'Ring', '-n', '20', '-N', '4', '--mrs-seed', '42']
+
+
+def test_range_partition():
+    program = make_program(['-n', '10', '--range-partition'])
+    assert program.partition_function() == program.range_partition
+    tasks = [program.range_partition(key, 4) for key in range(10)]
+    assert tasks == [0, 0, 0, 1, 1, 2, 2, 2, 3, 3]
+    assert program.range_partition(program.GBEST_KEY, 4) == 3
+
+
+def test_cross_task_fraction():
+    program = make_program(RING_ARGS)
+    # Only the message to self stays within the task.
+    assert abs(program.cross_task_fraction(1) - 2 / 3) < 1e-12
+
+    program = make_program(RING_ARGS + ['--range-partition'])
+    # Each task of 5 particles sends 2 of its 15 messages to other tasks.
+    assert abs(program.cross_task_fraction(1) - 2 / 15) < 1e-12
+
+    program = make_program(RING_ARGS + ['--range-partition',
+        '--block-size', '5'])
+    assert program.num_tasks() == 4
+    assert abs(program.cross_task_fraction(1) - 2 / 15) < 1e-12
+
+
+def test_cross_task_fraction_rand():
+    args = ['-t', 'Rand', '-n', '20', '-N', '4', '--mrs-seed', '42']
+    program = make_program(args + ['--range-partition'])
+    fractions = [program.cross_task_fraction(i) for i in (1, 2)]
+    assert fractions[0] != fractions[1]
+    assert all(0 < f < 1 for f in fractions)
+
+
+def test_locality_output(capfd):
+    args = (['-o', 'Locality', '-t', 'Ring', '-N', '2', '--range-partition']
+            + BASE_ARGS)
+    lines = bypass_output(args, capfd)
+    assert len(lines) == 8
+    # 3 and 4 (and 7 and 0) send 4 of the 24 messages across tasks.
+    assert all(line.split()[2] == '0.166667' for line in lines)
+
+
+# vim: et sw=4 sts=4
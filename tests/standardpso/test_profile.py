@@ -0,0 +1,95 @@
+from __future__ import division, print_function
+
+import gc
+import json
+import weakref
+
+import mrs
+import numpy as np
+import pytest
+
+from mrs.main import option_parser
+from optprime.standardpso import StandardPSO
+
+from .test_vectorized import BASE_ARGS, bypass_output
+
+
+@pytest.mark.parametrize('mode_args', [[], ['--vectorized'],
+    ['--processes', '2']])
+def test_profile_output(mode_args, tmpdir, capfd):
+    path = str(tmpdir.join('profile.json'))
+    args = ['-t', 'Ring', '--top-neighbors', '2'] + BASE_ARGS + mode_args
+    expected = bypass_output(['-o', 'Pair'] + args, capfd)
+    lines = bypass_output(['-o', 'Profile', '--out-path', path] + args, capfd)
+
+    # Profiling doesn't change the results.
+    assert [line.split()[:2] for line in lines] == [line.split()
+            for line in expected]
+    assert all(len(line.split()) == 8 for line in lines)
+
+    with open(path) as f:
+        summary = json.load(f)
+    assert summary['calls']['output'] == len(lines)
+    if not mode_args:
+        # One evaluation per particle per iteration.
+        assert summary['calls']['evaluation'] == 8 * 30
+    assert summary['seconds']['motion'] > 0
+
+
+def test_profile_summary(capfd):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(['-o', 'Pair', '--profile'] + BASE_ARGS)
+    program = StandardPSO(opts, args)
+    program.bypass()
+
+    out, err = capfd.readouterr()
+    prefix = '# Profile: '
+    summaries = [line[len(prefix):] for line in out.splitlines()
+            if line.startswith(prefix)]
+    assert len(summaries) == 1
+    assert json.loads(summaries[0])['calls']['evaluation'] == 8 * 30
+    # The summary is only reported once.
+    program.report_profile()
+    assert capfd.readouterr()[0] == ''
+
+
+def test_profile_at_exit(capfd):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(['--profile'] + BASE_ARGS)
+    program = StandardPSO(opts, args)
+    program.function(np.zeros(opts.func__dims))
+
+    # As in a slave, the profile is reported when the program goes away (or
+    # the worker process exits), but it doesn't keep the program alive.
+    ref = weakref.ref(program)
+    del program
+    gc.collect()
+    assert ref() is None
+    out, err = capfd.readouterr()
+    prefix = '# Profile: '
+    assert out == ''
+    assert err.startswith(prefix)
+    assert json.loads(err[len(prefix):])['calls']['evaluation'] == 1
+
+
+def test_profile_serial(tmpdir, capfd):
+    path = str(tmpdir.join('profile.json'))
+    args = ['-t', 'Ring', '--top-neighbors', '2'] + BASE_ARGS
+    expected = bypass_output(['-o', 'Pair'] + args, capfd)
+    with pytest.raises(SystemExit) as excinfo:
+        mrs.main(StandardPSO, args=['-I', 'Serial', '-o', 'Profile',
+            '--out-path', path] + args)
+    assert excinfo.value.code == 0
+
+    out, err = capfd.readouterr()
+    lines = [line for line in out.splitlines() if not line.startswith('#')]
+    assert [line.split()[:2] for line in lines] == [line.split()
+            for line in expected]
+    with open(path) as f:
+        summary = json.load(f)
+    # Records were serialized with the timed particle serializer.
+    assert summary['calls']['serialization'] > 0
+    assert summary['calls']['evaluation'] == 8 * 30
+
+
+# vim: et sw=4 sts=4
@@ -41,4 +41,44 @@ def test_pso(mrs_impl, tmpdir, capfd):
             '32.3155678366', '2.9191713839', '2.9191713839', '2.9191713839']
 
 
+def run_pso(mrs_impl, args, tmpdir, capfd):
+    if mrs_impl == 'serial':
+        run_serial(StandardPSO, args)
+    elif mrs_impl == 'mockparallel':
+        run_mockparallel(StandardPSO, args, tmpdir)
+    elif mrs_impl == 'master_slave':
+        run_master_slave(StandardPSO, args, tmpdir)
+    else:
+        raise RuntimeError('Unknown mrs_impl: %s' % mrs_impl)
+
+    out, err = capfd.readouterr()
+    assert err == ''
+
+    return [line.strip() for line in out.splitlines()
+            if line and not line.startswith('#')]
+
+
+def test_broadcast_gbest(mrs_impl, tmpdir, capfd):
+    for i, extra in enumerate(([], ['--top-noselflink'],
+            ['--transitive-best'])):
+        args = ['-i', '20', '-n', '5', '-d', '2', '--out-freq', '3',
+                '--mrs-seed', '42', '--hey-im-testing'] + extra
+        expected = run_pso(mrs_impl, args, tmpdir.mkdir('full%s' % i), capfd)
+        lines = run_pso(mrs_impl, args + ['--broadcast-gbest'],
+                tmpdir.mkdir('broadcast%s' % i), capfd)
+        assert len(lines) == 7
+        assert lines == expected
+
+
+def test_combine_messages(mrs_impl, tmpdir, capfd):
+    args = ['-t', 'Ring', '-i', '20', '-n', '5', '--top-neighbors', '2',
+            '-d', '2', '--out-freq', '3', '--mrs-seed', '42', '-N', '2',
+            '--hey-im-testing']
+    expected = run_pso(mrs_impl, args, tmpdir.mkdir('full'), capfd)
+    lines = run_pso(mrs_impl, args + ['--combine-messages'],
+            tmpdir.mkdir('combined'), capfd)
+    assert len(lines) == 7
+    assert lines == expected
+
+
 # vim: et sw=4 sts=4
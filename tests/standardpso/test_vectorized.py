@@ -0,0 +1,95 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pytest
+
+from mrs.main import option_parser
+from optprime.standardpso import StandardPSO
+
+BASE_ARGS = ['-i', '30', '-n', '8', '-d', '3', '--out-freq', '4',
+        '--mrs-seed', '42', '--hey-im-testing', '-q']
+
+
+def bypass_output(args, capfd):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args)
+    program = StandardPSO(opts, args)
+    program.bypass()
+
+    out, err = capfd.readouterr()
+    assert err == ''
+    return [line for line in out.splitlines() if not line.startswith('#')]
+
+
+@pytest.mark.parametrize('top_args', [
+    ['-t', 'Complete'],
+    ['-t', 'Complete', '--top-noselflink'],
+    ['-t', 'Complete', '--transitive-best'],
+    ['-t', 'Isolated'],
+    ['-t', 'Ring', '--top-neighbors', '2'],
+    ['-t', 'DRing', '--top-noselflink'],
+    ['-t', 'Rand', '--top-neighbors', '3'],
+    ])
+def test_vectorized_matches_bypass(top_args, capfd):
+    expected = bypass_output(top_args + BASE_ARGS, capfd)
+    lines = bypass_output(top_args + BASE_ARGS + ['--vectorized'], capfd)
+    assert len(lines) == 8
+    assert lines == expected
+
+
+@pytest.mark.parametrize('top_args', [
+    ['-t', 'Ring', '--top-neighbors', '2'],
+    ['-t', 'Rand', '--top-neighbors', '3'],
+    ])
+def test_vectorized_counter_rng(top_args, capfd):
+    args = top_args + BASE_ARGS + ['--counter-rng']
+    expected = bypass_output(args, capfd)
+    lines = bypass_output(args + ['--vectorized'], capfd)
+    assert len(lines) == 8
+    assert lines == expected
+    assert lines != bypass_output(top_args + BASE_ARGS, capfd)
+
+
+@pytest.mark.parametrize('boundary', ['clamp', 'reflect', 'wrap'])
+def test_vectorized_boundary(boundary, capfd):
+    args = (['-t', 'Ring', '--top-neighbors', '2', '-f',
+        'rastrigin.Rastrigin', '-m', 'basic.Constricted',
+        '--motion-restrictvel'] + BASE_ARGS)
+    unbounded = bypass_output(args, capfd)
+    args += ['--motion-boundary', boundary]
+    expected = bypass_output(args, capfd)
+    assert expected != unbounded
+    assert bypass_output(args + ['--vectorized'], capfd) == expected
+
+
+@pytest.mark.parametrize('rng_args', [[], ['--counter-rng']])
+def test_new_array_swarm(rng_args):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(BASE_ARGS + rng_args)
+    program = StandardPSO(opts, args)
+    swarm = program.new_array_swarm(np.arange(2, 5))
+    for row, i in enumerate(range(2, 5)):
+        p = program.topology.newparticle(i, program.initialization_rand(i))
+        assert swarm.ids[row] == i
+        assert np.array_equal(swarm.pos[row], p.pos)
+        assert np.array_equal(swarm.vel[row], p.vel)
+
+
+def test_boundary_unsupported():
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(['-m', 'basic.BasicGauss',
+        '--motion-boundary', 'clamp'] + BASE_ARGS)
+    with pytest.raises(ValueError):
+        StandardPSO(opts, args)
+
+
+def test_vectorized_stops_with_bypass(capfd):
+    args = (['-t', 'Ring', '--top-neighbors', '2', '-f', 'sphere.Sphere',
+        '--func-success', '10'] + BASE_ARGS)
+    expected = bypass_output(args, capfd)
+    lines = bypass_output(args + ['--vectorized'], capfd)
+    assert 0 < len(lines) < 8
+    assert lines == expected
+
+
+# vim: et sw=4 sts=4
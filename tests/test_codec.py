@@ -0,0 +1,98 @@
+from __future__ import division
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+import numpy as np
+
+from optprime import codec
+from optprime.particle import (Particle, Message, SEParticle, BranchParticle,
+        Swarm, EvalCount)
+
+
+def make_particle(id, dims=5, cls=Particle):
+    p = cls(id, np.arange(dims) + id / 3, np.ones(dims) * -id)
+    p.iters = 3 * id
+    p.value = np.float64(id / 7)
+    p.pbestpos = p.pos * 2
+    p.pbestval = np.float64(id / 11)
+    p.nbestpos = p.pos * 3
+    p.nbestval = None
+    return p
+
+
+def assert_same_particle(p, q):
+    assert type(p) is type(q)
+    assert sorted(p.fields()) == sorted(q.fields())
+    for name, value in p.fields().items():
+        other = getattr(q, name)
+        if isinstance(value, np.ndarray):
+            assert np.array_equal(value, other)
+        else:
+            assert value == other
+            assert type(value) is type(other)
+
+
+def test_particle():
+    p = make_particle(4)
+    data = codec.dumps(p)
+    assert_same_particle(p, codec.loads(data))
+    assert len(data) < len(pickle.dumps(p, pickle.HIGHEST_PROTOCOL))
+
+    p.value = p.pbestval = p.nbestval = None
+    assert_same_particle(p, codec.loads(codec.dumps(p)))
+
+
+def test_particle_subclasses():
+    p = SEParticle(make_particle(2), True, 17)
+    assert_same_particle(p, codec.loads(codec.dumps(p)))
+
+    p = make_particle(3, cls=BranchParticle)
+    p.lastbranch = [True, 5]
+    assert_same_particle(p, codec.loads(codec.dumps(p)))
+
+
+def test_message():
+    m = Message(12, np.array((1.5, -2.0, 3.25)), -5.0)
+    n = codec.loads(codec.dumps(m))
+    assert n.sender == 12
+    assert n.value == -5.0
+    assert np.array_equal(n.position, m.position)
+
+
+def test_swarm():
+    s = Swarm(9, [make_particle(i) for i in range(6)])
+    data = codec.dumps(s)
+    t = codec.loads(data)
+    assert t.id == 9
+    assert len(t) == len(s)
+    for p, q in zip(s, t):
+        assert_same_particle(p, q)
+    assert len(data) < len(pickle.dumps(s, pickle.HIGHEST_PROTOCOL))
+
+
+def test_evalcount():
+    data = codec.dumps(EvalCount(12345678901))
+    assert data[:1] == codec.EVALCOUNT_TAG
+    assert codec.loads(data).evals == 12345678901
+
+
+def test_pickle_fallback():
+    # Extra attributes and non-float values don't fit the fixed layouts.
+    p = make_particle(1, cls=BranchParticle)
+    p.tokens = 2
+    assert codec.dumps(p)[:1] == codec.PICKLE_TAG
+    assert_same_particle(p, codec.loads(codec.dumps(p)))
+
+    m = Message(1, np.array((1.0, 2.0)), -15)
+    assert codec.dumps(m)[:1] == codec.PICKLE_TAG
+    assert codec.loads(codec.dumps(m)).value == -15
+
+    s = Swarm(0, [p, make_particle(2)])
+    assert codec.dumps(s)[:1] == codec.PICKLE_TAG
+    assert_same_particle(p, codec.loads(codec.dumps(s))[0])
+
+
+# vim: et sw=4 sts=4
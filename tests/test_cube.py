@@ -0,0 +1,61 @@
+from __future__ import division
+
+import random
+
+import numpy as np
+
+from optprime.cube import Cube
+from optprime.randstream import CounterRandom, StreamBatch, seed_key
+
+CONSTRAINTS = [(-50, 50), (0.5, 2.0), (-5.12, 5.12)]
+
+
+def test_random_vec():
+    cube = Cube(CONSTRAINTS)
+    rand = random.Random(3)
+    expected = [rand.uniform(*c) for c in CONSTRAINTS]
+    assert cube.random_vec(random.Random(3)).tolist() == expected
+
+    key = seed_key(42)
+    batch = StreamBatch(key, 1, [0, 1, 2], [5, 5, 5])
+    vecs = cube.random_vecs(batch)
+    for i in range(3):
+        rand = CounterRandom(key, 1, i, 5)
+        assert vecs[i].tolist() == [rand.uniform(*c) for c in CONSTRAINTS]
+    rands = list(StreamBatch(key, 1, [0, 1, 2], [5, 5, 5]))
+    assert np.array_equal(cube.random_vecs(rands), vecs)
+
+
+def test_constrain_vec():
+    cube = Cube([(-s, s) for s in (1.0, 2.0, 4.0)])
+    vecs = np.array([[0.5, -3.0, 8.0], [-2.0, 1.0, -4.0]])
+    clamped = vecs.copy()
+    cube.constrain_vec(clamped)
+    assert clamped.tolist() == [[0.5, -2.0, 4.0], [-1.0, 1.0, -4.0]]
+
+    scaled = vecs.copy()
+    cube.constrain_vec(scaled, True)
+    assert scaled.tolist() == [[0.5, -3.0, 8.0], [-2.0, 1.0, -4.0]]
+    scaled = vecs * 2
+    cube.constrain_vec(scaled[1], True)
+    assert scaled[1].tolist() == [-2.0, 2.0, -8.0]
+
+
+def test_constrain_modes():
+    cube = Cube(CONSTRAINTS)
+    rand = random.Random(5)
+    vecs = np.array([[rand.uniform(-400, 400) for c in CONSTRAINTS]
+        for i in range(50)])
+    for mode in 'clamp', 'reflect', 'wrap':
+        result = cube.constrain(vecs, mode)
+        assert (result >= cube.lows).all() and (result <= cube.highs).all()
+        inside = (vecs >= cube.lows) & (vecs <= cube.highs)
+        assert np.array_equal(result[inside], vecs[inside])
+        for vec, row in zip(vecs, result):
+            assert np.array_equal(cube.constrain(vec, mode), row)
+
+    flat = Cube([(1, 1)])
+    assert flat.constrain([[3.0], [-3.0]], 'wrap').tolist() == [[1.0], [1.0]]
+
+
+# vim: et sw=4 sts=4
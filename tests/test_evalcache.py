@@ -0,0 +1,60 @@
+from __future__ import division
+
+import numpy as np
+
+from mrs.main import option_parser
+from optprime.evalcache import EvaluationCache
+from optprime.functions import BaseFunction
+from optprime.standardpso import StandardPSO
+
+
+class Counting(BaseFunction):
+    def setup(self, rand):
+        super(Counting, self).setup(rand)
+        self.calls = 0
+
+    def __call__(self, vec):
+        self.calls += 1
+        return float(vec.sum())
+
+
+def test_lru_eviction():
+    f = Counting()
+    f.setup(None)
+    cache = EvaluationCache(f, 2)
+    a, b, c = (np.array((float(i), 1.0)) for i in range(3))
+    for vec in (a, b, a, c, a, b):
+        cache(vec)
+    # Evaluating c evicted b (the least recently used), but not a.
+    assert f.calls == 4
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert cache.comparator is f.comparator
+
+
+def test_evaluate_batch():
+    f = Counting()
+    f.setup(None)
+    cache = EvaluationCache(f, 10)
+    matrix = np.arange(8.0).reshape(4, 2)
+    cache(matrix[2])
+    values = cache.evaluate_batch(matrix)
+    assert list(values) == [1.0, 5.0, 9.0, 13.0]
+    assert f.calls == 4
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def make_program(args):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args + ['--mrs-seed', '42'])
+    return StandardPSO(opts, args)
+
+
+def test_stochastic_not_cached():
+    program = make_program(['-f', 'sphere.Sphere', '--eval-cache', '10'])
+    assert program.function is program.eval_counter
+    assert program.eval_counter.function is program.eval_cache
+    program = make_program(['-f', 'sphere.SleepSphere', '--eval-cache', '10'])
+    assert program.eval_cache is None
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,93 @@
+from __future__ import division
+
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from optprime.functions.external import StdinPool
+
+# Sums its inputs.  A line starting with 77 hangs forever, a line starting
+# with 99 hangs the first time (using a marker file), and the process exits
+# without answering its third request if given the "crash" argument.
+WORKER = '''
+import os, sys, time
+crash = 'crash' in sys.argv
+marker = sys.argv[1]
+count = 0
+for line in iter(sys.stdin.readline, ''):
+    values = [float(x) for x in line.split()]
+    count += 1
+    if crash and count == 3:
+        sys.exit(1)
+    if values[0] == 77:
+        time.sleep(60)
+    if values[0] == 99 and not os.path.exists(marker):
+        open(marker, 'w').close()
+        time.sleep(60)
+    sys.stdout.write('%r\\n' % sum(values))
+    sys.stdout.flush()
+'''
+
+
+@pytest.fixture
+def make_pool(tmpdir):
+    script = tmpdir.join('worker.py')
+    script.write(WORKER)
+    constraints = tmpdir.join('constraints.txt')
+    constraints.write('-100,100\n' * 3)
+    pools = []
+
+    def make(extra_args='', **kwds):
+        args = '%s %s %s' % (script, tmpdir.join('marker'), extra_args)
+        pool = StdinPool(exe=sys.executable, args=args,
+                constraintsfile=str(constraints), quiet=True, **kwds)
+        pool.setup()
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.close()
+
+
+def test_batch(make_pool):
+    pool = make_pool(processes=3, depth=2)
+    matrix = np.arange(60, dtype=float).reshape(20, 3)
+    assert np.array_equal(pool.evaluate_batch(matrix), matrix.sum(axis=1))
+    assert pool(np.array((1.0, 2.5, -3.0))) == 0.5
+
+
+def test_restart_on_crash(make_pool):
+    pool = make_pool('crash', processes=2, depth=2)
+    matrix = np.arange(30, dtype=float).reshape(10, 3)
+    assert np.array_equal(pool.evaluate_batch(matrix), matrix.sum(axis=1))
+
+
+@pytest.mark.parametrize('timeout', [0.0, 5.0])
+def test_restart_on_send(make_pool, timeout):
+    pool = make_pool(processes=1, timeout=timeout)
+    matrix = np.arange(12, dtype=float).reshape(4, 3)
+    assert np.array_equal(pool.evaluate_batch(matrix), matrix.sum(axis=1))
+
+    # The process dies between batches, so the next send fails.
+    worker = pool.pool[0]
+    worker.proc.kill()
+    worker.proc.wait()
+    assert np.array_equal(pool.evaluate_batch(matrix), matrix.sum(axis=1))
+
+
+def test_timeout(make_pool):
+    pool = make_pool(processes=2, timeout=0.5)
+    matrix = np.array([[1.0, 2.0, 3.0], [99.0, 1.0, 0.0], [4.0, 5.0, 6.0]])
+    start = time.time()
+    assert pool.evaluate_batch(matrix).tolist() == [6.0, 100.0, 15.0]
+    assert time.time() - start < 10
+
+    pool = make_pool(processes=1, timeout=0.2, retries=1)
+    with pytest.raises(RuntimeError):
+        pool.evaluate_batch(np.array([[77.0, 0.0, 0.0]]))
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,55 @@
+from __future__ import division, print_function
+
+import numpy as np
+import pytest
+import random
+
+from optprime.functions.ackley import Ackley
+from optprime.functions.bohachevsky import Bohachevsky
+from optprime.functions.dejong import DeJongF4
+from optprime.functions.distance import Distance
+from optprime.functions.gauss import Gauss
+from optprime.functions.griewank import Griewank
+from optprime.functions.keane import Keane
+from optprime.functions.monson import (TwoGaussians, ValleyNeedle,
+        AsymmetricCone)
+from optprime.functions.quadratic import Quadratic
+from optprime.functions.rastrigin import Rastrigin
+from optprime.functions.rosenbrock import Rosenbrock
+from optprime.functions.schaffer import SchafferF6, SchafferF7
+from optprime.functions.schwefel import Schwefel, Schwefel221, Schwefel12
+from optprime.functions.sphere import Sphere
+
+TOLERANCE = 1e-10
+
+BENCHMARKS = [Ackley, Bohachevsky, DeJongF4, Distance, Gauss, Griewank,
+        Keane, TwoGaussians, ValleyNeedle, AsymmetricCone, Quadratic,
+        Rastrigin, Rosenbrock, SchafferF6, SchafferF7, Schwefel, Schwefel221,
+        Schwefel12, Sphere]
+
+
+def random_positions(function, num, rand):
+    low = function.constraints[:, 0]
+    high = function.constraints[:, 1]
+    return np.array([[rand.uniform(l, h) for l, h in zip(low, high)]
+        for i in range(num)])
+
+
+@pytest.mark.parametrize('cls', BENCHMARKS)
+@pytest.mark.parametrize('cliques', [0, 2])
+def test_evaluate_batch(cls, cliques):
+    rand = random.Random(42)
+    function = cls()
+    function.dims = 6
+    function.part_sep_cliques = cliques
+    function.setup(rand)
+
+    matrix = random_positions(function, 20, rand)
+    values = function.evaluate_batch(matrix)
+    expected = [function(vec) for vec in matrix]
+
+    assert values.shape == (20,)
+    assert np.allclose(values, expected, rtol=TOLERANCE, atol=TOLERANCE)
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,94 @@
+from __future__ import division
+
+import operator
+import pickle
+
+import numpy as np
+
+from optprime.particle import (Particle, Message, SEParticle, BranchParticle,
+        MessageParticle, Swarm, slot_names)
+
+
+def make_particle():
+    p = Particle(42, np.array((1.0, 2.0)), np.array((3.0, 4.0)), -10.0)
+    p.iters = 200
+    p.nbestpos = np.array((8.0, 9.0))
+    p.nbestval = -12.0
+    return p
+
+
+def test_slots():
+    p = make_particle()
+    assert 'pbestval' in slot_names(Particle)
+    assert slot_names(SEParticle)[-2:] == ('specpbest', 'specnbestid')
+    assert p.fields()['nbestval'] == -12.0
+    assert not hasattr(Message(1, p.pos, 1.0), '__dict__')
+
+    # Particles have no __dict__, and pickling doesn't make one.
+    assert not hasattr(p, '__dict__')
+    pickle.dumps(p, pickle.HIGHEST_PROTOCOL)
+    assert not hasattr(p, '__dict__')
+
+    # A subclass may allow extra attributes (e.g., SpecEx's tokens).
+    b = BranchParticle(1, p.pos, p.vel)
+    b.tokens = 3
+    assert b.fields()['tokens'] == 3
+    assert b.copy().tokens == 3
+
+
+def test_pickle():
+    p = make_particle()
+    b = BranchParticle(7, p.pos, p.vel)
+    b.tokens = 2
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        q = pickle.loads(pickle.dumps(p, protocol))
+        assert sorted(q.fields()) == sorted(p.fields())
+        assert q.iters == 200
+        assert np.array_equal(q.nbestpos, p.nbestpos)
+        c = pickle.loads(pickle.dumps(b, protocol))
+        assert c.tokens == 2
+        assert c.lastbranch == [False, -1]
+
+    s = Swarm(3, [make_particle(), SEParticle(make_particle(), True, 7)])
+    t = pickle.loads(pickle.dumps(s, pickle.HIGHEST_PROTOCOL))
+    assert t.id == 3
+    assert t[1].specnbestid == 7
+
+    m = pickle.loads(pickle.dumps(Message(5, p.pos, None)))
+    assert m.sender == 5
+    assert m.value is None
+
+
+def test_copy():
+    p = BranchParticle(1, np.array((1.0,)), np.array((2.0,)), 3.0)
+    assert p.lastbranch == [False, -1]
+    sep = SEParticle(p, True, 4)
+    for q in (sep.copy(), MessageParticle(p).copy(), p.copy()):
+        assert q.id == 1
+        assert q.value == 3.0
+    assert sep.copy().specnbestid == 4
+    assert type(MessageParticle(p).copy()) is MessageParticle
+
+
+def test_comparisons():
+    p = make_particle()
+    q = make_particle()
+    assert p == q
+    q.pbestval = p.pbestval - 1
+    assert q < p
+    assert p > q
+    assert Particle.isbetter(None, 4, operator.lt) is False
+    assert Particle.isbetter(4, None, operator.gt) is True
+
+
+def test_update_reports_pbest():
+    p = Particle(1, np.zeros(2), np.zeros(2))
+    assert p.update(np.ones(2), np.ones(2), 5.0, operator.lt) is True
+    assert p.update(np.zeros(2), np.ones(2), 7.0, operator.lt) is False
+    assert p.pbestval == 5.0
+    assert p.update_value(3.0, operator.lt) is True
+    assert p.update_value(4.0, operator.lt) is False
+    assert p.iters == 2
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,69 @@
+from __future__ import division
+
+import time
+
+from optprime.profiling import PHASES, Profiler
+
+
+def test_nested_phases():
+    profiler = Profiler()
+    rand = profiler.timed('rng', lambda: time.sleep(0.02))
+
+    def communicate():
+        rand()
+        time.sleep(0.01)
+    communicate = profiler.timed('communication', communicate)
+    communicate()
+
+    totals = profiler.totals()
+    assert set(totals) == set(PHASES)
+    assert totals['rng'][0] >= 0.02
+    # The time in the nested phase isn't counted twice.
+    assert 0.01 <= totals['communication'][0] < 0.02
+    assert totals['rng'][1] == totals['communication'][1] == 1
+
+
+def test_generator_and_proxy():
+    profiler = Profiler()
+
+    def reduce(key, values):
+        for value in values:
+            yield value * key
+    reduce = profiler.timed_generator('communication', reduce)
+    assert list(reduce(2, [1, 2, 3])) == [2, 4, 6]
+    assert profiler.calls['communication'] == 5
+
+    class Function(object):
+        maximize = True
+
+        def __call__(self, x):
+            return x + 1
+
+        def evaluate_batch(self, xs):
+            return [x + 1 for x in xs]
+
+    function = profiler.wrap(Function(), 'evaluation', ('evaluate_batch',
+        'missing'))
+    assert function(1) == 2
+    assert function.evaluate_batch([1, 2]) == [2, 3]
+    assert function.maximize
+    assert not hasattr(function, 'missing')
+    assert profiler.calls['evaluation'] == 2
+
+
+def test_collect_and_merge():
+    profiler = Profiler()
+    profiler.add('motion', 1.5, 3)
+    totals = profiler.collect()
+    assert totals['motion'] == (1.5, 3)
+    assert profiler.totals()['motion'] == (0.0, 0)
+
+    other = Profiler()
+    other.merge(totals)
+    other.merge(totals)
+    summary = other.summary()
+    assert summary['seconds']['motion'] == 3.0
+    assert summary['calls']['motion'] == 6
+
+
+# vim: et sw=4 sts=4
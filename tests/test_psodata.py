@@ -0,0 +1,96 @@
+from __future__ import division
+
+try:
+    from StringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+import numpy as np
+
+from optprime.output import Binary
+from optprime.particle import Particle
+from optprime.psodata import PSOData, open_log
+
+BATCH_VALUES = [[5.0, 2.0, 1.0], [4.0, 3.0, 0.5], [6.0, 1.5, 0.25]]
+
+
+def best_particle(value):
+    p = Particle(0, np.zeros(2), np.zeros(2))
+    p.pbestval = value
+    return p
+
+
+def write_binary(path, batches, done=True):
+    for values in batches:
+        out = Binary(path=path)
+        out.start()
+        for i, value in enumerate(values):
+            iteration = 1 + 10 * i
+            out(iteration=iteration, evals=5 * iteration,
+                    best=best_particle(value))
+        if done:
+            out.finish()
+        else:
+            out._file.close()
+
+
+def text_log(batches):
+    lines = ['# Options:', '#   out = output.Pair', '']
+    for values in batches:
+        lines.append('# Batch')
+        for i, value in enumerate(values):
+            lines.append('%s %r' % (1 + 10 * i, value))
+        lines.append('# DONE')
+    return StringIO('\n'.join(lines) + '\n')
+
+
+def test_binary_matches_text(tmpdir):
+    path = str(tmpdir.join('pso.log'))
+    write_binary(path, BATCH_VALUES)
+    data = PSOData(open(path, 'rb'))
+    text_data = PSOData(text_log(BATCH_VALUES))
+
+    assert len(data) == len(text_data) == 3
+    assert list(data[0]) == list(text_data[0]) == [1, 11, 21]
+    assert list(data[1].evals) == [5, 55, 105]
+    assert data[2].lastitem() == text_data[2].lastitem() == (21, 0.25)
+    for key in data[0]:
+        assert data.average(key) == text_data.average(key)
+        assert data.statistics(key, 0) == text_data.statistics(key, 0)
+
+
+def test_all_statistics(tmpdir):
+    path = str(tmpdir.join('pso.log'))
+    batches = [[float(i * j % 7) for j in range(5)] for i in range(12)]
+    # A batch that stopped early only contributes to the first iterations.
+    batches.append([3.0, 2.0])
+    write_binary(path, batches)
+
+    for data in PSOData(open(path, 'rb')), PSOData(text_log(batches)):
+        assert list(data.iterations) == [1, 11]
+        assert data.values.shape == (13, 2)
+        averages = data.averages()
+        low, med, high = data.all_statistics(2)
+        for i, key in enumerate(data.iterations):
+            assert averages[i] == data.average(key)
+            assert (low[i], med[i], high[i]) == data.statistics(key, 2)
+
+
+def test_incomplete_batch(tmpdir):
+    path = str(tmpdir.join('pso.log'))
+    write_binary(path, BATCH_VALUES[:1])
+    write_binary(path, BATCH_VALUES[1:2], done=False)
+    # Simulate a crash in the middle of writing a record.
+    with open(path, 'ab') as f:
+        f.write(b'\x01\x02\x03')
+
+    f, batch = open_log(path)
+    f.close()
+    assert batch == 2
+
+    data = PSOData(open(path, 'rb'))
+    assert len(data) == 1
+    assert data[0][11] == 2.0
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,80 @@
+from __future__ import division
+
+import numpy as np
+import pytest
+
+from optprime.randstream import (philox4x32, seed_key, CounterRandom,
+        StreamBatch)
+
+# Known-answer vectors from the Random123 distribution (kat_vectors).
+PHILOX_KAT = [
+    ((0, 0, 0, 0), (0, 0),
+        (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+    ((0xffffffff, 0xffffffff, 0xffffffff, 0xffffffff),
+        (0xffffffff, 0xffffffff),
+        (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+    ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344),
+        (0xa4093822, 0x299f31d0),
+        (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1)),
+]
+
+
+@pytest.mark.parametrize('counter, key, expected', PHILOX_KAT)
+def test_philox_kat(counter, key, expected):
+    out = philox4x32(np.array(counter, dtype=np.uint64),
+            np.array(key, dtype=np.uint64))
+    assert [int(x) for x in out] == list(expected)
+
+
+def test_streams_are_distinct():
+    key = seed_key(42)
+    values = set()
+    for args in [(1, 0, 0, 0), (1, 1, 0, 0), (1, 0, 1, 0), (1, 0, 0, 1),
+            (2, 0, 0, 0)]:
+        values.add(CounterRandom(key, *args).random())
+    assert len(values) == 5
+    assert (CounterRandom(seed_key(43), 1).random() !=
+            CounterRandom(key, 1).random())
+
+
+def test_batch_matches_scalar():
+    key = seed_key(12345)
+    ids = np.arange(5)
+    iters = np.array([0, 3, 3, 7, 100])
+    batch = StreamBatch(key, 1, ids, iters, 2)
+    first = batch.uniform(0, 2.05, 3)
+    rands = list(batch)
+    second = batch.uniform(-1, 1, 4)
+
+    for i in range(len(ids)):
+        rand = CounterRandom(key, 1, ids[i], iters[i], 2)
+        assert np.array_equal(first[i], rand.uniform_array(0, 2.05, 3))
+        assert rands[i].getstate() == rand.getstate()
+        expected = [rand.uniform(-1, 1) for _ in range(4)]
+        assert np.array_equal(second[i], expected)
+
+
+def test_rewind():
+    key = seed_key(42)
+    draws = list(CounterRandom(key, 1, 7).uniform_array(0, 1, 3000))
+
+    rand = CounterRandom(key, 1, 7)
+    rand.jumpahead(3)
+    assert rand.random() == draws[3]
+    rand.setstate((1, None))
+    assert rand.random() == draws[1]
+    # Rewind by more than a buffer.
+    rand.jumpahead(2500)
+    assert rand.random() == draws[2502]
+    rand.setstate((0, None))
+    assert rand.random() == draws[0]
+
+
+def test_out_of_range():
+    with pytest.raises(ValueError):
+        CounterRandom(seed_key(1), 256)
+    with pytest.raises(ValueError):
+        CounterRandom(seed_key(1), 1, -1)
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,315 @@
+from __future__ import division, print_function
+
+from itertools import chain
+import operator
+
+import numpy as np
+import pytest
+
+from mrs.main import option_parser
+from optprime import codec
+from optprime.arrayswarm import ArraySwarm
+from optprime.particle import Swarm, SwarmRef
+from optprime.subswarmpso import SubswarmPSO
+
+ARGS = ['-n', '4', '-d', '2', '-s', '3', '--mrs-seed', '42',
+        '--hey-im-testing']
+
+
+def make_program(args):
+    parser = SubswarmPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args + ARGS)
+    return SubswarmPSO(opts, args)
+
+
+def run_iterations(program, iters, resident):
+    """Runs the map and reduce functions as MapReduce would.
+
+    Each record is serialized, but resident state stays in the program.
+    Returns the swarms in the reduce output of the last iteration.
+    """
+    records = [kvpair for key in range(program.link.num)
+            for kvpair in program.init_map(key, b'')]
+    for iteration in range(iters):
+        groups = {}
+        for key, value in records:
+            value = codec.loads(codec.dumps(value))
+            groups.setdefault(key, []).append(value)
+        swarms = [(key, swarm) for key in sorted(groups)
+                for swarm in program.pso_reduce(key, iter(groups[key]))]
+        if resident:
+            pso_map = program.resident_map
+        else:
+            pso_map = program.pso_map
+        records = [kvpair for key, swarm in swarms
+                for kvpair in pso_map(key, swarm)]
+    return [(key, swarm) for key, swarm in swarms if isinstance(swarm, Swarm)]
+
+
+@pytest.mark.parametrize('args', [['-l', 'Ring'], ['--shuffle']])
+def test_resident_matches_full(args):
+    expected = run_iterations(make_program(args), 4, False)
+    program = make_program(args + ['--resident'])
+    swarms = run_iterations(program, 4, True)
+
+    assert [key for key, _ in swarms] == [key for key, _ in expected]
+    for (_, swarm), (_, other) in zip(swarms, expected):
+        for p, q in zip(swarm, other):
+            assert p.id == q.id
+            assert np.array_equal(p.pos, q.pos)
+            assert p.pbestval == q.pbestval
+            assert p.nbestval == q.nbestval
+    # Each reduce took its state, and each map left new state.
+    assert len(program.resident) == program.link.num
+
+
+def test_resident_lost():
+    program = make_program(['-l', 'Ring', '--resident'])
+    values = [value for key, value in program.init_map(0, b'') if key == 0]
+    swarm = list(program.pso_reduce(0, iter(values)))[0]
+    values = [value for key, value in program.resident_map(0, swarm)
+            if key == 0]
+    refs = [value for value in values if isinstance(value, SwarmRef)]
+    assert len(refs) == 1
+    assert not refs[0].lost()
+
+    # Another slave doesn't have the state.
+    other = make_program(['-l', 'Ring', '--resident'])
+    lost = list(other.pso_reduce(0, iter(values)))
+    assert len(lost) == 1
+    assert lost[0].lost()
+    assert list(other.pso_map(0, lost[0])) == [(0, lost[0])]
+
+    # The master learns about it from the best particles, too.
+    collapsed = chain(other.collapse_map(0, lost[0]),
+            other.collapse_map(1, swarm))
+    best = list(other.findbest_reduce(0, (value for _, value in collapsed)))
+    assert best[0] is lost[0]
+    assert best[1] is other.findbest(swarm)
+
+
+class LocalDataset(object):
+    """A dataset that was computed in this process.
+
+    The records are serialized, so each reader gets its own copy.
+    """
+
+    def __init__(self, pairs):
+        self.pairs = [(key, codec.dumps(value)) for key, value in pairs]
+        self.pairs.sort(key=lambda pair: pair[0])
+        self.closed = False
+
+    def fetchall(self):
+        assert not self.closed
+
+    def data(self):
+        assert not self.closed
+        return ((key, codec.loads(value)) for key, value in self.pairs)
+
+    def close(self):
+        self.closed = True
+
+
+class LocalJob(object):
+    """Computes each dataset as soon as it is submitted.
+
+    Resident state stays in the program, as it would in a slave.  The
+    resident state is forgotten (as if the tasks ran on another slave) before
+    the pso_reduce calls whose (zero-based) numbers are in `lose`.
+    """
+
+    def __init__(self, program, lose=()):
+        self.program = program
+        self.lose = lose
+        self.reduces = 0
+        self.datasets = []
+
+    def local_data(self, kvpairs, **kwds):
+        return self.dataset(kvpairs)
+
+    def dataset(self, pairs):
+        dataset = LocalDataset(pairs)
+        self.datasets.append(dataset)
+        return dataset
+
+    def map_data(self, input, mapper, **kwds):
+        return self.dataset(kvpair for key, value in input.data()
+                for kvpair in mapper(key, value))
+
+    def reduce_data(self, input, reducer, **kwds):
+        return self.dataset(self.reduce(input, reducer))
+
+    def reducemap_data(self, input, reducer, mapper, **kwds):
+        return self.dataset(kvpair for key, value in self.reduce(input, reducer)
+                for kvpair in mapper(key, value))
+
+    def reduce(self, input, reducer):
+        if reducer == self.program.pso_reduce:
+            if self.reduces in self.lose:
+                self.program.resident.clear()
+            self.reduces += 1
+        groups = {}
+        for key, value in input.data():
+            groups.setdefault(key, []).append(value)
+        return [(key, value) for key in sorted(groups)
+                for value in reducer(key, iter(groups[key]))]
+
+    def wait(self, *datasets):
+        return list(datasets)
+
+
+def generator_output(args, capfd, lose=(), qmax=4, out='Pair'):
+    """Runs the MapReduce generator with a LocalJob.
+
+    As in parallel Mrs, each callback is only called after `qmax` more
+    datasets have been submitted.
+    """
+    parser = SubswarmPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args + ['-i', '24', '-d', '3', '-s', '3',
+        '-o', out, '--out-freq', '2', '--mrs-seed', '42',
+        '--hey-im-testing'])
+    program = SubswarmPSO(opts, args)
+    program.start_output()
+    program.iterative_qmax = qmax
+    program.start_async_tuner()
+    job = LocalJob(program, lose)
+
+    pending = []
+    for item in program.generator(job):
+        pending.append(item)
+        while len(pending) > qmax:
+            dataset, callback = pending.pop(0)
+            if callback is not None:
+                assert callback(dataset)
+    for dataset, callback in pending:
+        if callback is not None:
+            assert callback(dataset)
+    program.finish_output()
+
+    out, err = capfd.readouterr()
+    assert err == ''
+    return program, job, out.splitlines()
+
+
+@pytest.mark.parametrize('args', [
+    ['-l', 'Ring', '--resident-reload', '3'],
+    ['--resident-reload', '3', '--shuffle'],
+    ['-l', 'Ring', '--resident-reload', '0'],
+    ])
+@pytest.mark.parametrize('lose', [[1], [7], list(range(1, 9))])
+def test_resident_reload(args, lose, capfd):
+    _, _, expected = generator_output(args, capfd)
+    assert len(expected) == 4
+
+    program, job, lines = generator_output(args + ['--resident'], capfd,
+            lose)
+    reloads = [line for line in lines if line.startswith('#')]
+    assert reloads
+    assert [line for line in lines if not line.startswith('#')] == expected
+    assert len(program.keyframes) == 1
+    # Only the last iteration and the keyframe are left open.
+    assert len([d for d in job.datasets if not d.closed]) <= 2
+
+
+def test_resident_reload_every_iteration(capfd):
+    _, _, expected = generator_output(['-l', 'Ring'], capfd)
+    program, job, lines = generator_output(['-l', 'Ring', '--resident',
+        '--resident-reload', '1'], capfd)
+    assert lines == expected
+    assert len(program.keyframes) == 1
+    assert len([d for d in job.datasets if not d.closed]) <= 2
+
+
+def test_evals_from_slaves(capfd):
+    _, _, pairs = generator_output(['-l', 'Ring'], capfd)
+    program, _, lines = generator_output(['-l', 'Ring'], capfd, out='Evals')
+    # Pair shows the iterations of the best particle.
+    num = program.link.num * program.topology.num
+    assert [int(line.split()[0]) for line in lines] == [
+            num * int(line.split()[0]) for line in pairs]
+
+    # With varying subiterations, only the slaves know the counts.  After a
+    # reload, the counts start over from the keyframe.
+    args = ['-l', 'Ring', '--subiters-stddev', '1.5']
+    _, _, expected = generator_output(args, capfd, out='Evals')
+    assert expected != lines
+    _, _, lines = generator_output(args + ['--resident',
+        '--resident-reload', '3'], capfd, [7], out='Evals')
+    assert [line for line in lines if not line.startswith('#')] == expected
+
+
+def bypass_output(args, capfd):
+    parser = SubswarmPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args + ['-i', '36', '-d', '3', '-s', '3',
+        '--out-freq', '3', '--mrs-seed', '42', '--hey-im-testing', '-q'])
+    program = SubswarmPSO(opts, args)
+    program.bypass()
+
+    out, err = capfd.readouterr()
+    assert err == ''
+    return [line for line in out.splitlines() if not line.startswith('#')]
+
+
+@pytest.mark.parametrize('args', [
+    ['-t', 'Complete', '-n', '5', '-l', 'Ring', '--link-num', '6'],
+    ['-t', 'Complete', '--top-noselflink', '-n', '4', '-l', 'Complete',
+        '--link-noselflink', '--link-num', '3'],
+    ['-t', 'Ring', '-n', '5', '-l', 'Ring', '--link-num', '6',
+        '--send-best', '--subiters-stddev', '1.5'],
+    ['-t', 'Rand', '--top-neighbors', '2', '-n', '5', '-l', 'Rand',
+        '--link-neighbors', '2', '--link-num', '5'],
+    ['-t', 'Rand', '--top-neighbors', '2', '-n', '5', '-l', 'Rand',
+        '--link-neighbors', '2', '--link-num', '5', '--counter-rng'],
+    ['-t', 'Ring', '-n', '5', '-l', 'Complete', '--link-num', '4',
+        '--shuffle'],
+    ['-t', 'Complete', '-n', '6', '-l', 'Complete', '--link-num', '4',
+        '--shuffle', '--counter-rng', '--subiters-stddev', '1.5'],
+    ])
+def test_vectorized_matches_bypass(args, capfd):
+    expected = bypass_output(args, capfd)
+    lines = bypass_output(args + ['--vectorized'], capfd)
+    assert len(lines) == 4
+    assert lines == expected
+
+
+def test_mapreduce_rejects_checkpoint(tmpdir):
+    program = make_program(['--checkpoint', str(tmpdir.join('checkpoint'))])
+    with pytest.raises(ValueError):
+        program.run(None)
+
+
+def test_cross_task_fraction():
+    args = ['-l', 'Ring', '-N', '2']
+    # Only the messages to self stay within the task.
+    assert abs(make_program(args).cross_task_fraction(3) - 2 / 3) < 1e-12
+    program = make_program(args + ['--range-partition'])
+    assert abs(program.cross_task_fraction(3) - 1 / 3) < 1e-12
+
+    # Each subswarm sends 2, 1, 1, and 1 of its 5 particles to subswarms 0,
+    # 1, 2, and 3, which are in tasks 0, 1, 2, and 0.
+    program = make_program(['-t', 'Ring', '-n', '5', '-l', 'Complete', '-N',
+        '3', '--shuffle'])
+    assert abs(program.cross_task_fraction(3) - 3 / 5) < 1e-12
+
+
+@pytest.mark.parametrize('engine_args', [[], ['--vectorized']])
+def test_locality_output(engine_args, capfd):
+    lines = bypass_output(['-o', 'Locality', '-t', 'Ring', '-n', '4', '-l',
+        'Ring', '--link-num', '8', '-N', '2', '--range-partition']
+        + engine_args, capfd)
+    assert len(lines) == 4
+    assert all(line.split()[2] == '0.166667' for line in lines)
+
+
+def test_group_best_cands():
+    swarm = ArraySwarm(range(5), np.zeros((5, 1)), np.zeros((5, 1)),
+            operator.lt)
+    swarm.pbestval = np.array([3.0, 1.0, 2.0, 5.0, 4.0])
+    groups = np.array([0, 0, 0, 1, 1])
+    senders = np.arange(5)
+    swarm.group_best_cands(groups, senders, swarm.pbestpos, swarm.pbestval,
+            selflink=False)
+    assert swarm.nbestval.tolist() == [1.0, 2.0, 1.0, 4.0, 5.0]
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,53 @@
+from __future__ import division
+
+import numpy as np
+import pytest
+
+from mrs.main import option_parser
+from mrs import param
+
+from optprime.particle import Dummy
+from optprime.randstream import CounterRandom, StreamBatch, seed_key
+from optprime.standardpso import StandardPSO
+
+
+def make_topology(args):
+    parser = StandardPSO.update_parser(option_parser())
+    opts, args = parser.parse_args(args)
+    return param.instantiate(opts, 'top')
+
+
+@pytest.mark.parametrize('args', [
+    ['-t', 'Isolated'],
+    ['-t', 'Isolated', '--top-noselflink'],
+    ['-t', 'Ring'],
+    ['-t', 'Ring', '--top-neighbors', '3', '--top-noselflink'],
+    ['-t', 'DRing', '--top-neighbors', '2'],
+    ['-t', 'Complete'],
+    ['-t', 'Complete', '--top-noselflink'],
+    ['-t', 'Rand', '--top-neighbors', '3'],
+    ['-t', 'Rand', '--top-neighbors', '-1', '--top-noselflink'],
+    ])
+def test_adjacency_matches_iterneighbors(args):
+    topology = make_topology(args + ['-n', '7'])
+    key = seed_key(3)
+    ids = np.arange(7)
+    iters = np.array([5] * 7)
+    rands = StreamBatch(key, 4, ids, iters)
+    for indices_rands in (rands, list(rands)):
+        indptr, indices = topology.adjacency(ids, indices_rands)
+        assert len(indptr) == len(ids) + 1
+        for i in ids:
+            rand = CounterRandom(key, 4, i, 5)
+            expected = list(topology.iterneighbors(Dummy(i, 5), rand))
+            assert indices[indptr[i]:indptr[i + 1]].tolist() == expected
+
+
+def test_static_adjacency_is_cached():
+    topology = make_topology(['-t', 'Ring', '-n', '5'])
+    first = topology.adjacency(np.arange(5))
+    assert topology.adjacency(np.arange(5)) is first
+    assert topology.adjacency(np.arange(4)) is not first
+
+
+# vim: et sw=4 sts=4
@@ -0,0 +1,59 @@
+from __future__ import division
+
+from optprime.tuning import AsyncTuner, MAP_RATIO, REDUCEMAP_RATIO
+
+
+def test_hill_climb():
+    tuner = AsyncTuner(qmax=4)
+    ratios = []
+    for i in range(40):
+        # Throughput peaks at a reducemap ratio of 0.35.
+        throughput = 10 - abs(tuner.reducemap_ratio - 0.35) * 20
+        tuner.adjust(throughput, depth=2)
+        ratios.append(tuner.reducemap_ratio)
+    assert all(0.3 <= r <= 0.4 for r in ratios[10:])
+    offset = tuner.map_ratio - tuner.reducemap_ratio
+    assert abs(offset - (MAP_RATIO - REDUCEMAP_RATIO)) < 1e-9
+
+
+def test_bounds():
+    tuner = AsyncTuner(qmax=4, min_ratio=0.3)
+    for i in range(20):
+        tuner.adjust(10 - 10 * tuner.reducemap_ratio, depth=2)
+    assert tuner.reducemap_ratio in (0.3, 0.35)
+    assert 0.3 <= min(tuner.reducemap_ratio, tuner.map_ratio)
+
+
+def test_queue_length():
+    tuner = AsyncTuner(qmax=8, window=3)
+    time = 0
+    for i in range(3):
+        tuner.submitted(now=time)
+    for i in range(3):
+        time += 1
+        tuner.completed(now=time)
+    # The queue was never full, so it shrinks to just above its depth.
+    assert tuner.qmax == 3
+
+    for i in range(6):
+        tuner.submitted(now=time)
+    for i in range(3):
+        time += 1
+        tuner.completed(now=time)
+    assert tuner.qmax == 4
+
+
+def test_fixed_settings_logged():
+    messages = []
+    tuner = AsyncTuner(qmax=4, window=2, adaptive=False, log=messages.append)
+    for i in range(4):
+        tuner.submitted(now=0)
+    for i in range(4):
+        tuner.completed(now=i + 1)
+    assert (tuner.map_ratio, tuner.reducemap_ratio, tuner.qmax) == (
+            MAP_RATIO, REDUCEMAP_RATIO, 4)
+    assert len(messages) == 2
+    assert messages[0].startswith('iteration=2 throughput=1 depth=3.50 keep')
+
+
+# vim: et sw=4 sts=4